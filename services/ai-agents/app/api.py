@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from pydantic import BaseModel, Field
 
 from .config import settings
+from .http_clients import http_clients
 from .templates import get_all_templates, get_template, get_templates_by_category, search_templates
 
 logger = logging.getLogger(__name__)
@@ -410,7 +411,8 @@ async def get_service_status():
                 "multimodal_tools": "enabled",
                 "persistent_memory": "enabled",
                 "autonomous_execution": "enabled"
-            }
+            },
+            "http_clients": http_clients.get_stats()
         }
         
     except Exception as e:
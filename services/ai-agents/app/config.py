@@ -48,6 +48,14 @@ class Settings(BaseSettings):
     multimodal_worker_url: str = os.getenv("MULTIMODAL_WORKER_URL", "http://multimodal-worker:8001")
     retrieval_proxy_url: str = os.getenv("RETRIEVAL_PROXY_URL", "http://retrieval-proxy:8002")
     
+    # Inter-service HTTP client settings (one connection pool per upstream)
+    http_max_connections: int = 100
+    http_pool_max_connections: dict = {}  # Per-upstream overrides, e.g. {"llm": 20}
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # Seconds an idle connection is kept open
+    http_timeout: float = 30.0  # Default per-request timeout; calls may pass their own
+    http_connect_timeout: float = 5.0
+    
     # Agent settings
     max_agents_per_user: int = 10
     agent_execution_timeout: int = 300  # 5 minutes
@@ -0,0 +1,146 @@
+"""
+Shared, pooled HTTP clients for calls to other services
+
+This module is vendored into both retrieval-proxy and ai-agents, which are
+built from separate Docker contexts and share no package. The two copies
+must stay identical; change both together.
+"""
+import importlib.util
+import logging
+from typing import Any, AsyncIterator, Callable, Dict
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package and is only negotiated over TLS
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class MeteredStream(httpx.AsyncByteStream):
+    """Response body stream that reports when the response is closed"""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+        await self._stream.aclose()
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Connection-pooling transport that counts requests, errors and active connections
+    
+    A request holds its pooled connection from the moment it is sent until
+    its response is closed, so active requests are counted over that span
+    rather than read from the pool's internals.
+    """
+    
+    def __init__(self, limits: httpx.Limits, **kwargs):
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, **kwargs)
+        self.max_connections = limits.max_connections
+        self.requests = 0
+        self.errors = 0
+        self.active = 0
+        self.peak_active = 0
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            self.active -= 1
+            if isinstance(e, Exception):
+                self.errors += 1
+            raise
+        response.stream = MeteredStream(response.stream, self._release)
+        return response
+    
+    def _release(self):
+        """Called once a response is closed and its connection returned to the pool"""
+        self.active -= 1
+    
+    async def aclose(self):
+        await self._transport.aclose()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counters and active connection counts"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "active": self.active,
+            "peak_active": self.peak_active,
+            "max_connections": self.max_connections
+        }
+
+
+class HTTPClientRegistry:
+    """Persistent httpx clients, one connection pool per upstream service
+    
+    Clients are created on first use and closed by the service lifespan, so
+    keep-alive connections are reused across calls. Timeouts passed to a
+    request override the client defaults.
+    """
+    
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, MeteredTransport] = {}
+    
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """Get the shared client for an upstream, e.g. 'retrieval_proxy'"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            client = self._create_client(upstream)
+            self._clients[upstream] = client
+        return client
+    
+    def _create_client(self, upstream: str) -> httpx.AsyncClient:
+        """Create a client with its own pool limits"""
+        limits = httpx.Limits(
+            max_connections=settings.http_pool_max_connections.get(upstream, settings.http_max_connections),
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        transport = MeteredTransport(limits=limits, http2=HTTP2_AVAILABLE)
+        self._transports[upstream] = transport
+        logger.info(f"Created HTTP client for {upstream} (max {limits.max_connections} connections)")
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+        )
+    
+    async def close(self):
+        """Close all clients and their pooled connections"""
+        for upstream, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP client for {upstream}: {e}")
+        self._clients.clear()
+        logger.info("HTTP clients closed")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection metrics per upstream"""
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "upstreams": {
+                upstream: transport.get_stats()
+                for upstream, transport in self._transports.items()
+            }
+        }
+
+
+# Global HTTP client registry instance
+http_clients = HTTPClientRegistry()
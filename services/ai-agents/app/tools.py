@@ -3,11 +3,11 @@ Tool registry for AI agents - integrates with multimodal stack capabilities
 """
 import logging
 from typing import List, Dict, Any, Optional
-import httpx
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 
 from .config import settings
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -24,34 +24,33 @@ class ImageAnalysisTool(BaseTool):
     async def _arun(self, image_url: str) -> str:
         """Analyze image asynchronously"""
         try:
-            async with httpx.AsyncClient() as client:
-                # Download image if URL
-                if image_url.startswith('http'):
-                    img_response = await client.get(image_url)
-                    img_response.raise_for_status()
-                    image_data = img_response.content
-                else:
-                    with open(image_url, 'rb') as f:
-                        image_data = f.read()
-                
-                # Send to multimodal worker
-                files = {'file': ('image.jpg', image_data, 'image/jpeg')}
-                data = {'document_name': 'agent_analysis.jpg'}
-                
-                response = await client.post(
-                    f"{settings.multimodal_worker_url}/api/v1/process/image",
-                    files=files,
-                    data=data,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+            # Download image if URL
+            if image_url.startswith('http'):
+                img_response = await http_clients.get("external").get(image_url)
+                img_response.raise_for_status()
+                image_data = img_response.content
+            else:
+                with open(image_url, 'rb') as f:
+                    image_data = f.read()
+            
+            # Send to multimodal worker
+            files = {'file': ('image.jpg', image_data, 'image/jpeg')}
+            data = {'document_name': 'agent_analysis.jpg'}
+            
+            response = await http_clients.get("multimodal_worker").post(
+                f"{settings.multimodal_worker_url}/api/v1/process/image",
+                files=files,
+                data=data,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            if result.get("success"):
+                return f"Image analysis: {result['data']['caption']}"
+            else:
+                return f"Image analysis failed: {result.get('error', 'Unknown error')}"
                 
-                result = response.json()
-                if result.get("success"):
-                    return f"Image analysis: {result['data']['caption']}"
-                else:
-                    return f"Image analysis failed: {result.get('error', 'Unknown error')}"
-                    
         except Exception as e:
             return f"Error analyzing image: {str(e)}"
     
@@ -75,36 +74,36 @@ class SearchTool(BaseTool):
     async def _arun(self, query: str, modalities: List[str] = None, limit: int = 5) -> str:
         """Search content asynchronously"""
         try:
-            async with httpx.AsyncClient() as client:
-                search_data = {
-                    "query": query,
-                    "modalities": modalities or ["text", "image", "video"],
-                    "limit": limit
-                }
-                
-                response = await client.post(
-                    f"{settings.retrieval_proxy_url}/api/v1/search",
-                    json=search_data,
-                    timeout=30.0
-                )
-                response.raise_for_status()
+            client = http_clients.get("retrieval_proxy")
+            search_data = {
+                "query": query,
+                "modalities": modalities or ["text", "image", "video"],
+                "limit": limit
+            }
+            
+            response = await client.post(
+                f"{settings.retrieval_proxy_url}/api/v1/search",
+                json=search_data,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            if result.get("results"):
+                # Format search results
+                formatted_results = []
+                for item in result["results"][:limit]:
+                    formatted_results.append(
+                        f"- {item.get('content', 'No content')} "
+                        f"(Source: {item.get('filename', 'Unknown')}, "
+                        f"Score: {item.get('score', 0):.2f})"
+                    )
                 
-                result = response.json()
+                return f"Search results for '{query}':\n" + "\n".join(formatted_results)
+            else:
+                return f"No results found for query: {query}"
                 
-                if result.get("results"):
-                    # Format search results
-                    formatted_results = []
-                    for item in result["results"][:limit]:
-                        formatted_results.append(
-                            f"- {item.get('content', 'No content')} "
-                            f"(Source: {item.get('filename', 'Unknown')}, "
-                            f"Score: {item.get('score', 0):.2f})"
-                        )
-                    
-                    return f"Search results for '{query}':\n" + "\n".join(formatted_results)
-                else:
-                    return f"No results found for query: {query}"
-                    
         except Exception as e:
             return f"Error searching content: {str(e)}"
     
@@ -127,28 +126,28 @@ class TextGenerationTool(BaseTool):
     async def _arun(self, prompt: str, max_tokens: int = 200) -> str:
         """Generate text asynchronously"""
         try:
-            async with httpx.AsyncClient() as client:
-                completion_data = {
-                    "model": settings.llm_model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": max_tokens,
-                    "temperature": settings.llm_temperature
-                }
-                
-                response = await client.post(
-                    f"{settings.llm_base_url}/chat/completions",
-                    json=completion_data,
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                
-                result = response.json()
+            client = http_clients.get("llm")
+            completion_data = {
+                "model": settings.llm_model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": settings.llm_temperature
+            }
+            
+            response = await client.post(
+                f"{settings.llm_base_url}/chat/completions",
+                json=completion_data,
+                timeout=60.0
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            if result.get("choices"):
+                return result["choices"][0]["message"]["content"]
+            else:
+                return "No response generated"
                 
-                if result.get("choices"):
-                    return result["choices"][0]["message"]["content"]
-                else:
-                    return "No response generated"
-                    
         except Exception as e:
             return f"Error generating text: {str(e)}"
     
@@ -17,6 +17,7 @@ from app.agent_manager import AgentManager
 from app.tools import ToolRegistry
 from app.memory import MemoryManager
 from app.api import router
+from app.http_clients import http_clients
 
 # Configure logging
 logging.basicConfig(
@@ -52,6 +53,7 @@ async def lifespan(app: FastAPI):
         app.state.agent_manager = agent_manager
         app.state.tool_registry = tool_registry
         app.state.memory_manager = memory_manager
+        app.state.http_clients = http_clients
         
         logger.info("AI Agents Service initialized successfully")
         
@@ -66,6 +68,7 @@ async def lifespan(app: FastAPI):
             await agent_manager.cleanup()
         if memory_manager:
             await memory_manager.close()
+        await http_clients.close()
 
 # Create FastAPI app
 app = FastAPI(
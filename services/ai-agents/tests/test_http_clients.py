@@ -0,0 +1,80 @@
+"""
+Unit tests for the shared HTTP client registry in ai-agents service
+"""
+import pytest
+from unittest.mock import patch
+import httpx
+
+from app.http_clients import HTTPClientRegistry
+
+
+class TestHTTPClientRegistry:
+    """Test cases for HTTPClientRegistry"""
+
+    @pytest.fixture
+    def registry(self):
+        """Create an empty client registry"""
+        return HTTPClientRegistry()
+
+    def test_client_is_reused_per_upstream(self, registry):
+        """Test that each upstream gets one persistent client"""
+        search_client = registry.get("retrieval_proxy")
+
+        assert registry.get("retrieval_proxy") is search_client
+        assert registry.get("llm") is not search_client
+
+    def test_per_upstream_pool_limit(self, registry):
+        """Test that pool limits can be overridden for a single upstream"""
+        with patch('app.http_clients.settings.http_pool_max_connections', {"llm": 4}), \
+             patch('app.http_clients.MeteredTransport') as mock_transport:
+            registry.get("llm")
+            registry.get("retrieval_proxy")
+
+        llm_limits = mock_transport.call_args_list[0].kwargs["limits"]
+        default_limits = mock_transport.call_args_list[1].kwargs["limits"]
+        assert llm_limits.max_connections == 4
+        assert default_limits.max_connections == 100
+
+    @pytest.mark.asyncio
+    async def test_requests_and_errors_are_counted(self, registry):
+        """Test that connection metrics are reported per upstream"""
+        def handler(request):
+            if request.url.path == "/fail":
+                raise httpx.ConnectError("refused")
+            return httpx.Response(200, json={"ok": True})
+
+        client = registry.get("retrieval_proxy")
+        registry._transports["retrieval_proxy"]._transport = httpx.MockTransport(handler)
+
+        await client.get("http://retrieval-proxy/ok")
+        with pytest.raises(httpx.ConnectError):
+            await client.get("http://retrieval-proxy/fail")
+
+        stats = registry.get_stats()["upstreams"]["retrieval_proxy"]
+        assert stats["requests"] == 2
+        assert stats["errors"] == 1
+        assert stats["active"] == 0
+        assert stats["peak_active"] == 1
+
+    @pytest.mark.asyncio
+    async def test_streamed_response_is_active_until_closed(self, registry):
+        """Test that a request counts as active until its response is closed"""
+        client = registry.get("retrieval_proxy")
+        transport = registry._transports["retrieval_proxy"]
+        transport._transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"data"))
+
+        async with client.stream("GET", "http://retrieval-proxy/stream") as response:
+            assert transport.get_stats()["active"] == 1
+            assert await response.aread() == b"data"
+
+        assert transport.get_stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_close_releases_clients(self, registry):
+        """Test that closing the registry closes its clients"""
+        client = registry.get("llm")
+
+        await registry.close()
+
+        assert client.is_closed
+        assert registry.get("llm") is not client
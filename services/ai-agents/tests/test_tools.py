@@ -37,12 +37,12 @@ class TestImageAnalysisTool:
             tool.ImageAnalysisInput()
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_analyze_image_from_url_success(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_analyze_image_from_url_success(self, mock_http_clients, tool):
         """Test successful image analysis from URL"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock image download
         mock_img_response = Mock()
@@ -72,13 +72,13 @@ class TestImageAnalysisTool:
         assert "/api/v1/process/image" in post_call_args[0][0]
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
+    @patch('app.tools.http_clients')
     @patch('builtins.open', create=True)
-    async def test_analyze_image_from_file_success(self, mock_open, mock_client_class, tool):
+    async def test_analyze_image_from_file_success(self, mock_open, mock_http_clients, tool):
         """Test successful image analysis from file"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock file reading
         mock_file = Mock()
@@ -108,12 +108,12 @@ class TestImageAnalysisTool:
         mock_client.post.assert_called_once()
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_analyze_image_failure(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_analyze_image_failure(self, mock_http_clients, tool):
         """Test image analysis failure"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock image download
         mock_img_response = Mock()
@@ -135,12 +135,12 @@ class TestImageAnalysisTool:
         assert "Image analysis failed: Image processing failed" in result
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_analyze_image_http_error(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_analyze_image_http_error(self, mock_http_clients, tool):
         """Test image analysis with HTTP error"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock HTTP error
         mock_client.get.side_effect = httpx.HTTPError("Network error")
@@ -196,12 +196,12 @@ class TestSearchTool:
             tool.SearchInput()
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_search_content_success(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_search_content_success(self, mock_http_clients, tool):
         """Test successful content search"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock search response
         mock_search_response = Mock()
@@ -242,12 +242,12 @@ class TestSearchTool:
         assert post_call_args[1]["json"]["limit"] == 5
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_search_content_no_results(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_search_content_no_results(self, mock_http_clients, tool):
         """Test content search with no results"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock empty search response
         mock_search_response = Mock()
@@ -261,12 +261,12 @@ class TestSearchTool:
         assert "No results found for query: test query" in result
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_search_content_with_defaults(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_search_content_with_defaults(self, mock_http_clients, tool):
         """Test content search with default parameters"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock search response
         mock_search_response = Mock()
@@ -283,12 +283,12 @@ class TestSearchTool:
         assert post_call_args[1]["json"]["limit"] == 5
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_search_content_http_error(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_search_content_http_error(self, mock_http_clients, tool):
         """Test content search with HTTP error"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock HTTP error
         mock_client.post.side_effect = httpx.HTTPError("Network error")
@@ -341,12 +341,12 @@ class TestTextGenerationTool:
             tool.TextGenerationInput()
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_generate_text_success(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_generate_text_success(self, mock_http_clients, tool):
         """Test successful text generation"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock LLM response
         mock_llm_response = Mock()
@@ -375,12 +375,12 @@ class TestTextGenerationTool:
         assert post_call_args[1]["json"]["max_tokens"] == 300
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_generate_text_no_response(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_generate_text_no_response(self, mock_http_clients, tool):
         """Test text generation with no response"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock LLM response with no choices
         mock_llm_response = Mock()
@@ -394,12 +394,12 @@ class TestTextGenerationTool:
         assert result == "No response generated"
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_generate_text_with_defaults(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_generate_text_with_defaults(self, mock_http_clients, tool):
         """Test text generation with default parameters"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock LLM response
         mock_llm_response = Mock()
@@ -417,12 +417,12 @@ class TestTextGenerationTool:
         assert post_call_args[1]["json"]["max_tokens"] == 200
 
     @pytest.mark.asyncio
-    @patch('app.tools.httpx.AsyncClient')
-    async def test_generate_text_http_error(self, mock_client_class, tool):
+    @patch('app.tools.http_clients')
+    async def test_generate_text_http_error(self, mock_http_clients, tool):
         """Test text generation with HTTP error"""
         # Setup mocks
         mock_client = AsyncMock()
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        mock_http_clients.get.return_value = mock_client
         
         # Mock HTTP error
         mock_client.post.side_effect = httpx.HTTPError("LLM service error")
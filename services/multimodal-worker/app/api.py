@@ -1,16 +1,22 @@
 """
 API routes for the multimodal worker service
 """
+import asyncio
+import hashlib
 import logging
 import os
+import re
 import tempfile
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 import aiofiles
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, BackgroundTasks, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from .processors import ImageProcessor, VideoProcessor, TextProcessor
+from .processors import ImageProcessor, VideoProcessor, TextProcessor, resolve_caption_profile
+from .ingestion import ingestion_coordinator
+from .jobs import JobQueue, JobQueueError, QueueFullError
 from .config import settings
 
 logger = logging.getLogger(__name__)
@@ -24,6 +30,10 @@ class ProcessingResult(BaseModel):
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
+class PreflightRequest(BaseModel):
+    content_hash: str  # SHA-256 of the file, hex encoded
+    file_size: Optional[int] = None
+
 class TextProcessingRequest(BaseModel):
     text: str
     document_name: Optional[str] = None
@@ -36,104 +46,325 @@ class SearchRequest(BaseModel):
     filters: Optional[Dict[str, Any]] = None
 
 # Dependency to get managers from app state
-async def get_managers(request):
-    """Get managers from FastAPI app state"""
+async def get_managers(request: Request) -> Dict[str, Any]:
+    """Get the lifespan-initialized managers from FastAPI app state
+    
+    The returned dict is built per request, but the managers themselves are
+    the shared instances created in ``main.lifespan`` - models stay resident
+    and the database pool is reused across requests. Fails fast with 503 if
+    the service has not finished loading its models.
+    """
+    state = request.app.state
+    model_manager = getattr(state, 'model_manager', None)
+    db_manager = getattr(state, 'db_manager', None)
+    storage_manager = getattr(state, 'storage_manager', None)
+    cache_manager = getattr(state, 'cache_manager', None)
+    
+    if model_manager is None or not model_manager.is_ready:
+        raise HTTPException(status_code=503, detail="Models are not loaded yet")
+    if db_manager is None or storage_manager is None:
+        raise HTTPException(status_code=503, detail="Service is not initialized yet")
+    
+    return {
+        'model_manager': model_manager,
+        'db_manager': db_manager,
+        'storage_manager': storage_manager,
+        'cache_manager': cache_manager
+    }
+
+async def save_upload(file: UploadFile, directory: Optional[str] = None) -> Tuple[str, str, int]:
+    """Stream an upload to a temporary file, hashing it in the same pass
+    
+    The upload is copied in ``upload_chunk_size`` chunks, so memory use stays
+    bounded whatever the file size. Returns the temp path, SHA-256 and size.
+    """
+    sha256_hash = hashlib.sha256()
+    file_size = 0
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or "")[1], dir=directory)
+    os.close(fd)
+    try:
+        async with aiofiles.open(temp_path, 'wb') as temp_file:
+            while chunk := await file.read(settings.upload_chunk_size):
+                file_size += len(chunk)
+                if file_size > settings.max_file_size:
+                    raise HTTPException(status_code=400, detail="File too large")
+                sha256_hash.update(chunk)
+                await temp_file.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, sha256_hash.hexdigest(), file_size
+
+def remove_upload(temp_path: str):
+    """Delete a temporary upload if it is still there"""
+    if os.path.exists(temp_path):
+        os.unlink(temp_path)
+
+async def already_processed(db_manager, content_hash: str) -> ProcessingResult:
+    """Answer an upload whose content hash was claimed by an earlier ingestion"""
+    existing_doc = await db_manager.get_document_by_hash(content_hash)
+    return ProcessingResult(
+        success=True,
+        message="Document already processed",
+        data={"document_id": existing_doc["id"] if existing_doc else None}
+    )
+
+SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+def normalize_content_hash(content_hash: str) -> str:
+    """Validate a client-supplied SHA-256 and return it in the stored form"""
+    content_hash = content_hash.strip().lower()
+    if not SHA256_HEX.fullmatch(content_hash):
+        raise HTTPException(status_code=400, detail="content_hash must be a hex-encoded SHA-256")
+    return content_hash
+
+async def bump_corpus_generation(managers: Dict[str, Any]):
+    """Let the retrieval proxy know the corpus changed, so cached searches include the new document"""
+    cache_manager = managers.get('cache_manager')
+    if cache_manager is None:
+        return
+    try:
+        await cache_manager.bump_corpus_generation()
+    except Exception as e:
+        logger.error(f"Failed to bump corpus generation: {e}")
+
+@router.post("/process/preflight")
+async def preflight_endpoint(request: PreflightRequest, req: Request):
+    """Check by content hash whether a file is already ingested, before uploading it"""
+    content_hash = normalize_content_hash(request.content_hash)
+    try:
+        db_manager = req.app.state.db_manager
+        existing_doc = await db_manager.get_document_by_hash(content_hash)
+    except Exception as e:
+        logger.error(f"Preflight lookup failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # A size mismatch means the client hashed something else
+    exists = existing_doc is not None and (
+        request.file_size is None or request.file_size == existing_doc.get("file_size")
+    )
     return {
-        'model_manager': request.app.state.model_manager,
-        'db_manager': request.app.state.db_manager,
-        'storage_manager': request.app.state.storage_manager
+        "content_hash": content_hash,
+        "exists": exists,
+        "document_id": existing_doc["id"] if exists else None
     }
 
+UPLOAD_KINDS = {"image": "an image", "video": "a video"}
+
+def validate_upload(file: UploadFile, kind: str, caption_profile: Optional[str]) -> str:
+    """Check an upload's type and size, returning its resolved caption profile"""
+    # Validate file type
+    if not file.content_type.startswith(f'{kind}/'):
+        raise HTTPException(status_code=400, detail=f"File must be {UPLOAD_KINDS[kind]}")
+    
+    # Validate caption decoding profile
+    try:
+        caption_profile = resolve_caption_profile(caption_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Check file size
+    if file.size > settings.max_file_size:
+        raise HTTPException(status_code=400, detail="File too large")
+    
+    return caption_profile
+
+async def ingest_image(managers: Dict[str, Any], temp_path: str, file_hash: str, file_size: int,
+                       filename: str, content_type: str, document_name: Optional[str] = None,
+                       caption_profile: Optional[str] = None, progress=None) -> ProcessingResult:
+    """Create the document for an uploaded image and run the image pipeline
+    
+    Shared by ``/process/image`` and image jobs; the caller removes ``temp_path``.
+    """
+    db_manager = managers['db_manager']
+    
+    # Check if document already exists
+    existing_doc = await db_manager.get_document_by_hash(file_hash)
+    if existing_doc:
+        return ProcessingResult(
+            success=True,
+            message="Document already processed",
+            data={"document_id": existing_doc["id"]}
+        )
+    
+    # Create document record, unless another request claimed the hash first
+    document_id = await db_manager.create_document(
+        filename=document_name or filename,
+        file_type="image",
+        file_size=file_size,
+        mime_type=content_type,
+        content_hash=file_hash,
+        metadata={"original_filename": filename}
+    )
+    if document_id is None:
+        return await already_processed(db_manager, file_hash)
+    
+    # Process image
+    processor = ImageProcessor(managers['model_manager'], db_manager, managers['storage_manager'])
+    result = await processor.process_image(
+        temp_path, document_id, caption_profile, file_hash=file_hash, progress=progress
+    )
+    await bump_corpus_generation(managers)
+    
+    return ProcessingResult(
+        success=True,
+        message="Image processed successfully",
+        data={
+            "document_id": document_id,
+            "image_id": result["image_id"],
+            "caption": result["caption"],
+            "caption_profile": caption_profile,
+            "dimensions": result["dimensions"],
+            "storage_path": result["storage_path"]
+        }
+    )
+
+async def ingest_video(managers: Dict[str, Any], temp_path: str, file_hash: str, file_size: int,
+                       filename: str, content_type: str, document_name: Optional[str] = None,
+                       caption_profile: Optional[str] = None, progress=None) -> ProcessingResult:
+    """Create the document for an uploaded video and run the video pipeline
+    
+    Shared by ``/process/video`` and video jobs; the caller removes ``temp_path``.
+    """
+    db_manager = managers['db_manager']
+    
+    # Check if document already exists
+    existing_doc = await db_manager.get_document_by_hash(file_hash)
+    if existing_doc:
+        return ProcessingResult(
+            success=True,
+            message="Document already processed",
+            data={"document_id": existing_doc["id"]}
+        )
+    
+    # Create document record, unless another request claimed the hash first
+    document_id = await db_manager.create_document(
+        filename=document_name or filename,
+        file_type="video",
+        file_size=file_size,
+        mime_type=content_type,
+        content_hash=file_hash,
+        metadata={"original_filename": filename}
+    )
+    if document_id is None:
+        return await already_processed(db_manager, file_hash)
+    
+    # Process video
+    processor = VideoProcessor(managers['model_manager'], db_manager, managers['storage_manager'])
+    result = await processor.process_video(
+        temp_path, document_id, caption_profile, file_hash=file_hash, progress=progress
+    )
+    await bump_corpus_generation(managers)
+    
+    return ProcessingResult(
+        success=True,
+        message="Video processed successfully",
+        data={
+            "document_id": document_id,
+            "video_id": result["video_id"],
+            "transcription": result["transcription"],
+            "keyframes_count": len(result["keyframes"]),
+            "duration": result["duration"],
+            "storage_path": result["storage_path"]
+        }
+    )
+
+async def ingest_text(managers: Dict[str, Any], text: str, text_hash: str,
+                      document_name: Optional[str] = None,
+                      metadata: Optional[Dict[str, Any]] = None) -> ProcessingResult:
+    """Create the document for a text and run the text pipeline"""
+    db_manager = managers['db_manager']
+    
+    # Check if document already exists
+    existing_doc = await db_manager.get_document_by_hash(text_hash)
+    if existing_doc:
+        return ProcessingResult(
+            success=True,
+            message="Document already processed",
+            data={"document_id": existing_doc["id"]}
+        )
+    
+    # Create document record, unless another request claimed the hash first
+    document_id = await db_manager.create_document(
+        filename=document_name or "text_document",
+        file_type="text",
+        file_size=len(text.encode()),
+        mime_type="text/plain",
+        content_hash=text_hash,
+        metadata=metadata or {}
+    )
+    if document_id is None:
+        return await already_processed(db_manager, text_hash)
+    
+    # Process text
+    processor = TextProcessor(managers['model_manager'], db_manager, managers['storage_manager'])
+    result = await processor.process_text(text, document_id)
+    await bump_corpus_generation(managers)
+    
+    return ProcessingResult(
+        success=True,
+        message="Text processed successfully",
+        data={
+            "document_id": document_id,
+            "chunks_count": result["total_chunks"]
+        }
+    )
+
+async def process_upload(managers: Dict[str, Any], ingest, file: UploadFile,
+                         document_name: Optional[str], caption_profile: str,
+                         content_hash: Optional[str]) -> ProcessingResult:
+    """Run an upload through its pipeline while the client waits"""
+    # Skip everything below for content the client already knows we have
+    if content_hash:
+        content_hash = normalize_content_hash(content_hash)
+        existing_doc = await managers['db_manager'].get_document_by_hash(content_hash)
+        if existing_doc:
+            return ProcessingResult(
+                success=True,
+                message="Document already processed",
+                data={"document_id": existing_doc["id"]}
+            )
+    
+    # Stream the upload to a temporary file, hashing it on the way
+    temp_path, file_hash, file_size = await save_upload(file)
+    
+    if content_hash and content_hash != file_hash:
+        remove_upload(temp_path)
+        raise HTTPException(status_code=400, detail="content_hash does not match the uploaded file")
+    
+    async def run() -> ProcessingResult:
+        try:
+            return await ingest(
+                managers, temp_path, file_hash, file_size, file.filename, file.content_type,
+                document_name=document_name, caption_profile=caption_profile
+            )
+        finally:
+            # Clean up temp file
+            remove_upload(temp_path)
+    
+    # Identical uploads share one processing run; a joining request drops its own copy
+    return await ingestion_coordinator.run(file_hash, run, discard=lambda: remove_upload(temp_path))
+
 @router.post("/process/image", response_model=ProcessingResult)
 async def process_image_endpoint(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     document_name: Optional[str] = Form(None),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    caption_profile: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None),
+    managers: Dict[str, Any] = Depends(get_managers)
 ):
-    """Process an uploaded image"""
+    """Process an uploaded image
+    
+    ``content_hash`` is an optional SHA-256 of the file. Known content is
+    answered before the upload is copied, and the hash is verified once it is.
+    """
     try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Check file size
-        if file.size > settings.max_file_size:
-            raise HTTPException(status_code=400, detail="File too large")
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            temp_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Get managers (this would need to be properly injected in a real implementation)
-        from fastapi import Request
-        # Note: In production, you'd use proper dependency injection
-        
-        # Create document record
-        from .database import DatabaseManager
-        from .storage import StorageManager
-        from .models import ModelManager
-        
-        # This is a simplified version - in production you'd get these from DI
-        db_manager = DatabaseManager()
-        await db_manager.initialize()
-        
-        storage_manager = StorageManager()
-        await storage_manager.initialize()
-        
-        model_manager = ModelManager()
-        await model_manager.load_models()
-        
-        try:
-            # Calculate file hash
-            file_hash = storage_manager.calculate_file_hash(temp_path)
-            
-            # Check if document already exists
-            existing_doc = await db_manager.get_document_by_hash(file_hash)
-            if existing_doc:
-                return ProcessingResult(
-                    success=True,
-                    message="Document already processed",
-                    data={"document_id": existing_doc["id"]}
-                )
-            
-            # Create document record
-            document_id = await db_manager.create_document(
-                filename=document_name or file.filename,
-                file_type="image",
-                file_size=file.size,
-                mime_type=file.content_type,
-                content_hash=file_hash,
-                metadata={"original_filename": file.filename}
-            )
-            
-            # Process image
-            processor = ImageProcessor(model_manager, db_manager, storage_manager)
-            result = await processor.process_image(temp_path, document_id)
-            
-            return ProcessingResult(
-                success=True,
-                message="Image processed successfully",
-                data={
-                    "document_id": document_id,
-                    "image_id": result["image_id"],
-                    "caption": result["caption"],
-                    "dimensions": result["dimensions"],
-                    "storage_path": result["storage_path"]
-                }
-            )
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            
-            # Clean up managers
-            await db_manager.close()
-            await storage_manager.close()
-            await model_manager.cleanup()
+        caption_profile = validate_upload(file, "image", caption_profile)
+        return await process_upload(managers, ingest_image, file, document_name, caption_profile, content_hash)
             
     except Exception as e:
         logger.error(f"Failed to process image: {e}")
@@ -148,87 +379,19 @@ async def process_video_endpoint(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     document_name: Optional[str] = Form(None),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    caption_profile: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None),
+    managers: Dict[str, Any] = Depends(get_managers)
 ):
-    """Process an uploaded video"""
+    """Process an uploaded video
+    
+    ``content_hash`` is an optional SHA-256 of the file. Known content is
+    answered before the upload is copied, and the hash is verified once it is.
+    """
     try:
-        # Validate file type
-        if not file.content_type.startswith('video/'):
-            raise HTTPException(status_code=400, detail="File must be a video")
-        
-        # Check file size
-        if file.size > settings.max_file_size:
-            raise HTTPException(status_code=400, detail="File too large")
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            temp_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Initialize managers (simplified for this example)
-        from .database import DatabaseManager
-        from .storage import StorageManager
-        from .models import ModelManager
-        
-        db_manager = DatabaseManager()
-        await db_manager.initialize()
-        
-        storage_manager = StorageManager()
-        await storage_manager.initialize()
-        
-        model_manager = ModelManager()
-        await model_manager.load_models()
-        
-        try:
-            # Calculate file hash
-            file_hash = storage_manager.calculate_file_hash(temp_path)
-            
-            # Check if document already exists
-            existing_doc = await db_manager.get_document_by_hash(file_hash)
-            if existing_doc:
-                return ProcessingResult(
-                    success=True,
-                    message="Document already processed",
-                    data={"document_id": existing_doc["id"]}
-                )
-            
-            # Create document record
-            document_id = await db_manager.create_document(
-                filename=document_name or file.filename,
-                file_type="video",
-                file_size=file.size,
-                mime_type=file.content_type,
-                content_hash=file_hash,
-                metadata={"original_filename": file.filename}
-            )
-            
-            # Process video
-            processor = VideoProcessor(model_manager, db_manager, storage_manager)
-            result = await processor.process_video(temp_path, document_id)
-            
-            return ProcessingResult(
-                success=True,
-                message="Video processed successfully",
-                data={
-                    "document_id": document_id,
-                    "video_id": result["video_id"],
-                    "transcription": result["transcription"],
-                    "keyframes_count": len(result["keyframes"]),
-                    "duration": result["duration"],
-                    "storage_path": result["storage_path"]
-                }
-            )
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            
-            # Clean up managers
-            await db_manager.close()
-            await storage_manager.close()
-            await model_manager.cleanup()
+        caption_profile = validate_upload(file, "video", caption_profile)
+        return await process_upload(managers, ingest_video, file, document_name, caption_profile, content_hash)
             
     except Exception as e:
         logger.error(f"Failed to process video: {e}")
@@ -239,66 +402,21 @@ async def process_video_endpoint(
         )
 
 @router.post("/process/text", response_model=ProcessingResult)
-async def process_text_endpoint(request: TextProcessingRequest):
+async def process_text_endpoint(
+    request: TextProcessingRequest,
+    managers: Dict[str, Any] = Depends(get_managers)
+):
     """Process text input"""
     try:
-        # Initialize managers (simplified)
-        from .database import DatabaseManager
-        from .storage import StorageManager
-        from .models import ModelManager
-        
-        db_manager = DatabaseManager()
-        await db_manager.initialize()
-        
-        storage_manager = StorageManager()
-        await storage_manager.initialize()
+        # Calculate text hash
+        text_hash = hashlib.sha256(request.text.encode()).hexdigest()
         
-        model_manager = ModelManager()
-        await model_manager.load_models()
+        # Identical texts submitted concurrently share one processing run
+        return await ingestion_coordinator.run(text_hash, partial(
+            ingest_text, managers, request.text, text_hash,
+            document_name=request.document_name, metadata=request.metadata
+        ))
         
-        try:
-            # Calculate text hash
-            import hashlib
-            text_hash = hashlib.sha256(request.text.encode()).hexdigest()
-            
-            # Check if document already exists
-            existing_doc = await db_manager.get_document_by_hash(text_hash)
-            if existing_doc:
-                return ProcessingResult(
-                    success=True,
-                    message="Document already processed",
-                    data={"document_id": existing_doc["id"]}
-                )
-            
-            # Create document record
-            document_id = await db_manager.create_document(
-                filename=request.document_name or "text_document",
-                file_type="text",
-                file_size=len(request.text.encode()),
-                mime_type="text/plain",
-                content_hash=text_hash,
-                metadata=request.metadata or {}
-            )
-            
-            # Process text
-            processor = TextProcessor(model_manager, db_manager, storage_manager)
-            result = await processor.process_text(request.text, document_id)
-            
-            return ProcessingResult(
-                success=True,
-                message="Text processed successfully",
-                data={
-                    "document_id": document_id,
-                    "chunks_count": result["total_chunks"]
-                }
-            )
-            
-        finally:
-            # Clean up managers
-            await db_manager.close()
-            await storage_manager.close()
-            await model_manager.cleanup()
-            
     except Exception as e:
         logger.error(f"Failed to process text: {e}")
         return ProcessingResult(
@@ -307,21 +425,216 @@ async def process_text_endpoint(request: TextProcessingRequest):
             error=str(e)
         )
 
+# Ingestion job endpoints
+async def run_upload_job(managers: Dict[str, Any], ingest, payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Job handler for spooled uploads; the spool file is kept if the worker is stopped mid-job"""
+    temp_path = payload["temp_path"]
+    run = partial(ingest, managers, progress=progress, **payload)
+    try:
+        result = await ingestion_coordinator.run(
+            payload["file_hash"], run, discard=lambda: remove_upload(temp_path)
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        remove_upload(temp_path)
+        raise
+    remove_upload(temp_path)
+    return result.model_dump()
+
+async def run_text_job(managers: Dict[str, Any], payload: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Job handler for texts"""
+    text_hash = hashlib.sha256(payload["text"].encode()).hexdigest()
+    await progress("processing", 0.1)
+    result = await ingestion_coordinator.run(text_hash, partial(
+        ingest_text, managers, payload["text"], text_hash,
+        document_name=payload.get("document_name"), metadata=payload.get("metadata")
+    ))
+    return result.model_dump()
+
+def job_handlers(managers: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handlers for the ingestion queue, bound to the service managers"""
+    return {
+        "image": partial(run_upload_job, managers, ingest_image),
+        "video": partial(run_upload_job, managers, ingest_video),
+        "text": partial(run_text_job, managers)
+    }
+
+def get_job_queue(req: Request) -> JobQueue:
+    """Get the lifespan-started job queue, failing with 503 before it exists"""
+    job_queue = getattr(req.app.state, 'job_queue', None)
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not initialized yet")
+    return job_queue
+
+def job_queue_error(e: JobQueueError) -> HTTPException:
+    """Map a rejected submission to 429 (retry later) or 503"""
+    if isinstance(e, QueueFullError):
+        return HTTPException(status_code=429, detail=str(e),
+                             headers={"Retry-After": str(settings.job_retry_after)})
+    return HTTPException(status_code=503, detail=str(e))
+
+async def enqueue_job(req: Request, job_queue: JobQueue, kind: str, payload: Dict[str, Any]) -> JSONResponse:
+    """Queue a job and answer 202 with its ID and status URL"""
+    try:
+        job = await job_queue.submit(kind, payload)
+    except JobQueueError as e:
+        raise job_queue_error(e)
+    return JSONResponse(status_code=202, content={
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": str(req.url_for("get_job", job_id=job["id"]))
+    })
+
+async def submit_upload_job(req: Request, kind: str, file: UploadFile, document_name: Optional[str],
+                            caption_profile: Optional[str], content_hash: Optional[str]) -> JSONResponse:
+    """Validate, spool and queue an upload"""
+    job_queue = get_job_queue(req)
+    caption_profile = validate_upload(file, kind, caption_profile)
+    if content_hash:
+        content_hash = normalize_content_hash(content_hash)
+    
+    # Turn bursts away before copying the upload
+    try:
+        await job_queue.check_capacity()
+    except JobQueueError as e:
+        raise job_queue_error(e)
+    
+    # Spool the upload where a job worker can still find it after a restart
+    temp_path, file_hash, file_size = await save_upload(file, directory=settings.job_spool_dir)
+    if content_hash and content_hash != file_hash:
+        remove_upload(temp_path)
+        raise HTTPException(status_code=400, detail="content_hash does not match the uploaded file")
+    
+    payload = {
+        "temp_path": temp_path,
+        "file_hash": file_hash,
+        "file_size": file_size,
+        "filename": file.filename,
+        "content_type": file.content_type,
+        "document_name": document_name,
+        "caption_profile": caption_profile
+    }
+    try:
+        return await enqueue_job(req, job_queue, kind, payload)
+    except BaseException:
+        remove_upload(temp_path)
+        raise
+
+@router.post("/jobs/image", status_code=202)
+async def submit_image_job(
+    req: Request,
+    file: UploadFile = File(...),
+    document_name: Optional[str] = Form(None),
+    caption_profile: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None)
+):
+    """Queue an uploaded image for processing and return its job ID"""
+    return await submit_upload_job(req, "image", file, document_name, caption_profile, content_hash)
+
+@router.post("/jobs/video", status_code=202)
+async def submit_video_job(
+    req: Request,
+    file: UploadFile = File(...),
+    document_name: Optional[str] = Form(None),
+    caption_profile: Optional[str] = Form(None),
+    content_hash: Optional[str] = Form(None)
+):
+    """Queue an uploaded video for processing and return its job ID"""
+    return await submit_upload_job(req, "video", file, document_name, caption_profile, content_hash)
+
+@router.post("/jobs/text", status_code=202)
+async def submit_text_job(request: TextProcessingRequest, req: Request):
+    """Queue a text for processing and return its job ID"""
+    return await enqueue_job(req, get_job_queue(req), "text", request.model_dump())
+
+@router.get("/jobs")
+async def get_job_queue_stats(req: Request):
+    """Get job queue depth, admission limit and job counters"""
+    return await get_job_queue(req).get_stats()
+
+@router.get("/jobs/{job_id}", name="get_job")
+async def get_job(job_id: str, req: Request):
+    """Get a job's status and progress through the pipeline stages"""
+    job = await get_job_queue(req).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("payload", None)
+    job.pop("result", None)
+    return job
+
+@router.get("/jobs/{job_id}/result", response_model=ProcessingResult)
+async def get_job_result(job_id: str, req: Request):
+    """Get a finished job's processing result"""
+    job = await get_job_queue(req).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        return ProcessingResult(
+            success=False,
+            message=f"Failed to process {job['kind']}",
+            error=job.get("error")
+        )
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
+
 @router.get("/models/status")
-async def get_models_status():
-    """Get status of loaded models"""
+async def get_models_status(request: Request):
+    """Get status of each model with its load wall time, size and device"""
     try:
-        # This would check the actual model status in production
+        model_manager = request.app.state.model_manager
         return {
-            "clip": "loaded",
-            "blip": "loaded", 
-            "whisper": "loaded",
-            "sentence_transformer": "loaded"
+            "models": model_manager.get_model_status(),
+            "startup": model_manager.get_startup_report()
         }
     except Exception as e:
         logger.error(f"Failed to get models status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/models/memory")
+async def get_models_memory(request: Request):
+    """Get resident models, their memory footprint and eviction counts"""
+    try:
+        model_manager = request.app.state.model_manager
+        return model_manager.get_memory_stats()
+    except Exception as e:
+        logger.error(f"Failed to get model memory stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models/caption-profiles")
+async def get_caption_profiles():
+    """List the available caption decoding profiles"""
+    return {
+        "default": settings.default_caption_profile,
+        "profiles": settings.caption_profiles
+    }
+
+@router.get("/models/batching")
+async def get_batching_stats(request: Request):
+    """Get micro-batching statistics (batch fill ratio, queue wait time)"""
+    try:
+        model_manager = request.app.state.model_manager
+        return model_manager.get_batching_stats()
+    except Exception as e:
+        logger.error(f"Failed to get batching stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/models/executor")
+async def get_executor_stats(request: Request):
+    """Get inference executor queue depth and saturation per model family"""
+    try:
+        executor = request.app.state.inference_executor
+        return executor.get_stats()
+    except Exception as e:
+        logger.error(f"Failed to get executor stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/process/ingestion")
+async def get_ingestion_stats():
+    """Get in-flight ingestions and how many duplicate uploads joined one"""
+    return ingestion_coordinator.get_stats()
+
 @router.get("/storage/status")
 async def get_storage_status():
     """Get storage system status"""
@@ -349,7 +662,7 @@ async def get_cache_stats(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/cache/clear")
-async def clear_cache(req):
+async def clear_cache(req: Request):
     """Clear all cache entries"""
     try:
         cache_manager = req.app.state.cache_manager
@@ -363,7 +676,7 @@ async def clear_cache(req):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/cache/file/{file_hash}")
-async def invalidate_file_cache(file_hash: str, req):
+async def invalidate_file_cache(file_hash: str, req: Request):
     """Invalidate cache entries for a specific file"""
     try:
         cache_manager = req.app.state.cache_manager
@@ -0,0 +1,169 @@
+"""
+Dynamic micro-batching for model inference
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .executor import inference_executor
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collects concurrent inference requests into batched forward passes
+
+    Callers ``submit`` a single item and await its result. A background task
+    drains the queue into a batch of up to ``max_batch_size`` items, waiting at
+    most ``max_wait_ms`` after the first item arrives, runs ``batch_fn`` once
+    on the whole batch and hands each caller its own row back. If ``family``
+    is set, ``batch_fn`` runs on the inference executor under that family's
+    concurrency limit.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0,
+                 family: Optional[str] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.name = name
+        self.batch_fn = batch_fn
+        self.family = family
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.batches_processed = 0
+        self.items_processed = 0
+        self.failed_batches = 0
+        self._fill_ratio_total = 0.0
+        self._queue_wait_total_ms = 0.0
+        self._queue_wait_max_ms = 0.0
+
+    def _ensure_worker(self):
+        """Start the batching task on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item for the next batch and wait for its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Block for the first item, then fill the batch until size or time limit"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Batching loop"""
+        while True:
+            batch = await self._collect_batch()
+
+            # Drop callers that gave up while queued
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            started_at = time.perf_counter()
+            items = [entry[0] for entry in batch]
+
+            try:
+                results = await self._execute(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"Batch function for '{self.name}' returned {len(results)} "
+                        f"results for {len(items)} items"
+                    )
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"Batcher '{self.name}' closed"))
+                raise
+            except Exception as e:
+                logger.error(f"Batch inference failed for {self.name}: {e}")
+                self.failed_batches += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+            self._record_batch(batch, started_at)
+
+    async def _execute(self, items: List[Any]) -> List[Any]:
+        """Run the batch function on a batch of items
+        
+        Batches for a model family run on the inference executor so the
+        forward pass does not block the event loop.
+        """
+        if self.family:
+            return list(await inference_executor.run(self.family, self.batch_fn, items))
+        return list(self.batch_fn(items))
+
+    def _record_batch(self, batch: List[Tuple[Any, asyncio.Future, float]], started_at: float):
+        """Update fill ratio and queue wait metrics for a completed batch"""
+        self.batches_processed += 1
+        self.items_processed += len(batch)
+        self._fill_ratio_total += len(batch) / self.max_batch_size
+
+        for _, _, enqueued_at in batch:
+            wait_ms = (started_at - enqueued_at) * 1000.0
+            self._queue_wait_total_ms += wait_ms
+            self._queue_wait_max_ms = max(self._queue_wait_max_ms, wait_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        batches = self.batches_processed
+        items = self.items_processed
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches_processed": batches,
+            "items_processed": items,
+            "failed_batches": self.failed_batches,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": (items / batches) if batches else 0,
+            "avg_fill_ratio": (self._fill_ratio_total / batches) if batches else 0,
+            "avg_queue_wait_ms": (self._queue_wait_total_ms / items) if items else 0,
+            "max_queue_wait_ms": self._queue_wait_max_ms
+        }
+
+    async def close(self):
+        """Stop the batching task and fail any queued requests"""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        if self._queue:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Batcher '{self.name}' closed"))
+
+        self._worker = None
@@ -1,26 +1,128 @@
 """
 Redis cache manager for multimodal worker service
 """
+import asyncio
+import fnmatch
 import json
 import hashlib
 import logging
-import pickle
-from typing import Any, Optional, Dict, List
+import time
+from collections import defaultdict, OrderedDict
+from typing import Any, Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
 import redis.asyncio as aioredis
 import numpy as np
 from app.config import settings
+from app.embedding_codec import encode_embedding, decode_embedding, is_encoded, load_legacy_pickle
 
 logger = logging.getLogger(__name__)
 
+# Cache key namespaces, each tracked in a sorted set of key -> expiry time
+NAMESPACES = ("model", "embedding", "processing")
+INDEX_VERSION_KEY = "index:version"
+INDEX_VERSION = "1"
+CLEAR_BATCH_SIZE = 500  # Keys deleted per round trip when clearing the cache
+
+# Folded into the retrieval proxy's search cache keys; bumped on every ingestion
+CORPUS_GENERATION_KEY = "corpus:generation"
+CORPUS_GENERATION_CHANNEL = "corpus:generation"
+
+
+class LocalCache:
+    """Size-bounded in-process LRU cache with a per-entry TTL
+    
+    Sits in front of Redis and uses the same keys. Only touched from the
+    event loop, so it needs no locking.
+    
+    Mirrors the LocalCache in services/retrieval-proxy/app/cache.py. The two
+    services build from separate Docker contexts and share no package, so
+    the copies are kept identical; change both together.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get an entry, or None if it is missing or expired"""
+        if not self.enabled:
+            return None
+        
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, key: str, value: Any):
+        """Add or replace an entry, evicting the least recently used when full"""
+        if not self.enabled:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, pattern: str) -> int:
+        """Drop entries whose key matches a glob-style pattern"""
+        keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get entry counts and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total * 100) if total > 0 else 0,
+            "invalidations": self.invalidations
+        }
+
 
 class ModelCacheManager:
     """Redis cache manager for multimodal worker model operations"""
     
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
+        self.corpus_redis: Optional[aioredis.Redis] = None
         self.connected = False
+        
+        # In-process tier in front of Redis for embeddings
+        self.local_cache = LocalCache(settings.embedding_l1_max_entries, settings.embedding_l1_ttl)
+        self.invalidation_channel = f"{settings.service_name}:cache:invalidate"
+        self._invalidation_task: Optional[asyncio.Task] = None
+        self._backfill_task: Optional[asyncio.Task] = None
+        
+        # Embedding lookups per model key, over both tiers
+        self.embedding_hits: Dict[str, int] = defaultdict(int)
+        self.embedding_misses: Dict[str, int] = defaultdict(int)
+        
+        # Redis lookups that missed the in-process tier
+        self.l2_hits = 0
+        self.l2_misses = 0
     
     async def initialize(self):
         """Initialize Redis connection"""
@@ -36,6 +138,21 @@ class ModelCacheManager:
             self.connected = True
             logger.info(f"Connected to Redis at {settings.redis_host}:{settings.redis_port}")
             
+            if self.local_cache.enabled:
+                self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+            
+            # The corpus generation lives next to the search cache it versions
+            if settings.corpus_generation_redis_db == settings.redis_db:
+                self.corpus_redis = self.redis
+            else:
+                self.corpus_redis = aioredis.from_url(
+                    f"redis://{settings.redis_host}:{settings.redis_port}/{settings.corpus_generation_redis_db}"
+                )
+            
+            # Index keys written before the indexes existed, once per database
+            if await self.redis.set(INDEX_VERSION_KEY, INDEX_VERSION, nx=True):
+                self._backfill_task = asyncio.create_task(self._backfill_indexes())
+        
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
             self.connected = False
@@ -44,11 +161,114 @@ class ModelCacheManager:
     
     async def close(self):
         """Close Redis connection"""
+        if self._backfill_task and not self._backfill_task.done():
+            self._backfill_task.cancel()
+        
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+        
+        if self.corpus_redis and self.corpus_redis is not self.redis:
+            await self.corpus_redis.close()
+        self.corpus_redis = None
+        
         if self.redis:
             await self.redis.close()
             self.connected = False
             logger.info("Redis connection closed")
     
+    async def _listen_for_invalidations(self):
+        """Apply in-process cache invalidations published by any replica"""
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.invalidation_channel)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                pattern = message["data"].decode("utf-8")
+                dropped = self.local_cache.invalidate(pattern)
+                logger.debug(f"Invalidated {dropped} local cache entries matching {pattern}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener stopped: {e}")
+        finally:
+            await pubsub.aclose()
+    
+    async def _publish_invalidation(self, pattern: str):
+        """Drop matching in-process entries here and on every other replica"""
+        self.local_cache.invalidate(pattern)
+        try:
+            await self.redis.publish(self.invalidation_channel, pattern)
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {e}")
+    
+    async def bump_corpus_generation(self) -> Optional[int]:
+        """Advance the corpus generation after a document is committed
+        
+        Search results cached by the retrieval proxy under older generations
+        become unreachable and age out on their TTL.
+        """
+        if not self.connected:
+            return None
+        
+        try:
+            generation = await self.corpus_redis.incr(CORPUS_GENERATION_KEY)
+            await self.redis.publish(CORPUS_GENERATION_CHANNEL, generation)
+            return generation
+        except Exception as e:
+            logger.error(f"Error bumping corpus generation: {e}")
+            return None
+    
+    def _namespace_index(self, namespace: str) -> str:
+        """Get the sorted set indexing a key namespace"""
+        return f"index:ns:{namespace}"
+    
+    def _file_index(self, file_hash: str) -> str:
+        """Get the sorted set indexing the keys derived from a file or content hash"""
+        return f"index:file:{file_hash}"
+    
+    def _index_key(self, pipe, cache_key: str, ttl: int, file_hash: Optional[str] = None):
+        """Queue index updates for a key written with a TTL
+        
+        Members are scored by expiry time, so expired keys can be pruned and
+        live keys counted without touching the rest of the keyspace.
+        """
+        now = time.time()
+        namespace_index = self._namespace_index(cache_key.split(":", 1)[0])
+        pipe.zremrangebyscore(namespace_index, "-inf", now)
+        pipe.zadd(namespace_index, {cache_key: now + ttl})
+        if file_hash:
+            index = self._file_index(file_hash)
+            pipe.zadd(index, {cache_key: now + ttl})
+            # Keep the index as long as its longest-lived key
+            pipe.expire(index, ttl, nx=True)
+            pipe.expire(index, ttl, gt=True)
+    
+    async def _backfill_indexes(self):
+        """Index existing cache keys with incremental SCAN cursors"""
+        try:
+            indexed = 0
+            for namespace in NAMESPACES:
+                async for cache_key in self.redis.scan_iter(match=f"{namespace}:*", count=1000):
+                    ttl = await self.redis.ttl(cache_key)
+                    if ttl <= 0:
+                        continue
+                    file_hash = None
+                    if namespace != "model":
+                        file_hash = cache_key.decode("utf-8").rsplit(":", 1)[-1]
+                    pipe = self.redis.pipeline(transaction=False)
+                    self._index_key(pipe, cache_key.decode("utf-8"), ttl, file_hash)
+                    await pipe.execute()
+                    indexed += 1
+            logger.info(f"Indexed {indexed} existing cache keys")
+        except Exception as e:
+            logger.error(f"Error indexing existing cache keys: {e}")
+    
     def _generate_model_key(self, model_name: str, model_type: str, **kwargs) -> str:
         """Generate a cache key for model data"""
         cache_data = {
@@ -68,7 +288,7 @@ class ModelCacheManager:
         """Get cached model metadata"""
         if not self.connected:
             return None
-            
+        
         try:
             cache_key = self._generate_model_key(model_name, model_type)
             cached_data = await self.redis.get(cache_key)
@@ -76,7 +296,7 @@ class ModelCacheManager:
             if cached_data:
                 logger.debug(f"Cache hit for model metadata: {model_name}")
                 return json.loads(cached_data.decode('utf-8'))
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving model metadata from cache: {e}")
         
@@ -87,7 +307,7 @@ class ModelCacheManager:
         """Cache model metadata"""
         if not self.connected:
             return False
-            
+        
         try:
             cache_key = self._generate_model_key(model_name, model_type)
             
@@ -99,57 +319,170 @@ class ModelCacheManager:
                 "model_type": model_type
             }
             
-            await self.redis.setex(cache_key, ttl, json.dumps(cache_data))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(cache_key, ttl, json.dumps(cache_data))
+            self._index_key(pipe, cache_key, ttl)
+            await pipe.execute()
             logger.debug(f"Cached model metadata for: {model_name}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error caching model metadata: {e}")
             return False
     
+    async def _decode_embedding(self, cache_key: str, data: bytes, model_name: str) -> Optional[np.ndarray]:
+        """Decode a cached embedding, migrating entries pickled by older versions"""
+        if is_encoded(data):
+            return decode_embedding(data, revision=model_name)
+        
+        embedding = load_legacy_pickle(data)
+        try:
+            await self.redis.set(cache_key, self._encode_embedding(embedding, model_name), keepttl=True)
+            logger.debug(f"Migrated pickled embedding: {cache_key}")
+        except Exception as e:
+            logger.error(f"Error migrating pickled embedding {cache_key}: {e}")
+        return embedding
+    
+    def _encode_embedding(self, embedding: np.ndarray, model_name: str) -> bytes:
+        """Encode an embedding in the compact binary cache format"""
+        return encode_embedding(embedding, model_name, dtype=settings.embedding_cache_dtype)
+    
     async def get_embedding(self, content_hash: str, model_name: str) -> Optional[np.ndarray]:
         """Get cached embedding"""
         if not self.connected:
             return None
-            
+        
+        cache_key = self._generate_embedding_key(content_hash, model_name)
+        embedding = self.local_cache.get(cache_key)
+        if embedding is not None:
+            self.embedding_hits[model_name] += 1
+            return embedding
+        
         try:
-            cache_key = self._generate_embedding_key(content_hash, model_name)
             cached_data = await self.redis.get(cache_key)
             
             if cached_data:
-                logger.debug(f"Cache hit for embedding: {content_hash}")
-                # Deserialize numpy array
-                return pickle.loads(cached_data)
-            
+                embedding = await self._decode_embedding(cache_key, cached_data, model_name)
+                if embedding is not None:
+                    logger.debug(f"Cache hit for embedding: {content_hash}")
+                    self.local_cache.set(cache_key, embedding)
+                    self.l2_hits += 1
+                    self.embedding_hits[model_name] += 1
+                    return embedding
+        
         except Exception as e:
             logger.error(f"Error retrieving embedding from cache: {e}")
         
+        self.l2_misses += 1
+        self.embedding_misses[model_name] += 1
         return None
     
+    async def get_embeddings(self, content_hashes: List[str], 
+                             model_name: str) -> List[Optional[np.ndarray]]:
+        """Get several cached embeddings in one round trip, None for each miss"""
+        if not self.connected or not content_hashes:
+            return [None] * len(content_hashes)
+        
+        cache_keys = [self._generate_embedding_key(h, model_name) for h in content_hashes]
+        embeddings = [self.local_cache.get(cache_key) for cache_key in cache_keys]
+        remote = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if remote:
+            try:
+                cached_data = await self.redis.mget([cache_keys[i] for i in remote])
+                for i, data in zip(remote, cached_data):
+                    if data:
+                        embeddings[i] = await self._decode_embedding(cache_keys[i], data, model_name)
+                    if embeddings[i] is not None:
+                        self.local_cache.set(cache_keys[i], embeddings[i])
+            
+            except Exception as e:
+                logger.error(f"Error retrieving embeddings from cache: {e}")
+                for i in remote:
+                    embeddings[i] = None
+            
+            l2_hits = sum(1 for i in remote if embeddings[i] is not None)
+            self.l2_hits += l2_hits
+            self.l2_misses += len(remote) - l2_hits
+        
+        hits = sum(1 for embedding in embeddings if embedding is not None)
+        self.embedding_hits[model_name] += hits
+        self.embedding_misses[model_name] += len(embeddings) - hits
+        return embeddings
+    
     async def set_embedding(self, content_hash: str, model_name: str, 
                           embedding: np.ndarray, ttl: int = 86400) -> bool:
         """Cache embedding"""
         if not self.connected:
             return False
-            
+        
         try:
             cache_key = self._generate_embedding_key(content_hash, model_name)
             
-            # Serialize numpy array
-            serialized_embedding = pickle.dumps(embedding)
-            await self.redis.setex(cache_key, ttl, serialized_embedding)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(cache_key, ttl, self._encode_embedding(embedding, model_name))
+            self._index_key(pipe, cache_key, ttl, content_hash)
+            await pipe.execute()
+            self.local_cache.set(cache_key, embedding)
             logger.debug(f"Cached embedding for: {content_hash}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error caching embedding: {e}")
             return False
     
+    async def set_embeddings(self, embeddings: Dict[str, np.ndarray], model_name: str,
+                             ttl: int = 86400) -> bool:
+        """Cache several embeddings, keyed by content hash, in one round trip"""
+        if not self.connected or not embeddings:
+            return False
+        
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for content_hash, embedding in embeddings.items():
+                cache_key = self._generate_embedding_key(content_hash, model_name)
+                pipe.setex(cache_key, ttl, self._encode_embedding(embedding, model_name))
+                self._index_key(pipe, cache_key, ttl, content_hash)
+            await pipe.execute()
+            for content_hash, embedding in embeddings.items():
+                self.local_cache.set(self._generate_embedding_key(content_hash, model_name), embedding)
+            logger.debug(f"Cached {len(embeddings)} embeddings for: {model_name}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error caching embeddings: {e}")
+            return False
+    
+    def get_embedding_stats(self) -> Dict[str, Any]:
+        """Get embedding cache hit and miss counters overall, per tier and per model key"""
+        hits = sum(self.embedding_hits.values())
+        misses = sum(self.embedding_misses.values())
+        total = hits + misses
+        l2_total = self.l2_hits + self.l2_misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / total * 100) if total > 0 else 0,
+            "l1": self.local_cache.get_stats(),
+            "l2": {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_rate": (self.l2_hits / l2_total * 100) if l2_total > 0 else 0
+            },
+            "models": {
+                model_name: {
+                    "hits": self.embedding_hits[model_name],
+                    "misses": self.embedding_misses[model_name]
+                }
+                for model_name in sorted(set(self.embedding_hits) | set(self.embedding_misses))
+            }
+        }
+    
     async def get_processing_result(self, file_hash: str, operation: str) -> Optional[Dict[str, Any]]:
         """Get cached processing result"""
         if not self.connected:
             return None
-            
+        
         try:
             cache_key = f"processing:{operation}:{file_hash}"
             cached_data = await self.redis.get(cache_key)
@@ -157,7 +490,7 @@ class ModelCacheManager:
             if cached_data:
                 logger.debug(f"Cache hit for processing result: {operation}:{file_hash}")
                 return json.loads(cached_data.decode('utf-8'))
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving processing result from cache: {e}")
         
@@ -168,7 +501,7 @@ class ModelCacheManager:
         """Cache processing result"""
         if not self.connected:
             return False
-            
+        
         try:
             cache_key = f"processing:{operation}:{file_hash}"
             
@@ -180,10 +513,13 @@ class ModelCacheManager:
                 "operation": operation
             }
             
-            await self.redis.setex(cache_key, ttl, json.dumps(cache_data))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(cache_key, ttl, json.dumps(cache_data))
+            self._index_key(pipe, cache_key, ttl, file_hash)
+            await pipe.execute()
             logger.debug(f"Cached processing result for: {operation}:{file_hash}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error caching processing result: {e}")
             return False
@@ -192,37 +528,66 @@ class ModelCacheManager:
         """Invalidate all cache entries for a specific file"""
         if not self.connected:
             return 0
-            
+        
         try:
-            # Find all cache keys related to this file
-            patterns = [
-                f"embedding:*:{file_hash}",
-                f"processing:*:{file_hash}"
-            ]
+            # The file index holds every key derived from this file
+            index = self._file_index(file_hash)
+            keys = await self.redis.zrange(index, 0, -1)
             
             deleted_count = 0
-            for pattern in patterns:
-                keys = await self.redis.keys(pattern)
-                if keys:
-                    deleted = await self.redis.delete(*keys)
-                    deleted_count += deleted
+            pipe = self.redis.pipeline(transaction=False)
+            if keys:
+                pipe.delete(*keys)
+                by_namespace = defaultdict(list)
+                for cache_key in keys:
+                    by_namespace[cache_key.split(b":", 1)[0].decode("utf-8")].append(cache_key)
+                for namespace, namespace_keys in by_namespace.items():
+                    pipe.zrem(self._namespace_index(namespace), *namespace_keys)
+            pipe.delete(index)
+            results = await pipe.execute()
+            if keys:
+                deleted_count = results[0]
+            await self._publish_invalidation(f"embedding:*:{file_hash}")
             
             logger.info(f"Invalidated {deleted_count} cache entries for file: {file_hash}")
             return deleted_count
-            
+        
         except Exception as e:
             logger.error(f"Error invalidating file cache: {e}")
             return 0
     
+    async def _delete_namespace(self, namespace: str) -> int:
+        """Delete a namespace's indexed keys, walking its index in batches"""
+        index = self._namespace_index(namespace)
+        deleted = 0
+        batch = []
+        async for cache_key, _ in self.redis.zscan_iter(index):
+            batch.append(cache_key)
+            if len(batch) >= CLEAR_BATCH_SIZE:
+                deleted += await self._delete_indexed(index, batch)
+                batch = []
+        if batch:
+            deleted += await self._delete_indexed(index, batch)
+        return deleted
+    
+    async def _delete_indexed(self, index: str, keys: List[bytes]) -> int:
+        """Delete keys and remove them from their index"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.zrem(index, *keys)
+        deleted, _ = await pipe.execute()
+        return deleted
+    
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         if not self.connected:
-            return {"connected": False}
-            
+            return {"connected": False, "embeddings": self.get_embedding_stats()}
+        
         try:
             info = await self.redis.info()
             stats = {
                 "connected": True,
+                "embeddings": self.get_embedding_stats(),
                 "memory_used": info.get("used_memory_human", "unknown"),
                 "keyspace_hits": info.get("keyspace_hits", 0),
                 "keyspace_misses": info.get("keyspace_misses", 0),
@@ -236,31 +601,52 @@ class ModelCacheManager:
             total = hits + misses
             stats["hit_rate"] = (hits / total * 100) if total > 0 else 0
             
-            # Count cache entries by type
-            model_keys = await self.redis.keys("model:*")
-            embedding_keys = await self.redis.keys("embedding:*")
-            processing_keys = await self.redis.keys("processing:*")
+            # Count live cache entries by type from the namespace indexes,
+            # pruning members whose keys have expired
+            now = time.time()
+            pipe = self.redis.pipeline(transaction=False)
+            for namespace in NAMESPACES:
+                pipe.zremrangebyscore(self._namespace_index(namespace), "-inf", now)
+                pipe.zcard(self._namespace_index(namespace))
+            counts = dict(zip(NAMESPACES, (await pipe.execute())[1::2]))
             
             stats["cache_counts"] = {
-                "models": len(model_keys),
-                "embeddings": len(embedding_keys),
-                "processing_results": len(processing_keys)
+                "models": counts["model"],
+                "embeddings": counts["embedding"],
+                "processing_results": counts["processing"]
             }
             
             return stats
-            
+        
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
             return {"connected": False, "error": str(e)}
     
     async def clear_all_cache(self) -> bool:
-        """Clear all cache entries"""
+        """Clear all cache entries
+        
+        Only indexed cache keys and their indexes are deleted, not the whole
+        database, so the corpus generation and ingestion leases survive.
+        """
         if not self.connected:
             return False
-            
+        
         try:
-            await self.redis.flushdb()
-            logger.info("Cleared all cache entries")
+            deleted = 0
+            for namespace in NAMESPACES:
+                deleted += await self._delete_namespace(namespace)
+            
+            batch = []
+            async for index in self.redis.scan_iter(match=self._file_index("*"), count=1000):
+                batch.append(index)
+                if len(batch) >= CLEAR_BATCH_SIZE:
+                    await self.redis.delete(*batch)
+                    batch = []
+            if batch:
+                await self.redis.delete(*batch)
+            
+            await self._publish_invalidation("*")
+            logger.info(f"Cleared {deleted} cache entries")
             return True
         except Exception as e:
             logger.error(f"Error clearing cache: {e}")
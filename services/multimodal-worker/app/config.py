@@ -22,6 +22,18 @@ class Settings(BaseSettings):
     blip_model: str = "Salesforce/blip-image-captioning-base"
     whisper_model: str = "base"
     sentence_transformer_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    model_revisions: dict = {}  # Pinned Hugging Face revisions, e.g. {"clip": "<commit sha>"}
+    
+    # Model residency settings
+    preload_models: list = ["clip", "blip", "whisper", "sentence_transformer"]  # Others load on first use
+    model_load_concurrency: int = 2  # Models loaded in parallel at startup, bounds peak memory
+    precision: str = "fp32"  # fp32, bf16 or int8-dynamic (CPU only) for CLIP, BLIP and the sentence transformer
+    embedding_backend: str = "torch"  # torch or onnx (ONNX Runtime on CPU for CLIP and the sentence transformer)
+    onnx_intra_op_threads: int = 0  # 0 = ONNX Runtime default
+    model_memory_budget_mb: int = 0  # Evict least recently used models above this, 0 = unlimited
+    model_idle_timeout: float = 0  # Evict models unused for this many seconds, 0 = never
+    use_model_snapshots: bool = True  # Load from a matching snapshot when one exists
+    model_snapshot_dir: str = os.getenv("MODEL_SNAPSHOT_DIR", "/app/cache/snapshots")
     
     # Cache settings
     cache_dir: str = os.getenv("TEST_CACHE_DIR", "/app/cache")
@@ -59,13 +71,74 @@ class Settings(BaseSettings):
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
     redis_db: int = int(os.getenv("REDIS_DB", "0"))
+    embedding_cache_ttl: int = 7 * 86400  # Seconds cached CLIP and text embeddings are kept
+    embedding_cache_dtype: str = "float32"  # float32 or float16 (half the Redis memory per vector)
+    embedding_l1_max_entries: int = 10000  # In-process LRU in front of Redis, 0 = disabled
+    embedding_l1_ttl: float = 300  # Seconds an embedding stays in the in-process LRU
+    corpus_generation_redis_db: int = int(os.getenv("CORPUS_GENERATION_REDIS_DB", "1"))  # Retrieval proxy's search cache DB
+    ingest_lease_enabled: bool = True  # Coordinate identical uploads across replicas with a Redis lease
+    ingest_lease_ttl: float = 30  # Seconds a lease outlives a crashed replica (renewed while processing)
+    ingest_lease_wait: float = 1800  # Max seconds to wait for another replica to finish the same content
+    ingest_lease_poll_interval: float = 0.5
     
     # Processing settings
     max_file_size: int = 100 * 1024 * 1024  # 100MB
+    upload_chunk_size: int = 1024 * 1024  # Bytes copied per read when streaming uploads to disk
     max_video_duration: int = 3600  # 1 hour in seconds
     keyframe_interval: int = 30  # Extract keyframe every 30 seconds
+    keyframe_concurrency: int = 16  # Keyframes of one video processed (and batched) together
     chunk_size: int = 512  # Text chunk size for embeddings
     chunk_overlap: int = 50  # Text chunk overlap
+    text_embedding_batch_size: int = 64  # Chunks per sentence-transformer forward pass
+    text_embedding_bucket_size: int = 512  # Length-sorted chunks encoded and persisted together
+    
+    # Ingestion job queue settings
+    # Jobs are state, not cache: keep them on a Redis that is never flushed or
+    # LRU-evicted (maxmemory-policy noeviction)
+    job_redis_host: str = os.getenv("JOB_REDIS_HOST", os.getenv("REDIS_HOST", "localhost"))
+    job_redis_port: int = int(os.getenv("JOB_REDIS_PORT", os.getenv("REDIS_PORT", "6379")))
+    job_redis_db: int = int(os.getenv("JOB_REDIS_DB", "3"))
+    job_workers: int = 2  # Jobs processed concurrently per replica
+    job_queue_max_depth: int = 100  # Queued plus running jobs before submissions are rejected
+    job_retry_after: int = 30  # Retry-After seconds sent with a rejected submission
+    job_result_ttl: int = 86400  # Seconds a finished job stays queryable
+    job_claim_idle: float = 60  # Seconds without a heartbeat before another worker takes a job over
+    job_max_attempts: int = 3  # Takeovers before a job is marked failed
+    job_poll_block: float = 5  # Seconds a worker blocks waiting for new jobs
+    job_spool_dir: str = os.getenv("JOB_SPOOL_DIR", os.path.join(os.getenv("TEST_CACHE_DIR", "/app/cache"), "jobs"))
+    
+    # Micro-batching settings
+    clip_batch_max_size: int = 16  # Max images per batched CLIP forward pass
+    clip_batch_max_wait_ms: float = 10.0  # Max time to hold a partial batch
+    blip_batch_max_size: int = 8  # Max images per batched BLIP generate call
+    blip_batch_max_wait_ms: float = 20.0
+    
+    # Inference executor settings
+    inference_max_workers: int = 0  # Thread pool size, 0 = sum of family limits
+    inference_family_concurrency: dict = {
+        "clip": 1,
+        "blip": 1,
+        "whisper": 1,
+        "sentence_transformer": 1,
+        "video": 2,  # cv2/moviepy decoding
+        "preprocess": 2  # PIL decoding and feature extraction
+    }
+    inference_default_concurrency: int = 1
+    torch_intra_op_threads: int = 0  # 0 = torch default
+    
+    # Model subprocess pool settings (CLIP and Whisper served out of process)
+    model_process_workers: int = 0  # 0 = run all models in the API process
+    model_process_cpu_sets: str = ""  # e.g. "0-7;8-15", empty = split available CPUs evenly
+    model_process_start_timeout: float = 600.0  # Seconds to wait for workers to load models
+    model_process_request_timeout: float = 300.0
+    
+    # Caption decoding profiles, selectable per request
+    caption_profiles: dict = {
+        "fast": {"num_beams": 1, "max_length": 30},
+        "balanced": {"num_beams": 3, "max_length": 40},
+        "quality": {"num_beams": 5, "max_length": 50}
+    }
+    default_caption_profile: str = "quality"
     
     # Image processing settings
     image_max_size: tuple = (1024, 1024)
@@ -50,20 +50,26 @@ class DatabaseManager:
     
     async def create_document(self, filename: str, file_type: str, 
                             file_size: int, mime_type: str, 
-                            content_hash: str, metadata: Dict = None) -> str:
-        """Create a new document record"""
+                            content_hash: str, metadata: Dict = None) -> Optional[str]:
+        """Create a new document record, claiming its content hash
+        
+        Returns None when a document with the same content hash already
+        exists, e.g. because another request ingested it concurrently.
+        """
         document_id = str(uuid.uuid4())
         metadata = metadata or {}
         
         async with self.pool.acquire() as conn:
-            await conn.execute("""
+            row_id = await conn.fetchval("""
                 INSERT INTO documents (id, filename, file_type, file_size, 
                                      mime_type, content_hash, metadata)
                 VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (content_hash) DO NOTHING
+                RETURNING id
             """, document_id, filename, file_type, file_size, mime_type, 
                content_hash, json.dumps(metadata))
         
-        return document_id
+        return str(row_id) if row_id is not None else None
     
     async def get_document_by_hash(self, content_hash: str) -> Optional[Dict]:
         """Get document by content hash"""
@@ -96,6 +102,33 @@ class DatabaseManager:
         
         return chunk_id
     
+    async def create_text_chunks(self, chunks: List[Dict[str, Any]]) -> List[str]:
+        """Create multiple text chunk records in a single batched INSERT
+        
+        Each chunk dict takes the same fields as ``create_text_chunk``:
+        document_id, chunk_text, chunk_index and optionally start_pos,
+        end_pos, embedding_id and metadata.
+        """
+        chunk_ids = [str(uuid.uuid4()) for _ in chunks]
+        if not chunks:
+            return chunk_ids
+        
+        records = [
+            (chunk_id, chunk['document_id'], chunk['chunk_text'], chunk['chunk_index'],
+             chunk.get('start_pos'), chunk.get('end_pos'), chunk.get('embedding_id'),
+             json.dumps(chunk.get('metadata') or {}))
+            for chunk_id, chunk in zip(chunk_ids, chunks)
+        ]
+        
+        async with self.pool.acquire() as conn:
+            await conn.executemany("""
+                INSERT INTO text_chunks (id, document_id, chunk_text, chunk_index,
+                                       start_position, end_position, embedding_id, metadata)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            """, records)
+        
+        return chunk_ids
+    
     async def create_image(self, document_id: str, image_path: str, 
                          width: int = None, height: int = None, 
                          format: str = None, caption: str = None,
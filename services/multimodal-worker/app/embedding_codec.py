@@ -0,0 +1,102 @@
+"""
+Compact binary wire format for cached embeddings
+
+An encoded embedding is a small fixed header followed by the raw vector:
+
+    magic    2 bytes   b"EV"
+    version  uint8     FORMAT_VERSION
+    dtype    uint8     1 = float32, 2 = float16
+    dim      uint32    number of components
+    rev_len  uint16    length of the model revision
+    revision rev_len   UTF-8 model revision the vector was computed with
+    padding            zero bytes up to a 4-byte boundary
+    vector   dim * itemsize bytes, little endian
+
+All integers are little endian. Decoding float32 vectors is zero-copy.
+"""
+import io
+import pickle
+import struct
+from typing import Optional
+
+import numpy as np
+
+MAGIC = b"EV"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<2sBBIH")
+_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+_DTYPE_CODES = {"float32": 1, "float16": 2}
+
+# Globals a pickled numpy array needs, and nothing else
+_LEGACY_PICKLE_GLOBALS = {
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy.core.numeric", "_frombuffer"),
+    ("numpy._core.numeric", "_frombuffer"),
+    ("numpy", "ndarray"),
+    ("numpy", "dtype"),
+    ("builtins", "bytearray"),
+}
+
+
+def encode_embedding(embedding: np.ndarray, revision: str, dtype: str = "float32") -> bytes:
+    """Encode a 1-D embedding with its model revision"""
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype '{dtype}', expected float32 or float16")
+
+    code = _DTYPE_CODES[dtype]
+    vector = np.ascontiguousarray(np.asarray(embedding).ravel(), dtype=_DTYPES[code])
+    revision_bytes = revision.encode("utf-8")
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, code, vector.shape[0], len(revision_bytes))
+    padding = -(len(header) + len(revision_bytes)) % 4
+    return b"".join((header, revision_bytes, b"\0" * padding, vector.tobytes()))
+
+
+def is_encoded(data: bytes) -> bool:
+    """Whether a cached value uses this format"""
+    return data[:2] == MAGIC
+
+
+def decode_embedding(data: bytes, revision: Optional[str] = None) -> Optional[np.ndarray]:
+    """Decode an embedding, or return None if it was computed with another revision
+
+    The returned array is a read-only view of ``data`` for float32 vectors.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated embedding header")
+
+    magic, version, code, dim, revision_length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded embedding")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding format version {version}")
+    if code not in _DTYPES:
+        raise ValueError(f"Unknown embedding dtype code {code}")
+
+    start = _HEADER.size
+    stored_revision = bytes(data[start:start + revision_length]).decode("utf-8")
+    if revision is not None and stored_revision != revision:
+        return None
+
+    offset = start + revision_length
+    offset += -offset % 4
+    vector = np.frombuffer(data, dtype=_DTYPES[code], count=dim, offset=offset)
+    return vector if code == 1 else vector.astype(np.float32)
+
+
+class _NumpyOnlyUnpickler(pickle.Unpickler):
+    """Unpickler that refuses to construct anything except numpy arrays"""
+
+    def find_class(self, module, name):
+        if (module, name) not in _LEGACY_PICKLE_GLOBALS:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from the cache")
+        return super().find_class(module, name)
+
+
+def load_legacy_pickle(data: bytes) -> np.ndarray:
+    """Load an embedding cached as a pickled numpy array by earlier versions"""
+    embedding = _NumpyOnlyUnpickler(io.BytesIO(data)).load()
+    if not isinstance(embedding, np.ndarray):
+        raise pickle.UnpicklingError("Legacy cache entry is not a numpy array")
+    return embedding
@@ -0,0 +1,181 @@
+"""
+Bounded inference executor for running blocking model work off the event loop
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """Thread pool that runs CPU-bound stages with per-model-family concurrency limits
+
+    Torch, Whisper, OpenCV, moviepy and scikit-learn release the GIL for most
+    of their work, so running them in threads keeps the event loop (and
+    /health) responsive while still letting several models run in parallel.
+    Each family (clip, blip, whisper, ...) gets its own semaphore so one slow
+    family cannot occupy every worker thread.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_size = 0
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._limit_overrides: Dict[str, int] = {}
+
+    def _family_limit(self, family: str) -> int:
+        """Get the concurrency limit for a model family"""
+        if family in self._limit_overrides:
+            return self._limit_overrides[family]
+        return settings.inference_family_concurrency.get(
+            family, settings.inference_default_concurrency
+        )
+
+    def set_family_limit(self, family: str, limit: int):
+        """Override the configured concurrency limit for a family
+        
+        Used when a family is served by several model subprocesses and can
+        therefore run more than its in-process limit at once. Must be called
+        before the family's first ``run``.
+        """
+        self._limit_overrides[family] = max(1, limit)
+        self._semaphores.pop(family, None)
+        self._stats.pop(family, None)
+
+        # Resize the (still idle) pool so the extra slots have threads
+        if self._pool is not None and self._pool_size < self._max_workers():
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self.initialize()
+
+    def _max_workers(self) -> int:
+        """Get the thread pool size"""
+        if settings.inference_max_workers > 0:
+            return settings.inference_max_workers
+        limits = dict(settings.inference_family_concurrency, **self._limit_overrides)
+        return max(1, sum(limits.values()))
+
+    def initialize(self):
+        """Create the thread pool and apply torch threading settings"""
+        if settings.torch_intra_op_threads > 0:
+            torch.set_num_threads(settings.torch_intra_op_threads)
+            logger.info(f"Torch intra-op threads set to {settings.torch_intra_op_threads}")
+
+        if self._pool is None:
+            self._pool_size = self._max_workers()
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._pool_size,
+                thread_name_prefix="inference"
+            )
+            logger.info(f"Inference executor started with {self._pool_size} workers")
+
+    def _family_state(self, family: str) -> Dict[str, float]:
+        """Get or create the semaphore and counters for a family"""
+        if family not in self._semaphores:
+            self._semaphores[family] = asyncio.Semaphore(self._family_limit(family))
+            self._stats[family] = {
+                "queued": 0,
+                "active": 0,
+                "completed": 0,
+                "failed": 0,
+                "wait_time_total_ms": 0.0,
+                "run_time_total_ms": 0.0
+            }
+        return self._stats[family]
+
+    async def run(self, family: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking callable on the pool, bounded by its family's concurrency"""
+        if self._pool is None:
+            self.initialize()
+
+        stats = self._family_state(family)
+        semaphore = self._semaphores[family]
+
+        enqueued_at = time.perf_counter()
+        stats["queued"] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["queued"] -= 1
+
+        started_at = time.perf_counter()
+        stats["wait_time_total_ms"] += (started_at - enqueued_at) * 1000.0
+        stats["active"] += 1
+        loop = asyncio.get_running_loop()
+
+        def finish(future: Future):
+            """Release the family slot once the pool has actually finished the call"""
+            if future.cancelled() or future.exception() is not None:
+                stats["failed"] += 1
+            else:
+                stats["completed"] += 1
+            stats["active"] -= 1
+            stats["run_time_total_ms"] += (time.perf_counter() - started_at) * 1000.0
+            semaphore.release()
+
+        try:
+            future = self._pool.submit(partial(fn, *args, **kwargs))
+        except Exception:
+            stats["failed"] += 1
+            stats["active"] -= 1
+            semaphore.release()
+            raise
+
+        # Cancelling the awaiter does not stop a call that is already running,
+        # so the slot is held until the pool reports the call done rather than
+        # released when the awaiter goes away. Registered before wrap_future so
+        # the stats are settled by the time the awaiter resumes.
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(finish, done))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and saturation metrics per family and for the pool"""
+        max_workers = self._max_workers()
+        families = {}
+        total_active = 0
+
+        for family, stats in self._stats.items():
+            limit = self._family_limit(family)
+            finished = stats["completed"] + stats["failed"]
+            total_active += stats["active"]
+            families[family] = {
+                "concurrency_limit": limit,
+                "queue_depth": stats["queued"],
+                "active": stats["active"],
+                "saturation": stats["active"] / limit if limit else 0,
+                "completed": stats["completed"],
+                "failed": stats["failed"],
+                "avg_wait_ms": (stats["wait_time_total_ms"] / finished) if finished else 0,
+                "avg_run_ms": (stats["run_time_total_ms"] / finished) if finished else 0
+            }
+
+        return {
+            "max_workers": max_workers,
+            "active": total_active,
+            "saturation": total_active / max_workers if max_workers else 0,
+            "torch_intra_op_threads": torch.get_num_threads(),
+            "families": families
+        }
+
+    def shutdown(self):
+        """Shut down the thread pool, waiting for running work to finish"""
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_size = 0
+            logger.info("Inference executor shut down")
+        self._semaphores.clear()
+        self._limit_overrides.clear()
+
+
+# Global inference executor instance
+inference_executor = InferenceExecutor()
@@ -0,0 +1,141 @@
+"""
+Single-flight ingestion: one processing run per content hash
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .cache import model_cache_manager
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Delete or extend a lease only while it is still held by the same owner
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class IngestionCoordinator:
+    """Runs at most one ingestion per content hash at a time
+    
+    Identical uploads that arrive while the first one is still processing
+    wait for it and share its result. Within a process this is a shared task;
+    across replicas an ``ingest:lease:<hash>`` key in Redis is held (and
+    renewed) while processing, and replicas that find it taken wait for it to
+    be released before checking the database again.
+    """
+    
+    def __init__(self, cache_manager=None):
+        self.cache_manager = cache_manager or model_cache_manager
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+        self.lease_waits = 0
+    
+    async def run(self, content_hash: str, ingest: Callable[[], Awaitable[Any]],
+                  discard: Optional[Callable[[], None]] = None) -> Any:
+        """Run ``ingest`` for a content hash, or join the run already in flight
+        
+        ``discard`` is called when this caller joins an existing run, so it
+        can drop anything it prepared for ``ingest`` (e.g. its copy of the
+        upload). Waiters are shielded, so a disconnecting client does not
+        abort processing that others are waiting for.
+        """
+        task = self._in_flight.get(content_hash)
+        if task is None:
+            task = asyncio.create_task(self._run_with_lease(content_hash, ingest))
+            self._in_flight[content_hash] = task
+            task.add_done_callback(lambda t: self._finish(content_hash, t))
+        else:
+            self.coalesced += 1
+            if discard:
+                discard()
+        return await asyncio.shield(task)
+    
+    def _finish(self, content_hash: str, task: asyncio.Task):
+        """Forget a finished run so the next upload checks the database again"""
+        if self._in_flight.get(content_hash) is task:
+            del self._in_flight[content_hash]
+    
+    async def _run_with_lease(self, content_hash: str, ingest: Callable[[], Awaitable[Any]]) -> Any:
+        """Hold the cross-replica lease for the hash while ingesting"""
+        lease_key = f"ingest:lease:{content_hash}"
+        token = await self._acquire_lease(lease_key)
+        if token is None:
+            return await ingest()
+        
+        renewer = asyncio.create_task(self._renew_lease(lease_key, token))
+        try:
+            return await ingest()
+        finally:
+            renewer.cancel()
+            await self._release_lease(lease_key, token)
+    
+    async def _acquire_lease(self, lease_key: str) -> Optional[str]:
+        """Take the lease, waiting while another replica holds it
+        
+        Returns the lease token, or None when ingesting without a lease
+        (Redis unavailable, or the other replica did not finish in time).
+        """
+        if not settings.ingest_lease_enabled or not self.cache_manager.connected:
+            return None
+        
+        token = str(uuid.uuid4())
+        lease_ms = int(settings.ingest_lease_ttl * 1000)
+        deadline = time.monotonic() + settings.ingest_lease_wait
+        waited = False
+        try:
+            while True:
+                if await self.cache_manager.redis.set(lease_key, token, nx=True, px=lease_ms):
+                    return token
+                if not waited:
+                    waited = True
+                    self.lease_waits += 1
+                    logger.info(f"Waiting for another replica to finish {lease_key}")
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Gave up waiting for {lease_key}")
+                    return None
+                await asyncio.sleep(settings.ingest_lease_poll_interval)
+        except Exception as e:
+            logger.error(f"Failed to acquire ingestion lease {lease_key}: {e}")
+            return None
+    
+    async def _renew_lease(self, lease_key: str, token: str):
+        """Keep the lease alive for as long as processing runs"""
+        lease_ms = int(settings.ingest_lease_ttl * 1000)
+        while True:
+            await asyncio.sleep(settings.ingest_lease_ttl / 3)
+            try:
+                await self.cache_manager.redis.eval(RENEW_LEASE_SCRIPT, 1, lease_key, token, lease_ms)
+            except Exception as e:
+                logger.error(f"Failed to renew ingestion lease {lease_key}: {e}")
+    
+    async def _release_lease(self, lease_key: str, token: str):
+        """Release the lease if it is still ours"""
+        try:
+            await self.cache_manager.redis.eval(RELEASE_LEASE_SCRIPT, 1, lease_key, token)
+        except Exception as e:
+            logger.error(f"Failed to release ingestion lease {lease_key}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get in-flight and coalesced ingestion counts"""
+        return {
+            "in_flight": len(self._in_flight),
+            "coalesced": self.coalesced,
+            "lease_waits": self.lease_waits
+        }
+
+
+# Global ingestion coordinator instance
+ingestion_coordinator = IngestionCoordinator()
@@ -0,0 +1,339 @@
+"""
+Durable ingestion job queue on Redis Streams
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_STREAM = "jobs:ingest"
+JOB_GROUP = "ingest-workers"
+JOB_KEY_PREFIX = "job:"
+FINISHED_STATUSES = ("completed", "failed")
+
+# handler(payload, progress) -> result, where progress(stage, fraction) reports a pipeline stage
+JobHandler = Callable[[Dict[str, Any], Callable[[str, float], Awaitable[None]]], Awaitable[Dict[str, Any]]]
+
+
+class JobQueueError(Exception):
+    """Raised when a job cannot be accepted"""
+
+
+class QueueFullError(JobQueueError):
+    """Raised when the queue is at its depth limit; the client should retry later"""
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class JobQueue:
+    """Ingestion jobs: a Redis stream feeding a pool of local workers
+    
+    Each job is a ``job:<id>`` hash (status, stage, progress, result) plus an
+    entry in the ``jobs:ingest`` stream, read by a consumer group shared by
+    all replicas. Entries are acknowledged and deleted once a job finishes, so
+    the stream length is the number of queued and running jobs. A job whose
+    worker died stops being heartbeated and is reclaimed by another worker
+    after ``job_claim_idle`` seconds, up to ``job_max_attempts`` times.
+    
+    The queue has its own Redis connection (``job_redis_*``), separate from
+    the caches, so clearing or evicting cache entries never drops a job.
+    """
+    
+    def __init__(self, redis: Optional[aioredis.Redis] = None):
+        self.redis = redis
+        self._owns_redis = False
+        self.handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self.consumer_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+    
+    @property
+    def available(self) -> bool:
+        return self.redis is not None
+    
+    async def connect(self):
+        """Connect to the job queue's Redis, leaving the queue unavailable on failure"""
+        if self.redis is not None:
+            return
+        try:
+            redis = aioredis.from_url(
+                f"redis://{settings.job_redis_host}:{settings.job_redis_port}/{settings.job_redis_db}"
+            )
+            await redis.ping()
+            self.redis = redis
+            self._owns_redis = True
+            logger.info(f"Connected to job queue Redis at {settings.job_redis_host}:{settings.job_redis_port}")
+        except Exception as e:
+            logger.error(f"Failed to connect to job queue Redis: {e}")
+    
+    async def start(self, handlers: Dict[str, JobHandler]):
+        """Create the consumer group and start the local workers"""
+        self.handlers = handlers
+        await self.connect()
+        if not self.available:
+            logger.warning("Job queue disabled: Redis is not connected")
+            return
+        
+        if not await self._create_group():
+            return
+        
+        for i in range(settings.job_workers):
+            consumer = f"{self.consumer_prefix}-{i}"
+            self._workers.append(asyncio.create_task(self._work(consumer)))
+        logger.info(f"Started {settings.job_workers} ingestion job workers")
+    
+    async def stop(self):
+        """Stop the workers; jobs they were running are reclaimed later"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        
+        if self._owns_redis:
+            await self.redis.close()
+            self.redis = None
+            self._owns_redis = False
+    
+    async def _create_group(self) -> bool:
+        """Create the stream and consumer group unless they already exist"""
+        try:
+            await self.redis.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Failed to create job consumer group: {e}")
+                return False
+        return True
+    
+    async def depth(self) -> int:
+        """Number of queued and running jobs"""
+        return await self.redis.xlen(JOB_STREAM)
+    
+    async def check_capacity(self):
+        """Raise if a new job would not be accepted"""
+        if not self.available:
+            raise JobQueueError("Job queue is unavailable")
+        try:
+            depth = await self.depth()
+        except Exception as e:
+            logger.error(f"Failed to read job queue depth: {e}")
+            raise JobQueueError("Job queue is unavailable")
+        if depth >= settings.job_queue_max_depth:
+            self.rejected += 1
+            raise QueueFullError(f"Job queue is full ({depth} jobs), retry later")
+    
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return it, or raise if the queue is full"""
+        await self.check_capacity()
+        
+        job_id = str(uuid.uuid4())
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "attempts": 0,
+            "created_at": time.time()
+        }
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hset(JOB_KEY_PREFIX + job_id, mapping={**job, "payload": json.dumps(payload)})
+            # The spooled upload is also named in the entry, so it can be removed
+            # even if the job hash is gone by the time the entry is read
+            entry = {"job_id": job_id}
+            if payload.get("temp_path"):
+                entry["temp_path"] = payload["temp_path"]
+            pipe.xadd(JOB_STREAM, entry)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to queue {kind} job: {e}")
+            raise JobQueueError("Job queue is unavailable")
+        
+        self.submitted += 1
+        return job
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status, progress, payload and (once finished) result"""
+        fields = await self.redis.hgetall(JOB_KEY_PREFIX + job_id)
+        if not fields:
+            return None
+        
+        job = {_decode(key): _decode(value) for key, value in fields.items()}
+        job["progress"] = float(job.get("progress", 0))
+        job["attempts"] = int(job.get("attempts", 0))
+        for field in ("created_at", "started_at", "finished_at"):
+            if field in job:
+                job[field] = float(job[field])
+        for field in ("payload", "result"):
+            if field in job:
+                job[field] = json.loads(job[field])
+        return job
+    
+    async def set_progress(self, job_id: str, stage: str, progress: float):
+        """Record the pipeline stage a job has reached"""
+        try:
+            await self.redis.hset(
+                JOB_KEY_PREFIX + job_id, mapping={"stage": stage, "progress": round(progress, 3)}
+            )
+        except Exception as e:
+            logger.error(f"Failed to update progress of job {job_id}: {e}")
+    
+    async def _work(self, consumer: str):
+        """Process jobs until cancelled, reclaiming abandoned ones first"""
+        redis = self.redis
+        while True:
+            try:
+                claimed = await redis.xautoclaim(
+                    JOB_STREAM, JOB_GROUP, consumer,
+                    min_idle_time=int(settings.job_claim_idle * 1000), count=1
+                )
+                entries = [entry for entry in claimed[1] if entry[1]]
+                if not entries:
+                    response = await redis.xreadgroup(
+                        JOB_GROUP, consumer, {JOB_STREAM: ">"},
+                        count=1, block=int(settings.job_poll_block * 1000)
+                    )
+                    entries = response[0][1] if response else []
+                
+                for entry_id, fields in entries:
+                    await self._process(consumer, entry_id, fields)
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The stream or group was deleted behind our back; recreate them
+                if "NOGROUP" in str(e):
+                    logger.warning("Job consumer group is missing, recreating it")
+                    if await self._create_group():
+                        continue
+                logger.error(f"Job worker {consumer} failed: {e}")
+                await asyncio.sleep(settings.job_poll_block)
+    
+    async def _process(self, consumer: str, entry_id, fields: Dict):
+        """Run one job and record its outcome"""
+        job_id = _decode(fields.get(b"job_id", fields.get("job_id")))
+        job = await self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            self._discard_upload(_decode(fields.get(b"temp_path", fields.get("temp_path"))))
+            await self._acknowledge(entry_id)
+            return
+        
+        attempts = job["attempts"] + 1
+        handler = self.handlers.get(job["kind"])
+        temp_path = job.get("payload", {}).get("temp_path")
+        if handler is None:
+            self._discard_upload(temp_path)
+            await self._finish(entry_id, job_id, "failed", error=f"Unknown job kind: {job['kind']}")
+            return
+        if attempts > settings.job_max_attempts:
+            self._discard_upload(temp_path)
+            await self._finish(entry_id, job_id, "failed", error=f"Gave up after {job['attempts']} attempts")
+            return
+        
+        await self.redis.hset(JOB_KEY_PREFIX + job_id, mapping={
+            "status": "running", "stage": "started", "attempts": attempts, "started_at": time.time()
+        })
+        heartbeat = asyncio.create_task(self._heartbeat(consumer, entry_id))
+        try:
+            result = await handler(job["payload"], partial(self.set_progress, job_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await self._finish(entry_id, job_id, "failed", error=str(e))
+            return
+        finally:
+            heartbeat.cancel()
+        
+        await self._finish(entry_id, job_id, "completed", result=result)
+    
+    def _discard_upload(self, temp_path: Optional[str]):
+        """Remove the spooled upload of a job that no handler will run"""
+        if not temp_path:
+            return
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to remove spooled upload {temp_path}: {e}")
+    
+    async def _heartbeat(self, consumer: str, entry_id):
+        """Reset the entry's idle time so long jobs are not reclaimed while running"""
+        while True:
+            await asyncio.sleep(settings.job_claim_idle / 3)
+            try:
+                await self.redis.xclaim(
+                    JOB_STREAM, JOB_GROUP, consumer, 0, [entry_id], justid=True
+                )
+            except Exception as e:
+                logger.error(f"Failed to heartbeat job entry {entry_id}: {e}")
+    
+    async def _finish(self, entry_id, job_id: str, status: str,
+                      result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Store a job's outcome, keep it for ``job_result_ttl`` and remove it from the stream"""
+        fields = {"status": status, "stage": status, "finished_at": time.time()}
+        if status == "completed":
+            fields["progress"] = 1.0
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        
+        job_key = JOB_KEY_PREFIX + job_id
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(job_key, mapping=fields)
+        pipe.expire(job_key, settings.job_result_ttl)
+        pipe.xack(JOB_STREAM, JOB_GROUP, entry_id)
+        pipe.xdel(JOB_STREAM, entry_id)
+        await pipe.execute()
+        
+        if status == "completed":
+            self.completed += 1
+        else:
+            self.failed += 1
+    
+    async def _acknowledge(self, entry_id):
+        """Drop a stream entry whose job is gone or already finished"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(JOB_STREAM, JOB_GROUP, entry_id)
+        pipe.xdel(JOB_STREAM, entry_id)
+        await pipe.execute()
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, limits and job counters for this replica"""
+        depth = None
+        if self.available:
+            try:
+                depth = await self.depth()
+            except Exception as e:
+                logger.error(f"Failed to read job queue depth: {e}")
+        return {
+            "available": self.available,
+            "depth": depth,
+            "max_depth": settings.job_queue_max_depth,
+            "workers": len(self._workers),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+# Global job queue instance
+job_queue = JobQueue()
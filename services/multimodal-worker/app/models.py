@@ -1,9 +1,15 @@
 """
 Model manager for loading and managing ML models
 """
+import asyncio
+import itertools
 import os
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, List, Tuple
 import torch
 from transformers import (
     CLIPProcessor, CLIPModel,
@@ -14,96 +20,447 @@ from sentence_transformers import SentenceTransformer
 import whisper
 
 from .config import settings
+from . import snapshots
+from .precision import apply_precision, REDUCIBLE_MODELS
+from .batching import MicroBatcher
+from .executor import inference_executor
+from .process_pool import ModelProcessPool, REMOTE_MODELS
 
 logger = logging.getLogger(__name__)
 
+# Models managed by ModelManager, in load order
+MODEL_NAMES = ('clip', 'blip', 'whisper', 'sentence_transformer')
+
+def model_footprint(model: Any) -> int:
+    """Estimate the resident size of a model's parameters and buffers in bytes"""
+    if not isinstance(model, torch.nn.Module):
+        return getattr(model, 'nbytes', 0)
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in itertools.chain(model.parameters(), model.buffers())
+    )
+
 class ModelManager:
     """Manages all ML models used by the service"""
     
     def __init__(self):
-        self.models: Dict[str, Any] = {}
+        self.models: Dict[str, Any] = OrderedDict()  # least recently used first
         self.processors: Dict[str, Any] = {}
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self.process_pool = None  # ModelProcessPool when model_process_workers > 0
         self.device = torch.device(settings.device)
+        self._ready = False
+        
+        # Lazy loading and eviction state
+        self.model_info: Dict[str, Dict[str, Any]] = {}
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._eviction_task: Optional[asyncio.Task] = None
+        
+        # Load timing reports
+        self.load_reports: Dict[str, Dict[str, Any]] = {}
+        self.startup_time_s: Optional[float] = None
         
         # Ensure cache directories exist
         os.makedirs(settings.cache_dir, exist_ok=True)
         os.makedirs(settings.model_cache_dir, exist_ok=True)
     
     async def load_models(self):
-        """Load all required models"""
+        """Load the models listed in ``preload_models``
+        
+        Models load concurrently in threads, at most ``model_load_concurrency``
+        at a time to bound peak memory. Any other model is loaded on its first
+        ``get_model`` call. When ``model_process_workers`` is set, CLIP and
+        Whisper are served by a pool of model subprocesses instead and are not
+        loaded in-process.
+        """
         logger.info("Loading models...")
+        started_at = time.perf_counter()
         
         try:
+            model_names = [name for name in MODEL_NAMES if name in settings.preload_models]
+            loads = []
+            
+            if settings.model_process_workers > 0:
+                self.process_pool = ModelProcessPool(settings.model_process_workers)
+                loads.append(asyncio.get_running_loop().run_in_executor(None, self.process_pool.start))
+                model_names = [name for name in model_names if name not in REMOTE_MODELS]
+                
+                # Each subprocess can serve one request per remote model at a time
+                for family in REMOTE_MODELS:
+                    inference_executor.set_family_limit(family, settings.model_process_workers)
+            
+            loads.append(self._load_models_concurrently(model_names))
+            await asyncio.gather(*loads)
+            
+            if settings.model_idle_timeout > 0:
+                self._eviction_task = asyncio.create_task(self._evict_idle_loop())
+            
+            self.startup_time_s = time.perf_counter() - started_at
+            self._ready = True
+            logger.info(
+                f"Models loaded successfully in {self.startup_time_s:.1f}s: "
+                f"{', '.join(model_names) or 'none (lazy)'}"
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to load models: {e}")
+            raise
+    
+    async def _load_models_concurrently(self, model_names: List[str]):
+        """Load models on a bounded thread pool, skipping the rest after a failure"""
+        if not model_names:
+            return
+        
+        failed = threading.Event()
+        
+        def load(model_name: str):
+            if failed.is_set():
+                return
+            try:
+                self.load_model(model_name)
+            except Exception:
+                failed.set()
+                raise
+        
+        loop = asyncio.get_running_loop()
+        workers = max(1, min(settings.model_load_concurrency, len(model_names)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-load") as pool:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, load, name) for name in model_names),
+                return_exceptions=True
+            )
+        
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+    
+    def load_model(self, model_name: str):
+        """Load a single model (and its processor) by name
+        
+        The model is built privately and published together with its sizing
+        info in one step, so a model that is still loading is never seen (or
+        chosen for eviction) by other threads.
+        """
+        started_at = time.perf_counter()
+        model, processor, source = self._load_model(model_name)
+        model = apply_precision(model_name, model, settings.precision, self.device)
+        load_time = time.perf_counter() - started_at
+        footprint = model_footprint(model)
+        
+        with self._lock:
+            self.models[model_name] = model
+            self.models.move_to_end(model_name)
+            if processor is not None:
+                self.processors[model_name] = processor
+            self.model_info[model_name] = {
+                "bytes": footprint,
+                "device": str(self.device),
+                "last_used": time.monotonic()
+            }
+            self.load_reports[model_name] = {
+                "load_time_s": round(load_time, 3),
+                "bytes": footprint,
+                "device": str(self.device),
+                "precision": settings.precision if model_name in REDUCIBLE_MODELS and source != "onnx" else "fp32",
+                "source": source
+            }
+        logger.info(f"Loaded {model_name} from {source} in {load_time:.1f}s ({footprint / 1024 ** 2:.1f} MB)")
+        
+        self._enforce_memory_budget(keep=model_name)
+    
+    def _load_model(self, model_name: str, use_snapshot: bool = True,
+                    backend: Optional[str] = None) -> Tuple[Any, Any, str]:
+        """Construct a model, returning it with its processor (or None) and where it was loaded from
+        
+        Nothing is stored on the manager; ``load_model`` publishes the result.
+        """
+        backend = backend or settings.embedding_backend
+        if backend == 'onnx':
+            from .onnx_backend import ONNX_MODELS, load_onnx_model
+            
+            if model_name in ONNX_MODELS:
+                logger.info(f"Loading {model_name} with ONNX Runtime...")
+                model, processor = load_onnx_model(
+                    model_name,
+                    snapshots.source_id(model_name),
+                    lambda: self._load_export_source(model_name, use_snapshot)
+                )
+                return model, processor, "onnx"
+        
+        if use_snapshot and settings.use_model_snapshots and snapshots.has_snapshot(model_name):
+            logger.info(f"Loading {model_name} from snapshot...")
+            model, processor = snapshots.load_snapshot(model_name, self.device)
+            return model, processor, "snapshot"
+        
+        processor = None
+        if model_name == 'clip':
             # Load CLIP model for image embeddings
             logger.info("Loading CLIP model...")
-            self.models['clip'] = CLIPModel.from_pretrained(
+            model = CLIPModel.from_pretrained(
                 settings.clip_model,
-                cache_dir=settings.model_cache_dir
+                cache_dir=settings.model_cache_dir,
+                revision=settings.model_revisions.get('clip', 'main')
             ).to(self.device)
-            self.processors['clip'] = CLIPProcessor.from_pretrained(
+            processor = CLIPProcessor.from_pretrained(
                 settings.clip_model,
-                cache_dir=settings.model_cache_dir
+                cache_dir=settings.model_cache_dir,
+                revision=settings.model_revisions.get('clip', 'main')
             )
-            
+        
+        elif model_name == 'blip':
             # Load BLIP model for image captioning
             logger.info("Loading BLIP model...")
-            self.models['blip'] = BlipForConditionalGeneration.from_pretrained(
+            model = BlipForConditionalGeneration.from_pretrained(
                 settings.blip_model,
-                cache_dir=settings.model_cache_dir
+                cache_dir=settings.model_cache_dir,
+                revision=settings.model_revisions.get('blip', 'main')
             ).to(self.device)
-            self.processors['blip'] = BlipProcessor.from_pretrained(
+            processor = BlipProcessor.from_pretrained(
                 settings.blip_model,
-                cache_dir=settings.model_cache_dir
+                cache_dir=settings.model_cache_dir,
+                revision=settings.model_revisions.get('blip', 'main')
             )
-            
+        
+        elif model_name == 'whisper':
             # Load Whisper model for audio transcription
             logger.info("Loading Whisper model...")
-            self.models['whisper'] = whisper.load_model(
+            model = whisper.load_model(
                 settings.whisper_model.split('/')[-1],  # Extract model size
                 download_root=settings.model_cache_dir
             )
-            
+        
+        elif model_name == 'sentence_transformer':
             # Load sentence transformer for text embeddings
             logger.info("Loading Sentence Transformer...")
-            self.models['sentence_transformer'] = SentenceTransformer(
+            model = SentenceTransformer(
                 settings.sentence_transformer_model,
                 cache_folder=settings.model_cache_dir,
+                revision=settings.model_revisions.get('sentence_transformer'),
                 device=self.device
             )
-            
-            logger.info("All models loaded successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to load models: {e}")
-            raise
+        
+        else:
+            raise ValueError(f"Unknown model '{model_name}'")
+        
+        return model, processor, "pretrained"
+    
+    def _load_export_source(self, model_name: str, use_snapshot: bool) -> Tuple[Any, Any]:
+        """Load the PyTorch model and processor to export, without keeping them resident"""
+        model, processor, _ = self._load_model(model_name, use_snapshot, backend='torch')
+        return model, processor
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether the models have been loaded and can serve requests"""
+        return self._ready
     
     def get_model(self, model_name: str) -> Any:
-        """Get a loaded model by name"""
-        if model_name not in self.models:
-            raise ValueError(f"Model '{model_name}' not found")
-        return self.models[model_name]
+        """Get a model by name, loading it on first use
+        
+        Concurrent callers for a model that is not resident wait for a single
+        load. This blocks, so call it from the inference executor rather than
+        the event loop.
+        """
+        with self._lock:
+            if model_name in self.models:
+                return self._touch(model_name)
+            if model_name not in MODEL_NAMES:
+                raise ValueError(f"Model '{model_name}' not found")
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+        
+        with load_lock:
+            # Another caller may have loaded it while we waited
+            with self._lock:
+                if model_name in self.models:
+                    return self._touch(model_name)
+            
+            logger.info(f"Loading {model_name} on demand")
+            self.load_model(model_name)
+            
+            with self._lock:
+                return self._touch(model_name)
     
     def get_processor(self, processor_name: str) -> Any:
-        """Get a processor by name"""
+        """Get a processor by name, loading its model on first use"""
+        if processor_name not in self.processors and processor_name in MODEL_NAMES:
+            self.get_model(processor_name)
         if processor_name not in self.processors:
             raise ValueError(f"Processor '{processor_name}' not found")
         return self.processors[processor_name]
     
+    def _touch(self, model_name: str) -> Any:
+        """Mark a model as most recently used and return it"""
+        self.models.move_to_end(model_name)
+        if model_name in self.model_info:
+            self.model_info[model_name]["last_used"] = time.monotonic()
+        return self.models[model_name]
+    
+    def resident_bytes(self) -> int:
+        """Total estimated footprint of the resident models"""
+        with self._lock:
+            return sum(self.model_info.get(name, {}).get("bytes", 0) for name in self.models)
+    
+    def evict_model(self, model_name: str) -> bool:
+        """Release a model and its processor; it is reloaded on next use"""
+        with self._lock:
+            if model_name not in self.models:
+                return False
+            del self.models[model_name]
+            self.processors.pop(model_name, None)
+            info = self.model_info.pop(model_name, {})
+            self.evictions += 1
+        
+        # In-flight callers keep their own reference, so memory is freed once they finish
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        
+        logger.info(f"Evicted {model_name} ({info.get('bytes', 0) / 1024 ** 2:.1f} MB)")
+        return True
+    
+    def _enforce_memory_budget(self, keep: Optional[str] = None):
+        """Evict least recently used models until the resident set fits the budget"""
+        budget = settings.model_memory_budget_mb * 1024 ** 2
+        if budget <= 0:
+            return
+        
+        while self.resident_bytes() > budget:
+            with self._lock:
+                candidates = [name for name in self.models if name != keep]
+            if not candidates:
+                logger.warning(f"{keep} alone exceeds the model memory budget")
+                return
+            self.evict_model(candidates[0])
+    
+    def evict_idle_models(self) -> List[str]:
+        """Evict models that have not been used within ``model_idle_timeout``"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                name for name in self.models
+                if now - self.model_info.get(name, {}).get("last_used", now) > settings.model_idle_timeout
+            ]
+        return [name for name in idle if self.evict_model(name)]
+    
+    async def _evict_idle_loop(self):
+        """Periodically evict idle models"""
+        interval = max(1.0, settings.model_idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle_models()
+            except Exception as e:
+                logger.error(f"Failed to evict idle models: {e}")
+    
+    def get_model_status(self) -> Dict[str, Dict[str, Any]]:
+        """Get each model's residency and its last load's wall time, bytes and device"""
+        remote = REMOTE_MODELS if self.process_pool else ()
+        status = {}
+        with self._lock:
+            for name in MODEL_NAMES:
+                if name in remote:
+                    entry = {"status": "remote", "workers": self.process_pool.workers}
+                elif name in self.models:
+                    entry = {"status": "loaded"}
+                elif name in self.load_reports:
+                    entry = {"status": "evicted"}
+                else:
+                    entry = {"status": "not_loaded"}
+                entry.update(self.load_reports.get(name, {}))
+                status[name] = entry
+        return status
+    
+    def get_startup_report(self) -> Dict[str, Any]:
+        """Get the total startup load time and the load concurrency used"""
+        return {
+            "wall_time_s": round(self.startup_time_s, 3) if self.startup_time_s is not None else None,
+            "load_concurrency": settings.model_load_concurrency,
+            "sum_of_load_times_s": round(
+                sum(report["load_time_s"] for report in self.load_reports.values()), 3
+            )
+        }
+    
+    def embedding_model_key(self, model_name: str) -> str:
+        """Identify the weights, revision and numerics behind an embedding model
+
+        Used in embedding cache keys, so cached vectors are never served
+        after the model, its pinned revision, precision or backend changes.
+        """
+        if settings.embedding_backend == 'onnx':
+            numerics = 'onnx'
+        else:
+            numerics = settings.precision if model_name in REDUCIBLE_MODELS else 'fp32'
+        return f"{snapshots.source_id(model_name)}:{numerics}"
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Get resident models, their footprints and the eviction count"""
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                name: {
+                    "bytes": self.model_info.get(name, {}).get("bytes", 0),
+                    "device": self.model_info.get(name, {}).get("device"),
+                    "idle_seconds": now - self.model_info.get(name, {}).get("last_used", now)
+                }
+                for name in self.models
+            }
+        return {
+            "resident_bytes": sum(model["bytes"] for model in models.values()),
+            "budget_bytes": settings.model_memory_budget_mb * 1024 ** 2,
+            "idle_timeout": settings.model_idle_timeout,
+            "evictions": self.evictions,
+            "models": models
+        }
+    
+    def get_batcher(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                    max_batch_size: int, max_wait_ms: float,
+                    family: Optional[str] = None) -> MicroBatcher:
+        """Get the shared micro-batcher for a model operation, creating it on first use"""
+        if name not in self.batchers:
+            self.batchers[name] = MicroBatcher(
+                name, batch_fn,
+                max_batch_size=max_batch_size,
+                max_wait_ms=max_wait_ms,
+                family=family
+            )
+        return self.batchers[name]
+    
+    def get_batching_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for all micro-batchers"""
+        return {name: batcher.get_stats() for name, batcher in self.batchers.items()}
+    
     async def cleanup(self):
         """Clean up models and free memory"""
         logger.info("Cleaning up models...")
+        self._ready = False
+        
+        if self._eviction_task:
+            self._eviction_task.cancel()
+            self._eviction_task = None
+        
+        # Stop batchers before releasing the models they run
+        for batcher in self.batchers.values():
+            await batcher.close()
+        self.batchers.clear()
         
         # Clear models from GPU memory
         for model_name, model in self.models.items():
             if hasattr(model, 'cpu'):
                 model.cpu()
         
+        # Stop model subprocesses
+        if self.process_pool:
+            self.process_pool.shutdown()
+            self.process_pool = None
+        
         # Clear CUDA cache
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         
         self.models.clear()
         self.processors.clear()
+        self.model_info.clear()
         
         logger.info("Model cleanup completed")
 
@@ -0,0 +1,253 @@
+"""
+ONNX Runtime execution backend for the CLIP and sentence-transformer encoders
+
+The first load exports the PyTorch models to ONNX under
+``<model_cache_dir>/onnx``; later loads only create ONNX Runtime sessions.
+The returned encoders expose the same methods the processors call on the
+PyTorch models (``get_image_features``/``get_text_features`` and ``encode``).
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from transformers import AutoTokenizer, CLIPProcessor
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Models with an ONNX backend
+ONNX_MODELS = ('clip', 'sentence_transformer')
+
+ONNX_OPSET = 17
+META_FILE = "meta.json"
+
+
+def export_dir(model_name: str, source: str) -> str:
+    """Get the cache directory for a model's exported graphs"""
+    safe_source = re.sub(r'[^A-Za-z0-9._-]+', '--', source)
+    return os.path.join(settings.model_cache_dir, "onnx", model_name, safe_source)
+
+
+def create_session(path: str) -> ort.InferenceSession:
+    """Create a CPU inference session with all graph optimisations enabled"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.onnx_intra_op_threads > 0:
+        options.intra_op_num_threads = settings.onnx_intra_op_threads
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _export(module: torch.nn.Module, args: Tuple[torch.Tensor, ...], path: str,
+            input_names: List[str], output_name: str, dynamic_axes: Dict[str, Dict[int, str]]):
+    """Export a module to ONNX, writing to a temporary file first"""
+    tmp_path = f"{path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            module.eval(), args, tmp_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True
+        )
+    os.replace(tmp_path, path)
+
+
+class _ClipImageTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values):
+        return self.model.get_image_features(pixel_values=pixel_values)
+
+
+class _ClipTextTower(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+
+class _SentenceEmbedding(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        features = {"input_ids": input_ids, "attention_mask": attention_mask}
+        return self.model(features)["sentence_embedding"]
+
+
+def export_clip(model: Any, processor: Any, path: str) -> Dict[str, Any]:
+    """Export the CLIP vision and text towers"""
+    model = model.float().cpu()
+    crop = processor.image_processor.crop_size
+    pixel_values = torch.zeros(1, 3, crop["height"], crop["width"])
+    _export(
+        _ClipImageTower(model), (pixel_values,), os.path.join(path, "vision.onnx"),
+        ["pixel_values"], "image_embeds",
+        {"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}}
+    )
+
+    tokens = processor.tokenizer(["a photo of a cat"], return_tensors="pt")
+    _export(
+        _ClipTextTower(model), (tokens["input_ids"], tokens["attention_mask"]),
+        os.path.join(path, "text.onnx"),
+        ["input_ids", "attention_mask"], "text_embeds",
+        {
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "text_embeds": {0: "batch"}
+        }
+    )
+
+    processor.save_pretrained(path)
+    return {"embedding_dim": model.config.projection_dim}
+
+
+def export_sentence_transformer(model: Any, path: str) -> Dict[str, Any]:
+    """Export the transformer, pooling and normalization of a sentence transformer"""
+    model = model.float().cpu()
+    tokens = model.tokenizer(["hello world"], return_tensors="pt")
+    _export(
+        _SentenceEmbedding(model), (tokens["input_ids"], tokens["attention_mask"]),
+        os.path.join(path, "model.onnx"),
+        ["input_ids", "attention_mask"], "sentence_embedding",
+        {
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "sentence_embedding": {0: "batch"}
+        }
+    )
+
+    model.tokenizer.save_pretrained(path)
+    return {
+        "embedding_dim": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length
+    }
+
+
+def _graph_bytes(path: str) -> int:
+    """Total size of the exported graphs in a directory"""
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in os.listdir(path) if name.endswith(".onnx")
+    )
+
+
+class OnnxClipEncoder:
+    """CLIP image and text towers running on ONNX Runtime"""
+
+    device = torch.device("cpu")
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.vision = create_session(os.path.join(path, "vision.onnx"))
+        self.text = create_session(os.path.join(path, "text.onnx"))
+        self.embedding_dim = meta["embedding_dim"]
+        self.nbytes = _graph_bytes(path)
+
+    def get_image_features(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        """Embed preprocessed images"""
+        pixel_values = pixel_values.float().cpu().numpy()
+        return torch.from_numpy(self.vision.run(None, {"pixel_values": pixel_values})[0])
+
+    def get_text_features(self, input_ids: torch.Tensor, attention_mask: torch.Tensor,
+                          **kwargs) -> torch.Tensor:
+        """Embed tokenized text"""
+        feeds = {
+            "input_ids": input_ids.cpu().numpy().astype(np.int64),
+            "attention_mask": attention_mask.cpu().numpy().astype(np.int64)
+        }
+        return torch.from_numpy(self.text.run(None, feeds)[0])
+
+
+class OnnxSentenceEncoder:
+    """Sentence-transformer encoder running on ONNX Runtime"""
+
+    device = torch.device("cpu")
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.session = create_session(os.path.join(path, "model.onnx"))
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.embedding_dim = meta["embedding_dim"]
+        self.max_seq_length = meta["max_seq_length"]
+        self.nbytes = _graph_bytes(path)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.embedding_dim
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs) -> Union[np.ndarray, torch.Tensor]:
+        """Encode sentences like ``SentenceTransformer.encode``"""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Sort by length so each batch pads to a similar length
+        order = np.argsort([-len(sentence) for sentence in sentences], kind="stable")
+        embeddings = np.zeros((len(sentences), self.embedding_dim), dtype=np.float32)
+
+        for start in range(0, len(sentences), batch_size):
+            indices = order[start:start + batch_size]
+            tokens = self.tokenizer(
+                [sentences[i] for i in indices],
+                padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors="np"
+            )
+            feeds = {
+                "input_ids": tokens["input_ids"].astype(np.int64),
+                "attention_mask": tokens["attention_mask"].astype(np.int64)
+            }
+            embeddings[indices] = self.session.run(None, feeds)[0]
+
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        result = torch.from_numpy(embeddings) if convert_to_tensor else embeddings
+        return result[0] if single else result
+
+
+def load_onnx_model(model_name: str, source: str,
+                    load_torch_model: Callable[[], Tuple[Any, Any]]) -> Tuple[Any, Any]:
+    """Load a model's ONNX encoder (and processor), exporting it on first use
+
+    ``load_torch_model`` returns the PyTorch model and processor to export
+    and is only called when no cached export exists.
+    """
+    if model_name not in ONNX_MODELS:
+        raise ValueError(f"No ONNX backend for model '{model_name}'")
+
+    path = export_dir(model_name, source)
+    meta_path = os.path.join(path, META_FILE)
+
+    if not os.path.exists(meta_path):
+        logger.info(f"Exporting {model_name} to ONNX at {path}...")
+        os.makedirs(path, exist_ok=True)
+        model, processor = load_torch_model()
+        if model_name == 'clip':
+            meta = export_clip(model, processor, path)
+        else:
+            meta = export_sentence_transformer(model, path)
+        meta.update({"source": source, "opset": ONNX_OPSET, "torch_version": torch.__version__})
+
+        # Write the metadata last so a partial export is never picked up
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        del model
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    if model_name == 'clip':
+        return OnnxClipEncoder(path, meta), CLIPProcessor.from_pretrained(path)
+    return OnnxSentenceEncoder(path, meta), None
@@ -0,0 +1,186 @@
+"""
+Reduced-precision model modes and an embedding drift check
+
+Run the drift check against the configured models with:
+
+    python -m app.precision --precision int8-dynamic [--images DIR]
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ('fp32', 'bf16', 'int8-dynamic')
+
+# Transformer models whose linear layers dominate CPU time. Whisper stays in
+# fp32: its decoding casts inputs to fp16/fp32 and its Linear subclass is not
+# picked up by dynamic quantization.
+REDUCIBLE_MODELS = ('clip', 'blip', 'sentence_transformer')
+
+DEFAULT_SAMPLE_TEXTS = [
+    "A photo of a dog playing in the snow.",
+    "Quarterly revenue grew by twelve percent compared to last year.",
+    "The patient was prescribed antibiotics for ten days.",
+    "Install the package and restart the service to apply the update.",
+    "A red car parked in front of an old brick building.",
+    "Whisk the eggs with sugar until the mixture is pale and fluffy.",
+    "The court adjourned the hearing until next Tuesday.",
+    "Sunset over the mountains with clouds in the sky."
+]
+
+
+def validate_precision(precision: str) -> str:
+    """Check a precision mode name"""
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unknown precision '{precision}', expected one of: {', '.join(PRECISIONS)}"
+        )
+    return precision
+
+
+def apply_precision(model_name: str, model: Any, precision: str, device: torch.device) -> Any:
+    """Convert a loaded model to the requested precision, in place where possible"""
+    validate_precision(precision)
+
+    # ONNX Runtime encoders are not torch modules and keep their exported precision
+    if precision == 'fp32' or model_name not in REDUCIBLE_MODELS or not isinstance(model, torch.nn.Module):
+        return model
+
+    if precision == 'bf16':
+        return model.to(torch.bfloat16)
+
+    # Dynamic quantization only has CPU kernels
+    if device.type != 'cpu':
+        logger.warning(f"int8-dynamic is CPU-only, keeping {model_name} in fp32 on {device}")
+        return model
+
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+def sample_images(count: int = 8, size: int = 224, seed: int = 0) -> List[Image.Image]:
+    """Generate deterministic synthetic images (gradients plus noise)"""
+    rng = np.random.RandomState(seed)
+    ramp = np.linspace(0, 255, size, dtype=np.float32)
+    images = []
+    for _ in range(count):
+        base = rng.uniform(0, 255, size=3).astype(np.float32)
+        pixels = np.stack([
+            (ramp[None, :] * rng.uniform(0.2, 1.0) + base[0]) % 256 + np.zeros((size, 1)),
+            (ramp[:, None] * rng.uniform(0.2, 1.0) + base[1]) % 256 + np.zeros((1, size)),
+            rng.uniform(0, 255, size=(size, size)) * 0.3 + base[2] * 0.7
+        ], axis=-1)
+        images.append(Image.fromarray(pixels.clip(0, 255).astype(np.uint8)))
+    return images
+
+
+def embed_samples(model_name: str, model: Any, processor: Any,
+                  texts: List[str], images: List[Image.Image],
+                  device: torch.device) -> np.ndarray:
+    """Compute the embeddings the service relies on for a model on a sample set"""
+    with torch.no_grad():
+        if model_name == 'clip':
+            image_inputs = {k: v.to(device) for k, v in processor(images=images, return_tensors="pt").items()}
+            text_inputs = {
+                k: v.to(device)
+                for k, v in processor(text=texts, return_tensors="pt", padding=True, truncation=True).items()
+            }
+            features = torch.cat([
+                model.get_image_features(**image_inputs),
+                model.get_text_features(**text_inputs)
+            ])
+
+        elif model_name == 'blip':
+            # Captioning is conditioned on the vision encoder's output
+            pixel_values = processor(images=images, return_tensors="pt")["pixel_values"].to(device)
+            features = model.vision_model(pixel_values=pixel_values).pooler_output
+
+        elif model_name == 'sentence_transformer':
+            features = model.encode(texts, convert_to_tensor=True)
+
+        else:
+            raise ValueError(f"No drift check for model '{model_name}'")
+
+    return features.float().cpu().numpy()
+
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Summarize row-wise cosine similarity between reference and candidate embeddings"""
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    similarity = (reference * candidate).sum(axis=1)
+    return {
+        "samples": int(len(similarity)),
+        "mean_cosine": float(similarity.mean()),
+        "min_cosine": float(similarity.min()),
+        "mean_drift": float(1.0 - similarity.mean())
+    }
+
+
+def check_precision_drift(precision: str, model_names: Optional[List[str]] = None,
+                          texts: Optional[List[str]] = None,
+                          images: Optional[List[Image.Image]] = None) -> Dict[str, Dict[str, float]]:
+    """Compare embeddings of each model at ``precision`` against its fp32 weights
+
+    Loads a fresh fp32 copy of every model, so run it outside the serving
+    process or with memory to spare.
+    """
+    from .models import ModelManager
+
+    validate_precision(precision)
+    texts = texts or DEFAULT_SAMPLE_TEXTS
+    images = images or sample_images()
+
+    model_manager = ModelManager()
+    report = {}
+    for model_name in model_names or REDUCIBLE_MODELS:
+        # Precision modes apply to the PyTorch weights, whatever the serving backend
+        reference_model, processor, _ = model_manager._load_model(model_name, backend='torch')
+
+        reference = embed_samples(model_name, reference_model, processor, texts, images, model_manager.device)
+        candidate_model = apply_precision(
+            model_name, copy.deepcopy(reference_model), precision, model_manager.device
+        )
+        candidate = embed_samples(model_name, candidate_model, processor, texts, images, model_manager.device)
+
+        report[model_name] = cosine_drift(reference, candidate)
+        logger.info(f"{model_name} {precision} drift: {report[model_name]}")
+
+        del candidate_model, reference_model
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Report embedding drift of a precision mode against fp32")
+    parser.add_argument("--precision", choices=PRECISIONS, default=settings.precision)
+    parser.add_argument("--models", nargs="+", choices=REDUCIBLE_MODELS, default=list(REDUCIBLE_MODELS))
+    parser.add_argument("--images", default=None, help="Directory of sample images (default: synthetic)")
+    args = parser.parse_args(argv)
+
+    images = None
+    if args.images:
+        images = [
+            Image.open(os.path.join(args.images, name)).convert('RGB')
+            for name in sorted(os.listdir(args.images))
+            if os.path.splitext(name)[1].lower() in settings.supported_image_formats
+        ]
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(check_precision_drift(args.precision, args.models, images=images), indent=2))
+
+
+if __name__ == "__main__":
+    main()
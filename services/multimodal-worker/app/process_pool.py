@@ -0,0 +1,498 @@
+"""
+Model subprocess pool with shared-memory tensor hand-off
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Models served by the subprocesses instead of the API process
+REMOTE_MODELS = ('clip', 'whisper')
+
+# Longest wait before restarting a subprocess that keeps failing to load its models
+MAX_RESTART_DELAY = 60.0
+
+
+def parse_cpu_sets(spec: str, workers: int) -> List[Optional[List[int]]]:
+    """Parse a CPU set spec such as ``"0-3;4-7"`` into one CPU list per worker
+
+    Sets are separated by ``;`` and may contain ranges and comma-separated
+    CPUs. An empty spec splits the CPUs available to this process evenly;
+    ``None`` entries mean the worker is not pinned.
+    """
+    if spec:
+        cpu_sets = []
+        for group in spec.split(';'):
+            cpus = []
+            for part in group.split(','):
+                part = part.strip()
+                if not part:
+                    continue
+                if '-' in part:
+                    start, end = part.split('-', 1)
+                    cpus.extend(range(int(start), int(end) + 1))
+                else:
+                    cpus.append(int(part))
+            cpu_sets.append(cpus)
+
+        if len(cpu_sets) != workers:
+            raise ValueError(
+                f"model_process_cpu_sets defines {len(cpu_sets)} CPU sets for {workers} workers"
+            )
+        return cpu_sets
+
+    if not hasattr(os, 'sched_getaffinity'):
+        return [None] * workers
+
+    available = sorted(os.sched_getaffinity(0))
+    per_worker = len(available) // workers
+    if per_worker == 0:
+        return [None] * workers
+    return [available[i * per_worker:(i + 1) * per_worker] for i in range(workers)]
+
+
+def _embed_images(model_manager, images_shm: str, shapes: List[tuple],
+                  output_shm: str, embedding_dim: int) -> int:
+    """Run CLIP on uint8 images packed in shared memory, writing embeddings back"""
+    import torch
+
+    clip_model = model_manager.get_model('clip')
+    clip_processor = model_manager.get_processor('clip')
+
+    shm_in = shared_memory.SharedMemory(name=images_shm)
+    shm_out = shared_memory.SharedMemory(name=output_shm)
+    images = []
+    output = None
+    try:
+        offset = 0
+        for shape in shapes:
+            images.append(np.ndarray(shape, dtype=np.uint8, buffer=shm_in.buf, offset=offset))
+            offset += int(np.prod(shape))
+
+        inputs = clip_processor(images=images, return_tensors="pt")
+        inputs = {k: v.to(clip_model.device) for k, v in inputs.items()}
+
+        with torch.no_grad():
+            image_features = clip_model.get_image_features(**inputs)
+
+        output = np.ndarray((len(shapes), embedding_dim), dtype=np.float32, buffer=shm_out.buf)
+        output[:] = image_features.float().cpu().numpy()
+        return len(shapes)
+    finally:
+        # Views must be released before the segments can be closed
+        images.clear()
+        del output
+        shm_in.close()
+        shm_out.close()
+
+
+def _transcribe(model_manager, audio_shm: str, length: int) -> Dict[str, Any]:
+    """Run Whisper on a float32 waveform held in shared memory"""
+    shm = shared_memory.SharedMemory(name=audio_shm)
+    try:
+        audio = np.ndarray((length,), dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+    result = model_manager.get_model('whisper').transcribe(audio)
+    return {"text": result["text"], "language": result.get("language")}
+
+
+_HANDLERS = {
+    'clip_image': _embed_images,
+    'whisper_transcribe': _transcribe
+}
+
+
+def _serve(worker_id: int, cpus: Optional[List[int]], requests, responses):
+    """Model subprocess entry point: load the remote models and serve requests"""
+    import torch
+    from .models import ModelManager
+
+    try:
+        if cpus and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+            torch.set_num_threads(len(cpus))
+
+        model_manager = ModelManager()
+        for model_name in REMOTE_MODELS:
+            model_manager.load_model(model_name)
+
+        clip_model = model_manager.get_model('clip')
+        embedding_dim = getattr(clip_model, 'embedding_dim', None) or clip_model.config.projection_dim
+    except Exception as e:
+        responses.put((None, worker_id, False, f"Failed to load models: {e}"))
+        return
+
+    responses.put((None, worker_id, True, {"pid": os.getpid(), "embedding_dim": embedding_dim}))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+
+        request_id, op, payload = message
+        try:
+            result = _HANDLERS[op](model_manager, **payload)
+            responses.put((request_id, worker_id, True, result))
+        except Exception as e:
+            responses.put((request_id, worker_id, False, f"{op} failed: {e}"))
+
+
+class ModelProcessPool:
+    """Pool of model-serving subprocesses pinned to CPU sets
+
+    Each subprocess holds its own copy of the CLIP and Whisper models and a
+    separate GIL, so image preprocessing and inference scale across cores.
+    Image batches and audio waveforms are handed over through shared-memory
+    segments rather than pickled, and embeddings come back the same way; only
+    small control messages go through the queues. Calls are blocking and are
+    meant to be made from the inference executor.
+
+    A watcher thread waits on the subprocess sentinels. When one exits, its
+    outstanding requests fail and it is restarted, after a growing delay if
+    it died before its models finished loading.
+    """
+
+    def __init__(self, workers: int, cpu_sets: Optional[List[Optional[List[int]]]] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.workers = workers
+        self.cpu_sets = cpu_sets or parse_cpu_sets(settings.model_process_cpu_sets, workers)
+        self.embedding_dim: Optional[int] = None
+
+        self._context = mp.get_context('spawn')
+        self._processes: List[Optional[Any]] = []  # None while a worker waits to be restarted
+        self._request_queues: List[Any] = []
+        self._responses = None
+        self._reader: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[Future, int]] = {}  # request id -> (future, worker id)
+        self._in_flight = [0] * workers
+        self._ready = [False] * workers
+        self._start_failures = [0] * workers
+        self._request_ids = itertools.count()
+
+        # Metrics
+        self.requests_completed = 0
+        self.requests_failed = 0
+        self.restarts = 0
+
+    def _spawn(self, worker_id: int) -> Tuple[Any, Any]:
+        """Start a subprocess for a worker slot, returning its request queue and process"""
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_serve,
+            args=(worker_id, self.cpu_sets[worker_id], requests, self._responses),
+            name=f"model-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        return requests, process
+
+    def start(self):
+        """Start the subprocesses and wait until each has loaded its models"""
+        self._responses = self._context.Queue()
+
+        for worker_id in range(self.workers):
+            requests, process = self._spawn(worker_id)
+            self._request_queues.append(requests)
+            self._processes.append(process)
+
+        deadline = time.monotonic() + settings.model_process_start_timeout
+        for _ in range(self.workers):
+            try:
+                _, worker_id, ok, info = self._responses.get(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                self.shutdown()
+                raise RuntimeError("Timed out waiting for model subprocesses to start")
+
+            if not ok:
+                self.shutdown()
+                raise RuntimeError(f"Model subprocess {worker_id}: {info}")
+
+            self.embedding_dim = info["embedding_dim"]
+            self._ready[worker_id] = True
+            logger.info(
+                f"Model subprocess {worker_id} ready (pid {info['pid']}, "
+                f"cpus {self.cpu_sets[worker_id]})"
+            )
+
+        self._reader = threading.Thread(
+            target=self._read_responses, name="model-pool-reader", daemon=True
+        )
+        self._reader.start()
+        self._watcher = threading.Thread(
+            target=self._watch_processes, name="model-pool-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _read_responses(self):
+        """Resolve pending futures as subprocess responses arrive"""
+        while True:
+            message = self._responses.get()
+            if message is None:
+                break
+
+            request_id, worker_id, ok, result = message
+            if request_id is None:
+                # Readiness report from a restarted subprocess
+                if ok:
+                    with self._lock:
+                        self._ready[worker_id] = True
+                        self._start_failures[worker_id] = 0
+                    logger.info(f"Model subprocess {worker_id} restarted (pid {result['pid']})")
+                else:
+                    logger.error(f"Model subprocess {worker_id}: {result}")
+                continue
+
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is None:
+                    # Already failed when its subprocess exited
+                    continue
+                self._in_flight[worker_id] -= 1
+                if ok:
+                    self.requests_completed += 1
+                else:
+                    self.requests_failed += 1
+
+            future, _ = entry
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _watch_processes(self):
+        """Fail the requests of subprocesses that exit, and restart them"""
+        while not self._stopping.is_set():
+            with self._lock:
+                sentinels = {
+                    process.sentinel: worker_id
+                    for worker_id, process in enumerate(self._processes)
+                    if process is not None
+                }
+            if not sentinels:
+                self._stopping.wait(1.0)
+                continue
+
+            exited = connection.wait(list(sentinels), timeout=1.0)
+            if self._stopping.is_set():
+                break
+            for sentinel in exited:
+                self._handle_exit(sentinels[sentinel])
+
+    def _handle_exit(self, worker_id: int):
+        """Fail an exited subprocess's outstanding requests and schedule its restart"""
+        with self._lock:
+            process = self._processes[worker_id]
+            self._processes[worker_id] = None
+            failed = [
+                self._pending.pop(request_id)[0]
+                for request_id, (_, assigned) in list(self._pending.items())
+                if assigned == worker_id
+            ]
+            self._in_flight[worker_id] = 0
+            self.requests_failed += len(failed)
+
+            # A subprocess that never became ready is restarted with backoff
+            if self._ready[worker_id]:
+                delay = 0.0
+            else:
+                self._start_failures[worker_id] += 1
+                delay = min(MAX_RESTART_DELAY, 2.0 ** self._start_failures[worker_id])
+            self._ready[worker_id] = False
+
+        error = RuntimeError(f"Model subprocess {worker_id} exited with code {process.exitcode}")
+        for future in failed:
+            if not future.done():
+                future.set_exception(error)
+        logger.error(
+            f"Model subprocess {worker_id} (pid {process.pid}) exited with code {process.exitcode}, "
+            f"failed {len(failed)} requests; restarting in {delay:.0f}s"
+        )
+
+        if delay:
+            timer = threading.Timer(delay, self._restart, args=(worker_id,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._restart(worker_id)
+
+    def _restart(self, worker_id: int):
+        """Start a new subprocess in an exited worker's slot"""
+        if self._stopping.is_set():
+            return
+        try:
+            requests, process = self._spawn(worker_id)
+        except Exception as e:
+            logger.error(f"Failed to restart model subprocess {worker_id}: {e}")
+            return
+        with self._lock:
+            self._request_queues[worker_id] = requests
+            self._processes[worker_id] = process
+            self.restarts += 1
+
+    def _submit(self, op: str, **payload) -> Future:
+        """Send a request to the least loaded live subprocess
+
+        The future resolves when the subprocess replies or exits.
+        """
+        if self._reader is None:
+            raise RuntimeError("Model process pool is not running")
+
+        future: Future = Future()
+        with self._lock:
+            live = [i for i in range(self.workers) if self._processes[i] is not None]
+            if not live:
+                raise RuntimeError("No model subprocess is running")
+            request_id = next(self._request_ids)
+            worker_id = min(live, key=lambda i: self._in_flight[i])
+            self._in_flight[worker_id] += 1
+            self._pending[request_id] = (future, worker_id)
+            requests = self._request_queues[worker_id]
+
+        requests.put((request_id, op, payload))
+        return future
+
+    def _call(self, op: str, **payload) -> Any:
+        """Send a request to the least loaded subprocess and wait for its result"""
+        return self._submit(op, **payload).result(timeout=settings.model_process_request_timeout)
+
+    @staticmethod
+    def _release_when_done(future: Optional[Future], *segments: shared_memory.SharedMemory):
+        """Unlink shared memory once no subprocess can still be reading it
+
+        After a timeout the request is still pending, so the segments are
+        released when its subprocess replies or exits.
+        """
+        def release(_=None):
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+
+        if future is None:
+            release()
+        else:
+            future.add_done_callback(release)
+
+    def embed_images(self, images: List[np.ndarray]) -> np.ndarray:
+        """Generate CLIP embeddings for a batch of HxWx3 uint8 images"""
+        images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+        total_bytes = sum(image.nbytes for image in images)
+        output_bytes = len(images) * self.embedding_dim * np.dtype(np.float32).itemsize
+
+        shm_in = shared_memory.SharedMemory(create=True, size=max(1, total_bytes))
+        shm_out = shared_memory.SharedMemory(create=True, size=max(1, output_bytes))
+        future = None
+        try:
+            offset = 0
+            for image in images:
+                shm_in.buf[offset:offset + image.nbytes] = image.tobytes()
+                offset += image.nbytes
+
+            future = self._submit(
+                'clip_image',
+                images_shm=shm_in.name,
+                shapes=[image.shape for image in images],
+                output_shm=shm_out.name,
+                embedding_dim=self.embedding_dim
+            )
+            future.result(timeout=settings.model_process_request_timeout)
+
+            output = np.ndarray((len(images), self.embedding_dim), dtype=np.float32, buffer=shm_out.buf)
+            embeddings = output.copy()
+            del output
+            return embeddings
+        finally:
+            self._release_when_done(future, shm_in, shm_out)
+
+    def transcribe(self, audio: np.ndarray) -> Dict[str, Any]:
+        """Transcribe a 16 kHz float32 waveform with Whisper"""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+        future = None
+        try:
+            shm.buf[:audio.nbytes] = audio.tobytes()
+            future = self._submit('whisper_transcribe', audio_shm=shm.name, length=len(audio))
+            return future.result(timeout=settings.model_process_request_timeout)
+        finally:
+            self._release_when_done(future, shm)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-subprocess liveness and load"""
+        with self._lock:
+            in_flight = list(self._in_flight)
+            ready = list(self._ready)
+            processes = list(self._processes)
+
+        return {
+            "workers": self.workers,
+            "requests_completed": self.requests_completed,
+            "requests_failed": self.requests_failed,
+            "restarts": self.restarts,
+            "processes": [
+                {
+                    "worker_id": worker_id,
+                    "pid": process.pid if process else None,
+                    "alive": process.is_alive() if process else False,
+                    "ready": ready[worker_id],
+                    "cpus": self.cpu_sets[worker_id],
+                    "in_flight": in_flight[worker_id]
+                }
+                for worker_id, process in enumerate(processes)
+            ]
+        }
+
+    def shutdown(self):
+        """Stop the subprocesses and fail any outstanding requests"""
+        # Stop watching first so exiting subprocesses are not restarted
+        self._stopping.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+        for requests in self._request_queues:
+            requests.put(None)
+
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+        if self._reader is not None:
+            self._responses.put(None)
+            self._reader.join(timeout=5)
+            self._reader = None
+
+        with self._lock:
+            pending = [future for future, _ in self._pending.values()]
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Model process pool shut down"))
+
+        self._processes.clear()
+        self._request_queues.clear()
+        logger.info("Model process pool shut down")
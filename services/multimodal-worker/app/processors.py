@@ -1,10 +1,14 @@
 """
 Processing modules for different media types
 """
+import asyncio
+import hashlib
 import logging
 import os
+import shutil
 import tempfile
-from typing import List, Dict, Any, Optional, Tuple
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Awaitable, Callable
 import numpy as np
 import torch
 from PIL import Image
@@ -14,9 +18,34 @@ from moviepy import VideoFileClip
 import librosa
 
 from .config import settings
+from .cache import model_cache_manager
+from .executor import inference_executor
 
 logger = logging.getLogger(__name__)
 
+# progress(stage, fraction) is awaited as a pipeline moves through its stages
+ProgressCallback = Callable[[str, float], Awaitable[None]]
+
+def resolve_caption_profile(caption_profile: Optional[str] = None) -> str:
+    """Resolve a caption decoding profile name, falling back to the default"""
+    profile = caption_profile or settings.default_caption_profile
+    if profile not in settings.caption_profiles:
+        raise ValueError(
+            f"Unknown caption profile '{profile}'. "
+            f"Available: {', '.join(settings.caption_profiles)}"
+        )
+    return profile
+
+def image_content_hash(image: Image.Image) -> str:
+    """Hash an image's decoded pixels, mode and size"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def text_content_hash(text: str) -> str:
+    """Hash a text's UTF-8 bytes"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
 class BaseProcessor:
     """Base class for all processors"""
     
@@ -24,32 +53,108 @@ class BaseProcessor:
         self.model_manager = model_manager
         self.db_manager = db_manager
         self.storage_manager = storage_manager
+    
+    async def report_progress(self, progress: Optional[ProgressCallback], stage: str, fraction: float):
+        """Report a pipeline stage, never failing the pipeline because of it"""
+        if progress is None:
+            return
+        try:
+            await progress(stage, fraction)
+        except Exception as e:
+            logger.error(f"Failed to report progress for stage {stage}: {e}")
+    
+    def load_image(self, image_path: str,
+                   max_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+        """Load an image as RGB, downscaling it to fit within max_size if given"""
+        image = Image.open(image_path).convert('RGB')
+        
+        if max_size and (image.size[0] > max_size[0] or image.size[1] > max_size[1]):
+            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        
+        return image
+    
+    def encode_text(self, texts, **kwargs) -> np.ndarray:
+        """Encode text with the sentence transformer
+        
+        Runs on the inference executor, so the model is fetched (and loaded
+        on first use) off the event loop.
+        """
+        model = self.model_manager.get_model('sentence_transformer')
+        return model.encode(texts, convert_to_numpy=True, **kwargs)
+    
+    async def embed_text(self, text: str) -> np.ndarray:
+        """Embed one text, reading through and writing through the embedding cache"""
+        if not model_cache_manager.connected:
+            return await inference_executor.run('sentence_transformer', self.encode_text, text)
+        
+        model_key = self.model_manager.embedding_model_key('sentence_transformer')
+        content_hash = text_content_hash(text)
+        embedding = await model_cache_manager.get_embedding(content_hash, model_key)
+        if embedding is None:
+            embedding = await inference_executor.run('sentence_transformer', self.encode_text, text)
+            await model_cache_manager.set_embedding(
+                content_hash, model_key, embedding, ttl=settings.embedding_cache_ttl
+            )
+        return embedding
+    
+    async def embed_texts(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Embed texts, encoding only those missing from the embedding cache
+        
+        Cache lookups and writes for the whole batch each take one Redis
+        round trip; the misses are encoded together in one call.
+        """
+        if not model_cache_manager.connected:
+            return await inference_executor.run('sentence_transformer', self.encode_text, texts, **kwargs)
+        
+        model_key = self.model_manager.embedding_model_key('sentence_transformer')
+        content_hashes = [text_content_hash(text) for text in texts]
+        embeddings = await model_cache_manager.get_embeddings(content_hashes, model_key)
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            computed = await inference_executor.run(
+                'sentence_transformer', self.encode_text, [texts[i] for i in missing], **kwargs
+            )
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+            await model_cache_manager.set_embeddings(
+                {content_hashes[i]: embeddings[i] for i in missing},
+                model_key, ttl=settings.embedding_cache_ttl
+            )
+        
+        return np.stack(embeddings)
 
 class ImageProcessor(BaseProcessor):
     """Handles image processing, embedding generation, and captioning"""
     
-    async def process_image(self, image_path: str, document_id: str) -> Dict[str, Any]:
+    async def process_image(self, image_path: str, document_id: str,
+                            caption_profile: Optional[str] = None,
+                            file_hash: Optional[str] = None,
+                            progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """Process an image: generate embeddings, caption, and extract features"""
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            
-            # Resize if too large
-            if image.size[0] > settings.image_max_size[0] or image.size[1] > settings.image_max_size[1]:
-                image.thumbnail(settings.image_max_size, Image.Resampling.LANCZOS)
+            # Load and preprocess image, resizing if too large
+            image = await inference_executor.run(
+                'preprocess', self.load_image, image_path, settings.image_max_size
+            )
             
             # Generate image embedding using CLIP
+            await self.report_progress(progress, "embedding", 0.1)
             embedding = await self.generate_image_embedding(image)
             
             # Generate caption using BLIP
-            caption = await self.generate_image_caption(image)
+            await self.report_progress(progress, "captioning", 0.4)
+            caption = await self.generate_image_caption(image, caption_profile)
             
             # Extract basic features
-            features = self.extract_image_features(image)
+            features = await inference_executor.run(
+                'preprocess', self.extract_image_features, image
+            )
             
             # Store image in MinIO
+            await self.report_progress(progress, "storing", 0.8)
             image_filename = os.path.basename(image_path)
-            file_hash = self.storage_manager.calculate_file_hash(image_path)
+            file_hash = file_hash or self.storage_manager.calculate_file_hash(image_path)
             object_path = self.storage_manager.generate_object_path(
                 file_hash, image_filename, "images"
             )
@@ -81,53 +186,106 @@ class ImageProcessor(BaseProcessor):
                 "storage_path": object_path,
                 "dimensions": image.size
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to process image {image_path}: {e}")
             raise
     
     async def generate_image_embedding(self, image: Image.Image) -> np.ndarray:
-        """Generate CLIP embedding for an image"""
+        """Generate CLIP embedding for an image
+        
+        Embeddings are cached by pixel hash, so duplicate images and re-runs
+        skip inference. Concurrent misses are coalesced by the shared CLIP
+        micro-batcher into a single batched forward pass.
+        """
         try:
-            clip_model = self.model_manager.get_model('clip')
-            clip_processor = self.model_manager.get_processor('clip')
-            
-            # Process image
-            inputs = clip_processor(images=image, return_tensors="pt")
-            inputs = {k: v.to(clip_model.device) for k, v in inputs.items()}
-            
-            # Generate embedding
-            with torch.no_grad():
-                image_features = clip_model.get_image_features(**inputs)
-                embedding = image_features.cpu().numpy().flatten()
+            content_hash = None
+            if model_cache_manager.connected:
+                model_key = self.model_manager.embedding_model_key('clip')
+                content_hash = await inference_executor.run('preprocess', image_content_hash, image)
+                embedding = await model_cache_manager.get_embedding(content_hash, model_key)
+                if embedding is not None:
+                    return embedding
+            
+            batcher = self.model_manager.get_batcher(
+                'clip_image',
+                self.generate_image_embeddings_batch,
+                max_batch_size=settings.clip_batch_max_size,
+                max_wait_ms=settings.clip_batch_max_wait_ms,
+                family='clip'
+            )
+            embedding = await batcher.submit(image)
             
+            if content_hash is not None:
+                await model_cache_manager.set_embedding(
+                    content_hash, model_key, embedding, ttl=settings.embedding_cache_ttl
+                )
             return embedding
-            
+        
         except Exception as e:
             logger.error(f"Failed to generate image embedding: {e}")
             raise
     
-    async def generate_image_caption(self, image: Image.Image) -> str:
-        """Generate caption for an image using BLIP"""
+    def generate_image_embeddings_batch(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """Generate CLIP embeddings for a batch of images in one forward pass"""
+        process_pool = self.model_manager.process_pool
+        if process_pool is not None:
+            return list(process_pool.embed_images([np.asarray(image) for image in images]))
+        
+        clip_model = self.model_manager.get_model('clip')
+        clip_processor = self.model_manager.get_processor('clip')
+        
+        # Process images
+        inputs = clip_processor(images=images, return_tensors="pt")
+        inputs = {k: v.to(clip_model.device) for k, v in inputs.items()}
+        
+        # Generate embeddings
+        with torch.no_grad():
+            image_features = clip_model.get_image_features(**inputs)
+            embeddings = image_features.float().cpu().numpy()
+        
+        return [embedding.flatten() for embedding in embeddings]
+    
+    async def generate_image_caption(self, image: Image.Image,
+                                     caption_profile: Optional[str] = None) -> str:
+        """Generate caption for an image using BLIP
+        
+        Images captioned with the same decoding profile are batched together
+        by the shared BLIP micro-batcher for that profile.
+        """
         try:
-            blip_model = self.model_manager.get_model('blip')
-            blip_processor = self.model_manager.get_processor('blip')
-            
-            # Process image
-            inputs = blip_processor(image, return_tensors="pt")
-            inputs = {k: v.to(blip_model.device) for k, v in inputs.items()}
-            
-            # Generate caption
-            with torch.no_grad():
-                out = blip_model.generate(**inputs, max_length=50, num_beams=5)
-                caption = blip_processor.decode(out[0], skip_special_tokens=True)
-            
-            return caption
-            
+            profile = resolve_caption_profile(caption_profile)
+            batcher = self.model_manager.get_batcher(
+                f'blip_caption:{profile}',
+                partial(self.generate_image_captions_batch, caption_profile=profile),
+                max_batch_size=settings.blip_batch_max_size,
+                max_wait_ms=settings.blip_batch_max_wait_ms,
+                family='blip'
+            )
+            return await batcher.submit(image)
+        
         except Exception as e:
             logger.error(f"Failed to generate image caption: {e}")
             return "Caption generation failed"
     
+    def generate_image_captions_batch(self, images: List[Image.Image],
+                                      caption_profile: Optional[str] = None) -> List[str]:
+        """Generate captions for a batch of images in one generate call"""
+        blip_model = self.model_manager.get_model('blip')
+        blip_processor = self.model_manager.get_processor('blip')
+        decoding = settings.caption_profiles[resolve_caption_profile(caption_profile)]
+        
+        # Process images
+        inputs = blip_processor(images, return_tensors="pt")
+        inputs = {k: v.to(blip_model.device) for k, v in inputs.items()}
+        
+        # Generate captions
+        with torch.no_grad():
+            out = blip_model.generate(**inputs, **decoding)
+            captions = [blip_processor.decode(ids, skip_special_tokens=True) for ids in out]
+        
+        return captions
+    
     def extract_image_features(self, image: Image.Image) -> Dict[str, Any]:
         """Extract basic image features"""
         try:
@@ -144,7 +302,7 @@ class ImageProcessor(BaseProcessor):
             }
             
             return features
-            
+        
         except Exception as e:
             logger.error(f"Failed to extract image features: {e}")
             return {}
@@ -164,7 +322,7 @@ class ImageProcessor(BaseProcessor):
             # Get dominant colors
             colors = kmeans.cluster_centers_.astype(int)
             return colors.tolist()
-            
+        
         except Exception as e:
             logger.error(f"Failed to get dominant colors: {e}")
             return []
@@ -172,16 +330,21 @@ class ImageProcessor(BaseProcessor):
 class VideoProcessor(BaseProcessor):
     """Handles video processing, transcription, and keyframe extraction"""
     
-    async def process_video(self, video_path: str, document_id: str) -> Dict[str, Any]:
+    async def process_video(self, video_path: str, document_id: str,
+                            caption_profile: Optional[str] = None,
+                            file_hash: Optional[str] = None,
+                            progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """Process a video: extract keyframes, transcribe audio, generate embeddings"""
+        keyframe_dir = None
         try:
-            # Load video
-            video_clip = VideoFileClip(video_path)
-            duration = video_clip.duration
-            fps = video_clip.fps
-            size = video_clip.size
+            # Load video metadata
+            await self.report_progress(progress, "probing", 0.05)
+            duration, fps, size = await inference_executor.run(
+                'video', self.probe_video, video_path
+            )
             
             # Extract audio and transcribe
+            await self.report_progress(progress, "transcribing", 0.1)
             transcription = await self.transcribe_video_audio(video_path)
             
             # Generate text embedding for transcription
@@ -189,12 +352,16 @@ class VideoProcessor(BaseProcessor):
             if transcription:
                 text_embedding = await self.generate_text_embedding(transcription)
             
-            # Extract keyframes
-            keyframes = await self.extract_keyframes(video_path, duration)
+            # Extract keyframes into a directory of their own, so videos processed
+            # at the same time never overwrite each other's frames
+            await self.report_progress(progress, "extracting_keyframes", 0.4)
+            keyframe_dir = tempfile.mkdtemp(prefix="keyframes_", dir=settings.temp_dir)
+            keyframes = await self.extract_keyframes(video_path, duration, keyframe_dir)
             
             # Store video in MinIO
+            await self.report_progress(progress, "storing", 0.5)
             video_filename = os.path.basename(video_path)
-            file_hash = self.storage_manager.calculate_file_hash(video_path)
+            file_hash = file_hash or self.storage_manager.calculate_file_hash(video_path)
             object_path = self.storage_manager.generate_object_path(
                 file_hash, video_filename, "videos"
             )
@@ -220,15 +387,30 @@ class VideoProcessor(BaseProcessor):
                 metadata={"keyframe_count": len(keyframes)}
             )
             
-            # Process keyframes
-            processed_keyframes = []
-            for i, (timestamp, keyframe_path) in enumerate(keyframes):
-                keyframe_result = await self.process_keyframe(
-                    video_id, keyframe_path, timestamp
-                )
-                processed_keyframes.append(keyframe_result)
-            
-            video_clip.close()
+            # Process keyframes concurrently so their CLIP and BLIP calls are batched together
+            semaphore = asyncio.Semaphore(settings.keyframe_concurrency)
+            completed = 0
+            
+            async def process_keyframe(timestamp: float, keyframe_path: str) -> Dict[str, Any]:
+                nonlocal completed
+                async with semaphore:
+                    keyframe_result = await self.process_keyframe(
+                        video_id, keyframe_path, timestamp, caption_profile
+                    )
+                completed += 1
+                await self.report_progress(progress, "keyframes", 0.55 + 0.4 * completed / len(keyframes))
+                return keyframe_result
+            
+            # The first failure cancels the remaining keyframes
+            try:
+                async with asyncio.TaskGroup() as task_group:
+                    tasks = [
+                        task_group.create_task(process_keyframe(timestamp, keyframe_path))
+                        for timestamp, keyframe_path in keyframes
+                    ]
+            except ExceptionGroup as group:
+                raise group.exceptions[0]
+            processed_keyframes = [task.result() for task in tasks]
             
             return {
                 "video_id": video_id,
@@ -239,45 +421,87 @@ class VideoProcessor(BaseProcessor):
                 "duration": duration,
                 "dimensions": size
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to process video {video_path}: {e}")
             raise
+        
+        finally:
+            if keyframe_dir:
+                shutil.rmtree(keyframe_dir, ignore_errors=True)
+    
+    def probe_video(self, video_path: str) -> Tuple[float, float, Optional[Tuple[int, int]]]:
+        """Read duration, fps and frame size from a video file"""
+        video_clip = VideoFileClip(video_path)
+        try:
+            return video_clip.duration, video_clip.fps, video_clip.size
+        finally:
+            video_clip.close()
+    
+    def extract_audio(self, video_path: str, audio_path: str) -> bool:
+        """Write a video's audio track to a WAV file, returning False if it has none"""
+        video_clip = VideoFileClip(video_path)
+        try:
+            audio_clip = video_clip.audio
+            if audio_clip is None:
+                return False
+            
+            audio_clip.write_audiofile(audio_path, verbose=False, logger=None)
+            return True
+        finally:
+            video_clip.close()
     
     async def transcribe_video_audio(self, video_path: str) -> str:
         """Transcribe audio from video using Whisper"""
         try:
-            whisper_model = self.model_manager.get_model('whisper')
+            process_pool = self.model_manager.process_pool
             
             # Extract audio from video
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
                 temp_audio_path = temp_audio.name
             
             try:
-                video_clip = VideoFileClip(video_path)
-                audio_clip = video_clip.audio
-                if audio_clip is None:
+                has_audio = await inference_executor.run(
+                    'video', self.extract_audio, video_path, temp_audio_path
+                )
+                if not has_audio:
                     return "No audio track found"
                 
-                audio_clip.write_audiofile(temp_audio_path, verbose=False, logger=None)
-                video_clip.close()
-                
-                # Transcribe using Whisper
-                result = whisper_model.transcribe(temp_audio_path)
+                # Transcribe using Whisper, in a model subprocess if pooled
+                if process_pool is not None:
+                    audio = await inference_executor.run('video', whisper.load_audio, temp_audio_path)
+                    result = await inference_executor.run('whisper', process_pool.transcribe, audio)
+                else:
+                    result = await inference_executor.run(
+                        'whisper', self.transcribe_audio_file, temp_audio_path
+                    )
                 transcription = result["text"].strip()
                 
                 return transcription
-                
+            
             finally:
                 if os.path.exists(temp_audio_path):
                     os.unlink(temp_audio_path)
-            
+        
         except Exception as e:
             logger.error(f"Failed to transcribe video audio: {e}")
             return "Transcription failed"
     
-    async def extract_keyframes(self, video_path: str, duration: float) -> List[Tuple[float, str]]:
-        """Extract keyframes from video at regular intervals"""
+    def transcribe_audio_file(self, audio_path: str) -> Dict[str, Any]:
+        """Transcribe an audio file with the in-process Whisper model"""
+        whisper_model = self.model_manager.get_model('whisper')
+        return whisper_model.transcribe(audio_path)
+    
+    async def extract_keyframes(self, video_path: str, duration: float,
+                                output_dir: str) -> List[Tuple[float, str]]:
+        """Extract keyframes from video at regular intervals into ``output_dir``"""
+        return await inference_executor.run(
+            'video', self.extract_keyframes_sync, video_path, duration, output_dir
+        )
+    
+    def extract_keyframes_sync(self, video_path: str, duration: float,
+                               output_dir: str) -> List[Tuple[float, str]]:
+        """Blocking keyframe extraction, run on the inference executor"""
         try:
             keyframes = []
             interval = settings.keyframe_interval
@@ -297,28 +521,29 @@ class VideoProcessor(BaseProcessor):
                 
                 # Save keyframe
                 keyframe_filename = f"keyframe_{timestamp:.1f}s.jpg"
-                keyframe_path = os.path.join(settings.temp_dir, keyframe_filename)
+                keyframe_path = os.path.join(output_dir, keyframe_filename)
                 
                 cv2.imwrite(keyframe_path, frame)
                 keyframes.append((timestamp, keyframe_path))
             
             cap.release()
             return keyframes
-            
+        
         except Exception as e:
             logger.error(f"Failed to extract keyframes: {e}")
             return []
     
     async def process_keyframe(self, video_id: str, keyframe_path: str, 
-                             timestamp: float) -> Dict[str, Any]:
+                             timestamp: float,
+                             caption_profile: Optional[str] = None) -> Dict[str, Any]:
         """Process a single keyframe"""
         try:
             # Load keyframe as PIL Image
-            image = Image.open(keyframe_path).convert('RGB')
+            image = await inference_executor.run('preprocess', self.load_image, keyframe_path)
             
             # Generate embedding and caption
             embedding = await self.generate_image_embedding(image)
-            caption = await self.generate_image_caption(image)
+            caption = await self.generate_image_caption(image, caption_profile)
             
             # Store keyframe in MinIO
             keyframe_filename = os.path.basename(keyframe_path)
@@ -354,7 +579,7 @@ class VideoProcessor(BaseProcessor):
                 "caption": caption,
                 "storage_path": object_path
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to process keyframe: {e}")
             raise
@@ -366,20 +591,19 @@ class VideoProcessor(BaseProcessor):
         )
         return await image_processor.generate_image_embedding(image)
     
-    async def generate_image_caption(self, image: Image.Image) -> str:
+    async def generate_image_caption(self, image: Image.Image,
+                                     caption_profile: Optional[str] = None) -> str:
         """Generate caption for an image (reused from ImageProcessor)"""
         image_processor = ImageProcessor(
             self.model_manager, self.db_manager, self.storage_manager
         )
-        return await image_processor.generate_image_caption(image)
+        return await image_processor.generate_image_caption(image, caption_profile)
     
     async def generate_text_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text using sentence transformer"""
         try:
-            model = self.model_manager.get_model('sentence_transformer')
-            embedding = model.encode(text, convert_to_numpy=True)
-            return embedding
-            
+            return await self.embed_text(text)
+        
         except Exception as e:
             logger.error(f"Failed to generate text embedding: {e}")
             raise
@@ -389,39 +613,75 @@ class TextProcessor(BaseProcessor):
     
     async def process_text(self, text: str, document_id: str) -> Dict[str, Any]:
         """Process text: chunk it and generate embeddings"""
+        results = await self.process_texts([(text, document_id)])
+        return results[0]
+    
+    async def process_texts(self, documents: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Process several (text, document_id) pairs, embedding all their chunks together
+        
+        Chunks from every document are length-sorted into buckets, each bucket
+        is encoded with one batched sentence-transformer call and persisted
+        with one batched INSERT before the next bucket is encoded.
+        """
         try:
-            # Split text into chunks
-            chunks = self.chunk_text(text)
+            # Split every document into chunks
+            entries = []  # (document position, chunk index, chunk text)
+            for position, (text, _) in enumerate(documents):
+                for i, chunk in enumerate(self.chunk_text(text)):
+                    entries.append((position, i, chunk))
+            
+            processed = [[] for _ in documents]
             
-            processed_chunks = []
-            for i, chunk in enumerate(chunks):
-                # Generate embedding
-                embedding = await self.generate_text_embedding(chunk)
+            async for indices, embeddings in self.iter_text_embeddings([e[2] for e in entries]):
+                bucket = [entries[i] for i in indices]
                 
-                # Create database record
-                chunk_id = await self.db_manager.create_text_chunk(
-                    document_id=document_id,
-                    chunk_text=chunk,
-                    chunk_index=i,
-                    embedding_id=None  # Will be set after storing in Qdrant
-                )
+                # Create database records for the whole bucket
+                chunk_ids = await self.db_manager.create_text_chunks([
+                    {
+                        "document_id": documents[position][1],
+                        "chunk_text": chunk,
+                        "chunk_index": chunk_index,
+                        "embedding_id": None  # Will be set after storing in Qdrant
+                    }
+                    for position, chunk_index, chunk in bucket
+                ])
                 
-                processed_chunks.append({
-                    "chunk_id": chunk_id,
-                    "chunk_index": i,
-                    "text": chunk,
-                    "embedding": embedding
+                for (position, chunk_index, chunk), chunk_id, embedding in zip(bucket, chunk_ids, embeddings):
+                    processed[position].append({
+                        "chunk_id": chunk_id,
+                        "chunk_index": chunk_index,
+                        "text": chunk,
+                        "embedding": embedding
+                    })
+            
+            results = []
+            for chunks in processed:
+                chunks.sort(key=lambda c: c["chunk_index"])
+                results.append({
+                    "chunks": chunks,
+                    "total_chunks": len(chunks)
                 })
             
-            return {
-                "chunks": processed_chunks,
-                "total_chunks": len(chunks)
-            }
-            
+            return results
+        
         except Exception as e:
             logger.error(f"Failed to process text: {e}")
             raise
     
+    async def iter_text_embeddings(self, texts: List[str]) -> AsyncIterator[Tuple[List[int], np.ndarray]]:
+        """Embed texts in length-sorted buckets, yielding (original indices, embeddings)
+        
+        Sorting by length keeps similarly sized chunks in the same forward
+        pass, which minimises padding.
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        bucket_size = settings.text_embedding_bucket_size
+        
+        for start in range(0, len(order), bucket_size):
+            indices = order[start:start + bucket_size]
+            embeddings = await self.generate_text_embeddings([texts[i] for i in indices])
+            yield indices, embeddings
+    
     def chunk_text(self, text: str) -> List[str]:
         """Split text into overlapping chunks"""
         words = text.split()
@@ -448,11 +708,18 @@ class TextProcessor(BaseProcessor):
     async def generate_text_embedding(self, text: str) -> np.ndarray:
         """Generate embedding for text using sentence transformer"""
         try:
-            model = self.model_manager.get_model('sentence_transformer')
-            embedding = model.encode(text, convert_to_numpy=True)
-            return embedding
-            
+            return await self.embed_text(text)
+        
         except Exception as e:
             logger.error(f"Failed to generate text embedding: {e}")
             raise
+    
+    async def generate_text_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for a batch of texts in one encode call"""
+        try:
+            return await self.embed_texts(texts, batch_size=settings.text_embedding_batch_size)
+        
+        except Exception as e:
+            logger.error(f"Failed to generate text embeddings: {e}")
+            raise
 
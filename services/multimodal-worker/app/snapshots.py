@@ -0,0 +1,195 @@
+"""
+Pre-serialized model snapshots for fast worker cold starts
+
+A snapshot is a directory per model holding its weights as safetensors,
+which are memory-mapped on load instead of unpickled, so worker processes
+on one host can share the page cache. A ``snapshot.json`` manifest records
+the source model, dtype and device. Create them once per host or image with:
+
+    python -m app.snapshots [--models clip blip whisper sentence_transformer]
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+import whisper
+from safetensors.torch import load_file, save_file
+from sentence_transformers import SentenceTransformer
+from transformers import (
+    CLIPProcessor, CLIPModel,
+    BlipProcessor, BlipForConditionalGeneration
+)
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "snapshot.json"
+WHISPER_WEIGHTS_FILE = "whisper.safetensors"
+
+# Hugging Face model classes that round-trip through save_pretrained
+PRETRAINED_CLASSES = {
+    'clip': (CLIPModel, CLIPProcessor),
+    'blip': (BlipForConditionalGeneration, BlipProcessor)
+}
+
+
+def source_id(model_name: str) -> str:
+    """Get the configured model identifier (and pinned revision) a snapshot must match"""
+    source = {
+        'clip': settings.clip_model,
+        'blip': settings.blip_model,
+        'whisper': settings.whisper_model,
+        'sentence_transformer': settings.sentence_transformer_model
+    }[model_name]
+    revision = settings.model_revisions.get(model_name)
+    return f"{source}@{revision}" if revision else source
+
+
+def snapshot_dir(model_name: str) -> str:
+    """Get the snapshot directory for a model"""
+    return os.path.join(settings.model_snapshot_dir, model_name)
+
+
+def read_manifest(model_name: str) -> Optional[Dict[str, Any]]:
+    """Read a model's snapshot manifest, or None if there is no snapshot"""
+    path = os.path.join(snapshot_dir(model_name), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def has_snapshot(model_name: str) -> bool:
+    """Whether a snapshot exists for the currently configured model"""
+    manifest = read_manifest(model_name)
+    if manifest is None:
+        return False
+    if manifest.get("source") != source_id(model_name):
+        logger.warning(
+            f"Ignoring stale {model_name} snapshot of {manifest.get('source')}, "
+            f"configured model is {source_id(model_name)}"
+        )
+        return False
+    return True
+
+
+def _model_dtype(model: Any) -> Optional[str]:
+    """Get the dtype of a model's first parameter"""
+    if isinstance(model, torch.nn.Module):
+        for param in model.parameters():
+            return str(param.dtype).replace('torch.', '')
+    return None
+
+
+def write_snapshot(model_name: str, model: Any, processor: Any = None) -> str:
+    """Write a loaded model (and processor) to its snapshot directory"""
+    path = snapshot_dir(model_name)
+    os.makedirs(path, exist_ok=True)
+    manifest = {
+        "model": model_name,
+        "source": source_id(model_name),
+        "format": "safetensors",
+        "dtype": _model_dtype(model),
+        "device": str(settings.device),
+        "torch_version": torch.__version__,
+        "created_at": time.time()
+    }
+
+    if model_name in PRETRAINED_CLASSES:
+        model.save_pretrained(path, safe_serialization=True)
+        processor.save_pretrained(path)
+
+    elif model_name == 'whisper':
+        state_dict = {k: v.detach().cpu().contiguous() for k, v in model.state_dict().items()}
+        save_file(state_dict, os.path.join(path, WHISPER_WEIGHTS_FILE))
+        manifest["dims"] = dataclasses.asdict(model.dims)
+        manifest["whisper_size"] = settings.whisper_model.split('/')[-1]
+
+    elif model_name == 'sentence_transformer':
+        model.save(path, safe_serialization=True)
+
+    else:
+        raise ValueError(f"Unknown model '{model_name}'")
+
+    # Write the manifest last so a partial snapshot is never picked up
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Wrote {model_name} snapshot to {path}")
+    return path
+
+
+def load_snapshot(model_name: str, device: torch.device) -> Tuple[Any, Any]:
+    """Load a model (and processor, if it has one) from its snapshot"""
+    path = snapshot_dir(model_name)
+    manifest = read_manifest(model_name)
+
+    if model_name in PRETRAINED_CLASSES:
+        model_class, processor_class = PRETRAINED_CLASSES[model_name]
+        model = model_class.from_pretrained(
+            path, local_files_only=True, low_cpu_mem_usage=True, use_safetensors=True
+        ).to(device)
+        return model, processor_class.from_pretrained(path, local_files_only=True)
+
+    if model_name == 'whisper':
+        state_dict = load_file(os.path.join(path, WHISPER_WEIGHTS_FILE))
+        model = whisper.model.Whisper(whisper.model.ModelDimensions(**manifest["dims"]))
+        model.load_state_dict(state_dict, assign=True)
+        alignment_heads = whisper._ALIGNMENT_HEADS.get(manifest.get("whisper_size"))
+        if alignment_heads:
+            model.set_alignment_heads(alignment_heads)
+        return model.to(device), None
+
+    if model_name == 'sentence_transformer':
+        return SentenceTransformer(path, device=device, local_files_only=True), None
+
+    raise ValueError(f"Unknown model '{model_name}'")
+
+
+def create_snapshots(model_names: List[str]) -> Dict[str, str]:
+    """Load models from their pretrained sources and write snapshots for them"""
+    from .models import ModelManager
+
+    model_manager = ModelManager()
+    paths = {}
+    for model_name in model_names:
+        # Always start from the pretrained PyTorch source, not an older snapshot
+        # or an ONNX export, which cannot be saved as a snapshot
+        model, processor, _ = model_manager._load_model(model_name, use_snapshot=False, backend='torch')
+        paths[model_name] = write_snapshot(model_name, model, processor)
+        del model, processor
+
+    return paths
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point"""
+    from .models import MODEL_NAMES
+
+    parser = argparse.ArgumentParser(description="Write memory-mappable model snapshots")
+    parser.add_argument(
+        "--models", nargs="+", choices=MODEL_NAMES, default=list(MODEL_NAMES),
+        help="Models to snapshot (default: all)"
+    )
+    parser.add_argument(
+        "--output", default=None,
+        help=f"Snapshot directory (default: {settings.model_snapshot_dir})"
+    )
+    args = parser.parse_args(argv)
+
+    if args.output:
+        settings.model_snapshot_dir = args.output
+
+    logging.basicConfig(level=logging.INFO)
+    for model_name, path in create_snapshots(args.models).items():
+        print(f"{model_name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
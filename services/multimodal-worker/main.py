@@ -23,8 +23,10 @@ from app.processors import (
     VideoProcessor,
     TextProcessor,
 )
-from app.api import router
+from app.api import router, job_handlers
 from app.cache import model_cache_manager
+from app.jobs import job_queue
+from app.executor import inference_executor
 
 # Configure logging
 logging.basicConfig(
@@ -46,6 +48,9 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Multimodal Worker Service...")
     
     try:
+        # Start the inference executor before any model work
+        inference_executor.initialize()
+        
         # Initialize managers
         model_manager = ModelManager()
         db_manager = DatabaseManager()
@@ -72,6 +77,16 @@ async def lifespan(app: FastAPI):
         app.state.db_manager = db_manager
         app.state.storage_manager = storage_manager
         app.state.cache_manager = model_cache_manager
+        app.state.inference_executor = inference_executor
+        
+        # Start the ingestion job workers
+        await job_queue.start(job_handlers({
+            'model_manager': model_manager,
+            'db_manager': db_manager,
+            'storage_manager': storage_manager,
+            'cache_manager': model_cache_manager
+        }))
+        app.state.job_queue = job_queue
         
         yield
         
@@ -80,6 +95,7 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         logger.info("Shutting down Multimodal Worker Service...")
+        await job_queue.stop()
         if model_manager:
             await model_manager.cleanup()
         if db_manager:
@@ -88,6 +104,7 @@ async def lifespan(app: FastAPI):
             await storage_manager.close()
         if model_cache_manager:
             await model_cache_manager.close()
+        inference_executor.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -448,13 +448,20 @@ class TestMultimodalWorkerAPI:
 
     def test_models_status_endpoint(self, client):
         """Test models status endpoint"""
-        response = client.get("/api/v1/models/status")
-        assert response.status_code == 200
-        data = response.json()
-        assert "clip" in data
-        assert "blip" in data
-        assert "whisper" in data
-        assert "sentence_transformer" in data
+        with patch.object(client.app.state, 'model_manager', create=True) as mock_model_manager:
+            mock_model_manager.get_model_status.return_value = {
+                name: {"status": "loaded", "load_time_s": 1.0, "bytes": 1024, "device": "cpu"}
+                for name in ("clip", "blip", "whisper", "sentence_transformer")
+            }
+            mock_model_manager.get_startup_report.return_value = {"wall_time_s": 1.5}
+
+            response = client.get("/api/v1/models/status")
+            assert response.status_code == 200
+            data = response.json()
+            assert "clip" in data["models"]
+            assert "blip" in data["models"]
+            assert "whisper" in data["models"]
+            assert "sentence_transformer" in data["models"]
 
     def test_storage_status_endpoint(self, client):
         """Test storage status endpoint"""
@@ -7,7 +7,9 @@ import base64
 import tempfile
 import os
 from io import BytesIO
+import hashlib
 from PIL import Image
+from fastapi import HTTPException
 
 # Set test environment variables before importing main
 os.environ['TEST_CACHE_DIR'] = tempfile.mkdtemp(prefix="test_cache_")
@@ -19,7 +21,8 @@ os.makedirs(os.environ['TEST_MODEL_CACHE_DIR'], exist_ok=True)
 
 # Import FastAPI app directly without lifespan
 from fastapi import FastAPI
-from app.api import router
+from app.api import router, save_upload
+from app.jobs import QueueFullError
 
 # Create a test app without lifespan
 app = FastAPI()
@@ -30,6 +33,7 @@ app.state.model_manager = Mock()
 app.state.db_manager = AsyncMock()
 app.state.storage_manager = Mock()
 app.state.cache_manager = Mock()
+app.state.job_queue = AsyncMock()
 
 
 class TestMultimodalWorkerAPIUnit:
@@ -240,6 +244,59 @@ class TestMultimodalWorkerAPIUnit:
             assert "document_id" in data["data"]
             assert "chunks" in data["data"]
 
+    def test_process_text_models_not_ready(self, client):
+        """Test that processing fails fast with 503 while models are loading"""
+        client.app.state.model_manager.is_ready = False
+        client.app.state.db_manager.create_document.reset_mock()
+        try:
+            response = client.post(
+                "/process/text",
+                json={"text": "Test text content"}
+            )
+
+            assert response.status_code == 503
+            client.app.state.db_manager.create_document.assert_not_called()
+        finally:
+            client.app.state.model_manager.is_ready = True
+
+    def test_process_endpoints_reuse_app_state_managers(self, client):
+        """Test that endpoints use the shared managers instead of building new ones"""
+        client.app.state.db_manager.get_document_by_hash.return_value = None
+        client.app.state.db_manager.create_document.return_value = "test_document_id"
+
+        with patch('app.api.TextProcessor') as mock_text_processor:
+            mock_processor_instance = AsyncMock()
+            mock_processor_instance.process_text.return_value = {"chunks": [], "total_chunks": 0}
+            mock_text_processor.return_value = mock_processor_instance
+
+            response = client.post("/process/text", json={"text": "Shared managers"})
+
+            assert response.status_code == 200
+            mock_text_processor.assert_called_once_with(
+                client.app.state.model_manager,
+                client.app.state.db_manager,
+                client.app.state.storage_manager
+            )
+            client.app.state.model_manager.cleanup.assert_not_called()
+
+    def test_process_text_hash_claimed_concurrently(self, client):
+        """Test that losing the content-hash claim returns the other request's document"""
+        db_manager = client.app.state.db_manager
+        db_manager.get_document_by_hash.side_effect = [None, {"id": "claimed_document_id"}]
+        db_manager.create_document.return_value = None
+        try:
+            with patch('app.api.TextProcessor') as mock_text_processor:
+                response = client.post("/process/text", json={"text": "Claimed elsewhere"})
+
+                assert response.status_code == 200
+                data = response.json()
+                assert data["message"] == "Document already processed"
+                assert data["data"]["document_id"] == "claimed_document_id"
+                mock_text_processor.assert_not_called()
+        finally:
+            db_manager.get_document_by_hash.side_effect = None
+            db_manager.create_document.return_value = "test_document_id"
+
     def test_models_status_endpoint(self, client):
         """Test models status endpoint"""
         # Mock model manager
@@ -248,11 +305,17 @@ class TestMultimodalWorkerAPIUnit:
             "blip_model": "loaded",
             "whisper_model": "loaded"
         }
+        client.app.state.model_manager.get_startup_report.return_value = {
+            "wall_time_s": 4.2,
+            "load_concurrency": 2,
+            "sum_of_load_times_s": 7.9
+        }
 
         response = client.get("/models/status")
         assert response.status_code == 200
         data = response.json()
         assert "models" in data
+        assert data["startup"]["wall_time_s"] == 4.2
 
     def test_storage_status_endpoint(self, client):
         """Test storage status endpoint"""
@@ -320,3 +383,204 @@ class TestMultimodalWorkerAPIUnit:
         """Test method not allowed"""
         response = client.get("/process/image")
         assert response.status_code == 405
+
+
+    def test_preflight_known_content(self, client):
+        """Test that pre-flight answers from the content hash lookup"""
+        client.app.state.db_manager.get_document_by_hash.return_value = {"id": "existing_id", "file_size": 2048}
+        content_hash = "AB" * 32
+
+        response = client.post("/process/preflight", json={"content_hash": content_hash, "file_size": 2048})
+
+        assert response.status_code == 200
+        assert response.json() == {"content_hash": "ab" * 32, "exists": True, "document_id": "existing_id"}
+        client.app.state.db_manager.get_document_by_hash.assert_called_with("ab" * 32)
+
+    def test_preflight_size_mismatch_is_not_a_match(self, client):
+        """Test that a known hash with a different size is reported as not ingested"""
+        client.app.state.db_manager.get_document_by_hash.return_value = {"id": "existing_id", "file_size": 2048}
+
+        response = client.post("/process/preflight", json={"content_hash": "ab" * 32, "file_size": 10})
+
+        assert response.json()["exists"] is False
+
+    def test_preflight_rejects_invalid_hash(self, client):
+        """Test that malformed hashes are rejected"""
+        response = client.post("/process/preflight", json={"content_hash": "not-a-hash"})
+        assert response.status_code == 400
+
+    def test_known_client_hash_skips_upload(self, client, temp_image_file):
+        """Test that a client-supplied hash of known content short-circuits before the upload is copied"""
+        client.app.state.db_manager.get_document_by_hash.return_value = {"id": "existing_id"}
+
+        with patch('app.api.save_upload') as mock_save_upload, open(temp_image_file, 'rb') as f:
+            response = client.post(
+                "/process/image",
+                files={"file": ("test.jpg", f, "image/jpeg")},
+                data={"content_hash": "ab" * 32}
+            )
+
+        data = response.json()
+        assert data["message"] == "Document already processed"
+        assert data["data"]["document_id"] == "existing_id"
+        mock_save_upload.assert_not_called()
+
+    def test_client_hash_is_verified(self, client, temp_image_file):
+        """Test that a client-supplied hash that does not match the upload fails"""
+        client.app.state.db_manager.get_document_by_hash.return_value = None
+
+        with open(temp_image_file, 'rb') as f:
+            response = client.post(
+                "/process/image",
+                files={"file": ("test.jpg", f, "image/jpeg")},
+                data={"content_hash": "ab" * 32}
+            )
+
+        data = response.json()
+        assert data["success"] is False
+        assert "does not match" in data["error"]
+
+
+class TestJobEndpoints:
+    """Unit tests for the asynchronous ingestion job endpoints"""
+
+    @pytest.fixture
+    def client(self):
+        """Create test client with a fresh job queue mock"""
+        app.state.job_queue = AsyncMock()
+        app.state.job_queue.submit.return_value = {"id": "job1", "status": "queued"}
+        return TestClient(app)
+
+    @pytest.fixture
+    def temp_image_file(self):
+        """Create temporary image file for testing"""
+        image = Image.new('RGB', (100, 100), color='blue')
+        temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
+        image.save(temp_file.name, 'JPEG')
+        temp_file.close()
+        yield temp_file.name
+        os.unlink(temp_file.name)
+
+    def test_submit_text_job_returns_job_id(self, client):
+        """Test that a submission is answered at once with a job ID and status URL"""
+        response = client.post("/jobs/text", json={"text": "Queued text"})
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["job_id"] == "job1"
+        assert data["status_url"].endswith("/jobs/job1")
+        kind, payload = client.app.state.job_queue.submit.call_args[0]
+        assert kind == "text"
+        assert payload["text"] == "Queued text"
+
+    def test_submit_image_job_spools_upload(self, client, temp_image_file, tmp_path):
+        """Test that an uploaded image is spooled and hashed before it is queued"""
+        with patch('app.api.settings.job_spool_dir', str(tmp_path)), open(temp_image_file, 'rb') as f:
+            response = client.post("/jobs/image", files={"file": ("test.jpg", f, "image/jpeg")})
+
+        assert response.status_code == 202
+        kind, payload = client.app.state.job_queue.submit.call_args[0]
+        assert kind == "image"
+        assert os.path.dirname(payload["temp_path"]) == str(tmp_path)
+        with open(temp_image_file, 'rb') as f:
+            assert payload["file_hash"] == hashlib.sha256(f.read()).hexdigest()
+
+    def test_full_queue_rejects_before_spooling(self, client, temp_image_file):
+        """Test that a full queue answers 429 with Retry-After without copying the upload"""
+        client.app.state.job_queue.check_capacity.side_effect = QueueFullError("Job queue is full")
+
+        with patch('app.api.save_upload') as mock_save_upload, open(temp_image_file, 'rb') as f:
+            response = client.post("/jobs/image", files={"file": ("test.jpg", f, "image/jpeg")})
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        mock_save_upload.assert_not_called()
+
+    def test_job_status_reports_stage(self, client):
+        """Test that job status shows the current stage without internal fields"""
+        client.app.state.job_queue.get.return_value = {
+            "id": "job1", "kind": "video", "status": "running", "stage": "transcribing",
+            "progress": 0.1, "attempts": 1, "payload": {"temp_path": "/tmp/upload.mp4"}
+        }
+
+        response = client.get("/jobs/job1")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["stage"] == "transcribing"
+        assert "payload" not in data
+
+        assert client.get("/jobs/job1/result").status_code == 409
+
+    def test_job_result_when_completed(self, client):
+        """Test that a finished job returns its processing result"""
+        client.app.state.job_queue.get.return_value = {
+            "id": "job1", "kind": "text", "status": "completed", "stage": "completed",
+            "progress": 1.0, "attempts": 1,
+            "result": {"success": True, "message": "Text processed successfully",
+                       "data": {"document_id": "doc1"}, "error": None}
+        }
+
+        response = client.get("/jobs/job1/result")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["document_id"] == "doc1"
+
+    def test_unknown_job(self, client):
+        """Test that unknown or expired jobs return 404"""
+        client.app.state.job_queue.get.return_value = None
+
+        assert client.get("/jobs/missing").status_code == 404
+
+
+class TestSaveUpload:
+    """Unit tests for streaming uploads to disk"""
+
+    @staticmethod
+    def _upload(data: bytes, chunk_reads: list):
+        """Create an upload that records the size of each read"""
+        stream = BytesIO(data)
+
+        async def read(size=-1):
+            chunk_reads.append(size)
+            return stream.read(size)
+
+        return Mock(filename="clip.mp4", read=read)
+
+    @pytest.mark.asyncio
+    async def test_upload_is_streamed_and_hashed_in_one_pass(self):
+        """Test that the upload is copied in bounded chunks and hashed on the way"""
+        data = os.urandom(10_000)
+        reads = []
+
+        with patch('app.api.settings.upload_chunk_size', 4096):
+            temp_path, file_hash, file_size = await save_upload(self._upload(data, reads))
+
+        try:
+            assert reads == [4096] * 4
+            assert file_hash == hashlib.sha256(data).hexdigest()
+            assert file_size == len(data)
+            assert temp_path.endswith(".mp4")
+            with open(temp_path, 'rb') as f:
+                assert f.read() == data
+        finally:
+            os.unlink(temp_path)
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_is_rejected_and_removed(self):
+        """Test that the size limit is enforced while streaming and the temp file is deleted"""
+        created = []
+        real_mkstemp = tempfile.mkstemp
+
+        def mkstemp(**kwargs):
+            fd, path = real_mkstemp(**kwargs)
+            created.append(path)
+            return fd, path
+
+        with patch('app.api.settings.max_file_size', 1000), \
+             patch('app.api.settings.upload_chunk_size', 512), \
+             patch('app.api.tempfile.mkstemp', side_effect=mkstemp):
+            with pytest.raises(HTTPException):
+                await save_upload(self._upload(b"x" * 2000, []))
+
+        assert not os.path.exists(created[0])
@@ -0,0 +1,88 @@
+"""
+Unit tests for micro-batching in multimodal-worker service
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock
+
+from app.batching import MicroBatcher
+
+
+class TestMicroBatcher:
+    """Test cases for MicroBatcher"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_batch(self):
+        """Test that concurrent submissions are run as one batch"""
+        batch_fn = Mock(side_effect=lambda items: [item * 2 for item in items])
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=8, max_wait_ms=50)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert results == [0, 2, 4, 6, 8]
+        batch_fn.assert_called_once_with([0, 1, 2, 3, 4])
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self):
+        """Test that batches never exceed max_batch_size"""
+        batch_sizes = []
+
+        def batch_fn(items):
+            batch_sizes.append(len(items))
+            return items
+
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=2, max_wait_ms=50)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert results == [0, 1, 2, 3, 4]
+        assert max(batch_sizes) <= 2
+        assert sum(batch_sizes) == 5
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_failure_propagates_to_callers(self):
+        """Test that a failed batch raises in every waiting caller"""
+        batch_fn = Mock(side_effect=RuntimeError("inference failed"))
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=4, max_wait_ms=10)
+
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert batcher.get_stats()["failed_batches"] == 1
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_result_count_mismatch(self):
+        """Test that a batch function returning the wrong number of rows fails"""
+        batcher = MicroBatcher("test", lambda items: items[:1], max_batch_size=4, max_wait_ms=10)
+
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        """Test fill ratio and queue wait metrics"""
+        batcher = MicroBatcher("test", lambda items: items, max_batch_size=4, max_wait_ms=10)
+
+        await asyncio.gather(batcher.submit(1), batcher.submit(2))
+        stats = batcher.get_stats()
+
+        assert stats["batches_processed"] == 1
+        assert stats["items_processed"] == 2
+        assert stats["avg_fill_ratio"] == pytest.approx(0.5)
+        assert stats["avg_queue_wait_ms"] >= 0
+        assert stats["max_queue_wait_ms"] >= stats["avg_queue_wait_ms"]
+        await batcher.close()
+
+    def test_invalid_batch_size(self):
+        """Test that a non-positive batch size is rejected"""
+        with pytest.raises(ValueError):
+            MicroBatcher("test", lambda items: items, max_batch_size=0)
@@ -0,0 +1,276 @@
+"""
+Unit tests for the Redis cache manager in multimodal-worker service
+"""
+import pickle
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+import numpy as np
+
+from app.cache import ModelCacheManager, LocalCache, CORPUS_GENERATION_KEY, CORPUS_GENERATION_CHANNEL
+from app.embedding_codec import encode_embedding, decode_embedding
+
+
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def cache_manager():
+    """Create a cache manager with a mocked Redis connection"""
+    manager = ModelCacheManager()
+    manager.redis = AsyncMock()
+    manager.redis.pipeline = Mock(return_value=Mock(execute=AsyncMock(return_value=[])))
+    manager.connected = True
+    return manager
+
+
+class TestEmbeddingCache:
+    """Test cases for embedding caching"""
+
+    @pytest.mark.asyncio
+    async def test_get_embedding_counts_hits_and_misses(self, cache_manager):
+        """Test that single lookups update the per-model counters"""
+        embedding = np.arange(4, dtype=np.float32)
+        cache_manager.redis.get.side_effect = [encode_embedding(embedding, "clip@main:fp32"), None]
+
+        assert np.array_equal(await cache_manager.get_embedding("hash1", "clip@main:fp32"), embedding)
+        assert await cache_manager.get_embedding("hash2", "clip@main:fp32") is None
+
+        stats = cache_manager.get_embedding_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 50
+        assert stats["models"]["clip@main:fp32"] == {"hits": 1, "misses": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_embeddings_uses_one_round_trip(self, cache_manager):
+        """Test that batched lookups use MGET and keep the input order"""
+        embedding = np.ones(4, dtype=np.float32)
+        cache_manager.redis.mget.return_value = [None, encode_embedding(embedding, "st@main:fp32"), None]
+
+        embeddings = await cache_manager.get_embeddings(["a", "b", "c"], "st@main:fp32")
+
+        assert embeddings[0] is None and embeddings[2] is None
+        assert np.array_equal(embeddings[1], embedding)
+        cache_manager.redis.mget.assert_called_once_with([
+            "embedding:st@main:fp32:a", "embedding:st@main:fp32:b", "embedding:st@main:fp32:c"
+        ])
+        assert cache_manager.embedding_hits["st@main:fp32"] == 1
+        assert cache_manager.embedding_misses["st@main:fp32"] == 2
+
+    @pytest.mark.asyncio
+    async def test_pickled_embedding_is_migrated(self, cache_manager):
+        """Test that entries pickled by older versions are read and rewritten in the binary format"""
+        embedding = np.arange(4, dtype=np.float32)
+        cache_manager.redis.get.return_value = pickle.dumps(embedding)
+
+        result = await cache_manager.get_embedding("hash1", "clip@main:fp32")
+
+        assert np.array_equal(result, embedding)
+        cache_key, data = cache_manager.redis.set.call_args[0]
+        assert cache_key == "embedding:clip@main:fp32:hash1"
+        assert cache_manager.redis.set.call_args.kwargs["keepttl"] is True
+        assert np.array_equal(decode_embedding(data, "clip@main:fp32"), embedding)
+
+    @pytest.mark.asyncio
+    async def test_embedding_from_other_revision_is_a_miss(self, cache_manager):
+        """Test that a vector stored under another model revision is not served"""
+        cache_manager.redis.get.return_value = encode_embedding(np.ones(4), "clip@old:fp32")
+
+        assert await cache_manager.get_embedding("hash1", "clip@main:fp32") is None
+        assert cache_manager.embedding_misses["clip@main:fp32"] == 1
+
+    @pytest.mark.asyncio
+    async def test_set_embeddings_pipelines_writes(self, cache_manager):
+        """Test that batched writes go through one pipeline with the given TTL"""
+        pipe = Mock()
+        pipe.execute = AsyncMock()
+        cache_manager.redis.pipeline = Mock(return_value=pipe)
+
+        assert await cache_manager.set_embeddings(
+            {"a": np.zeros(2), "b": np.ones(2)}, "st@main:fp32", ttl=60
+        )
+
+        assert pipe.setex.call_count == 2
+        cache_key, ttl, data = pipe.setex.call_args_list[1][0]
+        assert (cache_key, ttl) == ("embedding:st@main:fp32:b", 60)
+        assert np.array_equal(decode_embedding(data), np.ones(2))
+        pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_disconnected_cache_is_bypassed(self):
+        """Test that lookups without Redis return misses without counting them"""
+        manager = ModelCacheManager()
+
+        assert await manager.get_embeddings(["a", "b"], "clip@main:fp32") == [None, None]
+        assert not await manager.set_embeddings({"a": np.zeros(2)}, "clip@main:fp32")
+        assert manager.get_embedding_stats()["hits"] == 0
+        assert manager.get_embedding_stats()["misses"] == 0
+
+
+class TestLocalCache:
+    """Test cases for the in-process cache tier"""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full"""
+        cache = LocalCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL"""
+        cache = LocalCache(max_entries=10, ttl=5)
+        with patch('app.cache.time.monotonic', return_value=100.0):
+            cache.set("a", 1)
+        with patch('app.cache.time.monotonic', return_value=106.0):
+            assert cache.get("a") is None
+
+        assert cache.get_stats()["entries"] == 0
+
+    def test_invalidate_pattern(self):
+        """Test that invalidation drops matching keys only"""
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.set("embedding:clip:abc", 1)
+        cache.set("embedding:st:abc", 2)
+        cache.set("embedding:clip:def", 3)
+
+        assert cache.invalidate("embedding:*:abc") == 2
+        assert cache.get("embedding:clip:def") == 3
+        assert cache.get_stats()["invalidations"] == 2
+
+
+class TestTwoTierEmbeddingCache:
+    """Test cases for the in-process tier in front of Redis"""
+
+    @pytest.mark.asyncio
+    async def test_local_hit_skips_redis(self, cache_manager):
+        """Test that a vector read from Redis is served locally the next time"""
+        embedding = np.arange(4, dtype=np.float32)
+        cache_manager.redis.get.return_value = encode_embedding(embedding, "clip@main:fp32")
+
+        await cache_manager.get_embedding("hash1", "clip@main:fp32")
+        result = await cache_manager.get_embedding("hash1", "clip@main:fp32")
+
+        assert np.array_equal(result, embedding)
+        cache_manager.redis.get.assert_called_once()
+
+        stats = cache_manager.get_embedding_stats()
+        assert stats["hits"] == 2
+        assert stats["l1"]["hits"] == 1
+        assert stats["l2"] == {"hits": 1, "misses": 0, "hit_rate": 100}
+
+    @pytest.mark.asyncio
+    async def test_batch_lookup_only_fetches_local_misses(self, cache_manager):
+        """Test that MGET is only sent for keys missing from the in-process tier"""
+        cache_manager.local_cache.set("embedding:st@main:fp32:a", np.zeros(4))
+        cache_manager.redis.mget.return_value = [None]
+
+        embeddings = await cache_manager.get_embeddings(["a", "b"], "st@main:fp32")
+
+        assert embeddings[1] is None
+        cache_manager.redis.mget.assert_called_once_with(["embedding:st@main:fp32:b"])
+        assert cache_manager.l2_misses == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_is_published(self, cache_manager):
+        """Test that file invalidation clears the local tier and notifies other replicas"""
+        cache_manager.local_cache.set("embedding:clip@main:fp32:filehash", np.zeros(4))
+        cache_manager.redis.zrange.return_value = []
+
+        await cache_manager.invalidate_file_cache("filehash")
+
+        assert cache_manager.local_cache.get("embedding:clip@main:fp32:filehash") is None
+        cache_manager.redis.publish.assert_called_once_with(
+            cache_manager.invalidation_channel, "embedding:*:filehash"
+        )
+
+
+class TestKeyIndexes:
+    """Test cases for the namespace and file key indexes"""
+
+    @pytest.mark.asyncio
+    async def test_writes_are_indexed(self, cache_manager):
+        """Test that a cached embedding is added to its namespace and file indexes"""
+        pipe = cache_manager.redis.pipeline.return_value
+
+        await cache_manager.set_embedding("hash1", "clip@main:fp32", np.zeros(4), ttl=60)
+
+        indexes = [call[0][0] for call in pipe.zadd.call_args_list]
+        assert indexes == ["index:ns:embedding", "index:file:hash1"]
+        assert list(pipe.zadd.call_args_list[1][0][1]) == ["embedding:clip@main:fp32:hash1"]
+        pipe.expire.assert_any_call("index:file:hash1", 60, nx=True)
+        pipe.expire.assert_any_call("index:file:hash1", 60, gt=True)
+
+    @pytest.mark.asyncio
+    async def test_invalidate_file_cache_uses_file_index(self, cache_manager):
+        """Test that invalidation deletes the indexed keys without scanning the keyspace"""
+        keys = [b"embedding:clip@main:fp32:filehash", b"processing:image:filehash"]
+        cache_manager.redis.zrange.return_value = keys
+        pipe = cache_manager.redis.pipeline.return_value
+        pipe.execute.return_value = [2, 1, 1, 1]
+
+        assert await cache_manager.invalidate_file_cache("filehash") == 2
+
+        pipe.delete.assert_any_call(*keys)
+        pipe.zrem.assert_any_call("index:ns:embedding", keys[0])
+        pipe.zrem.assert_any_call("index:ns:processing", keys[1])
+        pipe.delete.assert_any_call("index:file:filehash")
+        cache_manager.redis.keys.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cache_counts_come_from_indexes(self, cache_manager):
+        """Test that stats count entries from the namespace indexes"""
+        cache_manager.redis.info.return_value = {}
+        pipe = cache_manager.redis.pipeline.return_value
+        pipe.execute.return_value = [0, 3, 5, 12, 0, 7]
+
+        stats = await cache_manager.get_cache_stats()
+
+        assert stats["cache_counts"] == {"models": 3, "embeddings": 12, "processing_results": 7}
+        cache_manager.redis.keys.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_clear_deletes_only_indexed_keys(self, cache_manager):
+        """Test that clearing removes cache entries without flushing the database"""
+        indexed = {"index:ns:embedding": [(b"embedding:clip@main:fp32:hash1", 1.0)]}
+        cache_manager.redis.zscan_iter = Mock(side_effect=lambda index: _async_iter(indexed.get(index, [])))
+        cache_manager.redis.scan_iter = Mock(return_value=_async_iter([b"index:file:hash1"]))
+        pipe = cache_manager.redis.pipeline.return_value
+        pipe.execute.return_value = [1, 1]
+
+        assert await cache_manager.clear_all_cache() is True
+
+        pipe.delete.assert_called_once_with(b"embedding:clip@main:fp32:hash1")
+        cache_manager.redis.scan_iter.assert_called_once_with(match="index:file:*", count=1000)
+        cache_manager.redis.delete.assert_called_once_with(b"index:file:hash1")
+        cache_manager.redis.flushdb.assert_not_called()
+
+
+class TestCorpusGeneration:
+    """Test cases for the corpus generation read by the retrieval proxy"""
+
+    @pytest.mark.asyncio
+    async def test_bump_increments_and_publishes(self, cache_manager):
+        """Test that a bump advances the counter and notifies the proxies"""
+        cache_manager.corpus_redis = AsyncMock()
+        cache_manager.corpus_redis.incr.return_value = 8
+
+        assert await cache_manager.bump_corpus_generation() == 8
+
+        cache_manager.corpus_redis.incr.assert_called_once_with(CORPUS_GENERATION_KEY)
+        cache_manager.redis.publish.assert_called_once_with(CORPUS_GENERATION_CHANNEL, 8)
+
+    @pytest.mark.asyncio
+    async def test_bump_failure_is_not_raised(self, cache_manager):
+        """Test that a Redis error does not fail the ingestion that triggered the bump"""
+        cache_manager.corpus_redis = AsyncMock()
+        cache_manager.corpus_redis.incr.side_effect = ConnectionError("down")
+
+        assert await cache_manager.bump_corpus_generation() is None
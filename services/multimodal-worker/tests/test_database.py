@@ -115,6 +115,7 @@ class TestDatabaseManager:
         """Test successful document creation"""
         pool, connection = mock_pool
         db_manager.pool = pool
+        connection.fetchval.side_effect = lambda query, document_id, *args: document_id
 
         # Test document creation
         document_id = await db_manager.create_document(
@@ -131,15 +132,34 @@ class TestDatabaseManager:
         assert len(document_id) == 36  # UUID length
 
         # Verify SQL was executed
-        connection.execute.assert_called_once()
-        call_args = connection.execute.call_args[0]
+        connection.fetchval.assert_called_once()
+        call_args = connection.fetchval.call_args[0]
         assert "INSERT INTO documents" in call_args[0]
+        assert "ON CONFLICT (content_hash) DO NOTHING" in call_args[0]
+
+    @pytest.mark.asyncio
+    async def test_create_document_hash_already_claimed(self, db_manager, mock_pool):
+        """Test that a duplicate content hash is reported instead of raising"""
+        pool, connection = mock_pool
+        db_manager.pool = pool
+        connection.fetchval.return_value = None
+
+        document_id = await db_manager.create_document(
+            filename="test.jpg",
+            file_type="image",
+            file_size=1024,
+            mime_type="image/jpeg",
+            content_hash="abc123"
+        )
+
+        assert document_id is None
 
     @pytest.mark.asyncio
     async def test_create_document_without_metadata(self, db_manager, mock_pool):
         """Test document creation without metadata"""
         pool, connection = mock_pool
         db_manager.pool = pool
+        connection.fetchval.side_effect = lambda query, document_id, *args: document_id
 
         # Test document creation without metadata
         document_id = await db_manager.create_document(
@@ -154,7 +174,8 @@ class TestDatabaseManager:
         assert isinstance(document_id, str)
 
         # Verify SQL was executed with empty metadata
-        connection.execute.assert_called_once()
+        connection.fetchval.assert_called_once()
+        assert connection.fetchval.call_args[0][-1] == "{}"
 
     @pytest.mark.asyncio
     async def test_get_document_by_hash_success(self, db_manager, mock_pool):
@@ -251,6 +272,33 @@ class TestDatabaseManager:
         # Verify SQL was executed
         connection.execute.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_create_text_chunks_batch(self, db_manager, mock_pool):
+        """Test batched text chunk creation uses a single executemany"""
+        pool, connection = mock_pool
+        db_manager.pool = pool
+
+        chunk_ids = await db_manager.create_text_chunks([
+            {"document_id": "test-doc-id", "chunk_text": "first", "chunk_index": 0},
+            {"document_id": "test-doc-id", "chunk_text": "second", "chunk_index": 1}
+        ])
+
+        assert len(chunk_ids) == 2
+        assert len(set(chunk_ids)) == 2
+        connection.executemany.assert_called_once()
+        sql, records = connection.executemany.call_args[0]
+        assert "INSERT INTO text_chunks" in sql
+        assert [r[2] for r in records] == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_create_text_chunks_empty(self, db_manager, mock_pool):
+        """Test batched text chunk creation with no chunks"""
+        pool, connection = mock_pool
+        db_manager.pool = pool
+
+        assert await db_manager.create_text_chunks([]) == []
+        connection.executemany.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_create_image_success(self, db_manager, mock_pool):
         """Test successful image creation"""
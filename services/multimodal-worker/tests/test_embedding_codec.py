@@ -0,0 +1,77 @@
+"""
+Unit tests for the binary embedding cache format in multimodal-worker service
+"""
+import os
+import pickle
+import pytest
+import numpy as np
+
+from app.embedding_codec import (
+    encode_embedding, decode_embedding, is_encoded, load_legacy_pickle
+)
+
+
+class TestEmbeddingCodec:
+    """Test cases for embedding encoding and decoding"""
+
+    def test_float32_round_trip_is_zero_copy(self):
+        """Test that float32 vectors decode to a view of the cached bytes"""
+        embedding = np.random.rand(512).astype(np.float32)
+        data = encode_embedding(embedding, "openai/clip-vit-base-patch32:fp32")
+
+        decoded = decode_embedding(data, "openai/clip-vit-base-patch32:fp32")
+
+        assert is_encoded(data)
+        assert decoded.dtype == np.float32
+        assert np.array_equal(decoded, embedding)
+        assert not decoded.flags.writeable
+        assert not decoded.flags.owndata
+
+    def test_float16_halves_the_payload(self):
+        """Test that float16 storage is half the size and decodes to float32"""
+        embedding = np.random.rand(384).astype(np.float32)
+        full = encode_embedding(embedding, "st:fp32")
+        half = encode_embedding(embedding, "st:fp32", dtype="float16")
+
+        decoded = decode_embedding(half)
+
+        assert len(full) - len(half) == 384 * 2
+        assert decoded.dtype == np.float32
+        assert np.allclose(decoded, embedding, atol=1e-3)
+
+    def test_encoded_is_smaller_than_pickle(self):
+        """Test that the binary format beats the pickled array it replaces"""
+        embedding = np.random.rand(512).astype(np.float32)
+
+        assert len(encode_embedding(embedding, "clip:fp32")) < len(pickle.dumps(embedding))
+
+    @pytest.mark.parametrize("revision", ["", "a", "ab", "abc", "abcd"])
+    def test_vector_is_aligned(self, revision):
+        """Test that the vector starts on a 4-byte boundary whatever the revision length"""
+        data = encode_embedding(np.ones(8, dtype=np.float32), revision)
+
+        assert (len(data) - 8 * 4) % 4 == 0
+        assert np.array_equal(decode_embedding(data, revision), np.ones(8))
+
+    def test_revision_mismatch_returns_none(self):
+        """Test that vectors from another model revision are rejected"""
+        data = encode_embedding(np.ones(4), "clip@abc:fp32")
+
+        assert decode_embedding(data, "clip@def:fp32") is None
+
+    def test_invalid_data_raises(self):
+        """Test that truncated or foreign data is rejected"""
+        with pytest.raises(ValueError):
+            decode_embedding(b"EV")
+        with pytest.raises(ValueError):
+            decode_embedding(b"XX" + b"\0" * 16)
+        with pytest.raises(ValueError):
+            encode_embedding(np.ones(4), "clip", dtype="int8")
+
+    def test_legacy_pickle_loads_arrays_only(self):
+        """Test that legacy pickles load numpy arrays but nothing else"""
+        embedding = np.random.rand(16).astype(np.float32)
+        assert np.array_equal(load_legacy_pickle(pickle.dumps(embedding)), embedding)
+
+        with pytest.raises(pickle.UnpicklingError):
+            load_legacy_pickle(pickle.dumps(os.getcwd))
@@ -0,0 +1,143 @@
+"""
+Unit tests for the inference executor in multimodal-worker service
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from app.executor import InferenceExecutor
+
+
+class TestInferenceExecutor:
+    """Test cases for InferenceExecutor"""
+
+    @pytest.fixture
+    def executor(self):
+        """Create an InferenceExecutor with small family limits"""
+        with patch('app.executor.settings') as mock_settings:
+            mock_settings.inference_max_workers = 4
+            mock_settings.inference_family_concurrency = {"clip": 1, "video": 2}
+            mock_settings.inference_default_concurrency = 1
+            mock_settings.torch_intra_op_threads = 0
+
+            executor = InferenceExecutor()
+            executor.initialize()
+            yield executor
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_run_off_event_loop(self, executor):
+        """Test that blocking work runs on a worker thread"""
+        loop_thread = threading.get_ident()
+
+        result = await executor.run("clip", lambda x: (x * 2, threading.get_ident()), 21)
+
+        assert result[0] == 42
+        assert result[1] != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_family_concurrency_limit(self, executor):
+        """Test that a family never exceeds its concurrency limit"""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+
+        await asyncio.gather(*(executor.run("clip", work) for _ in range(4)))
+
+        assert peak == 1
+        assert executor.get_stats()["families"]["clip"]["completed"] == 4
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_holds_slot_until_finished(self, executor):
+        """Test that cancelling the awaiter does not free the slot while the call still runs"""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            release.wait(1)
+            with lock:
+                active -= 1
+
+        first = asyncio.create_task(executor.run("clip", work))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        second = asyncio.create_task(executor.run("clip", work))
+        await asyncio.sleep(0.05)
+        stats = executor.get_stats()["families"]["clip"]
+        assert stats["active"] == 1
+        assert stats["queue_depth"] == 1
+
+        release.set()
+        await second
+
+        assert peak == 1
+        assert executor.get_stats()["families"]["clip"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, executor):
+        """Test that the loop keeps serving other coroutines during inference"""
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(executor.run("video", time.sleep, 0.1), ticker())
+
+        assert ticks == 5
+
+    @pytest.mark.asyncio
+    async def test_failure_is_counted_and_raised(self, executor):
+        """Test that exceptions propagate and are recorded"""
+        def fail():
+            raise RuntimeError("inference failed")
+
+        with pytest.raises(RuntimeError, match="inference failed"):
+            await executor.run("clip", fail)
+
+        stats = executor.get_stats()["families"]["clip"]
+        assert stats["failed"] == 1
+        assert stats["active"] == 0
+        assert stats["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_structure(self, executor):
+        """Test saturation and queue depth metrics"""
+        await executor.run("video", lambda: None)
+        stats = executor.get_stats()
+
+        assert stats["max_workers"] == 4
+        assert stats["saturation"] == 0
+        assert stats["families"]["video"]["concurrency_limit"] == 2
+        assert "avg_wait_ms" in stats["families"]["video"]
+
+    def test_family_limit_override_grows_pool(self, executor):
+        """Test that raising a family limit resizes the pool to fit it"""
+        with patch('app.executor.settings.inference_max_workers', 0):
+            executor.set_family_limit("clip", 4)
+
+            assert executor._pool_size == 6
+            assert executor.get_stats()["max_workers"] == 6
+            assert executor._family_limit("clip") == 4
@@ -0,0 +1,117 @@
+"""
+Unit tests for single-flight ingestion in multimodal-worker service
+"""
+import asyncio
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.ingestion import IngestionCoordinator
+
+
+@pytest.fixture
+def coordinator():
+    """Create a coordinator with a mocked Redis connection"""
+    cache_manager = Mock()
+    cache_manager.connected = True
+    cache_manager.redis = AsyncMock()
+    cache_manager.redis.set.return_value = True
+    return IngestionCoordinator(cache_manager)
+
+
+class TestIngestionCoordinator:
+    """Test cases for IngestionCoordinator"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_run(self, coordinator):
+        """Test that identical uploads in flight are processed once"""
+        calls = 0
+        release = asyncio.Event()
+        discard = Mock()
+
+        async def ingest():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"document_id": "doc1"}
+
+        first = asyncio.create_task(coordinator.run("hash1", ingest, discard=discard))
+        await asyncio.sleep(0)
+        others = [asyncio.create_task(coordinator.run("hash1", ingest, discard=discard)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(first, *others) == [{"document_id": "doc1"}] * 4
+        assert calls == 1
+        assert discard.call_count == 3
+        assert coordinator.get_stats() == {"in_flight": 0, "coalesced": 3, "lease_waits": 0}
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_waiter(self, coordinator):
+        """Test that a failed run is raised to all callers and not kept"""
+        async def ingest():
+            await asyncio.sleep(0)
+            raise RuntimeError("minio down")
+
+        results = await asyncio.gather(
+            coordinator.run("hash1", ingest),
+            coordinator.run("hash1", ingest),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert coordinator._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_abort_processing(self, coordinator):
+        """Test that processing continues when the first client disconnects"""
+        calls = 0
+        release = asyncio.Event()
+
+        async def ingest():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(coordinator.run("hash1", ingest))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(coordinator.run("hash1", ingest))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "done"
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_lease_is_taken_and_released(self, coordinator):
+        """Test that the replica holding the lease ingests and releases it"""
+        ingest = AsyncMock(return_value="done")
+
+        assert await coordinator.run("hash1", ingest) == "done"
+
+        lease_key = coordinator.cache_manager.redis.set.call_args[0][0]
+        assert lease_key == "ingest:lease:hash1"
+        assert coordinator.cache_manager.redis.set.call_args.kwargs["nx"] is True
+        coordinator.cache_manager.redis.eval.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_lease_held_by_another_replica(self, coordinator):
+        """Test that a replica finding the lease taken waits before ingesting"""
+        coordinator.cache_manager.redis.set.side_effect = [False, False, True]
+        ingest = AsyncMock(return_value="already processed")
+
+        with patch('app.ingestion.settings.ingest_lease_poll_interval', 0):
+            assert await coordinator.run("hash1", ingest) == "already processed"
+
+        assert coordinator.cache_manager.redis.set.await_count == 3
+        assert coordinator.lease_waits == 1
+
+    @pytest.mark.asyncio
+    async def test_ingests_without_redis(self, coordinator):
+        """Test that a Redis outage does not block ingestion"""
+        coordinator.cache_manager.redis.set.side_effect = ConnectionError("down")
+        ingest = AsyncMock(return_value="done")
+
+        assert await coordinator.run("hash1", ingest) == "done"
+        coordinator.cache_manager.redis.eval.assert_not_called()
@@ -0,0 +1,211 @@
+"""
+Unit tests for the ingestion job queue in multimodal-worker service
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.jobs import JobQueue, JobQueueError, QueueFullError, JOB_STREAM, JOB_GROUP
+
+
+@pytest.fixture
+def job_queue():
+    """Create a job queue with a mocked Redis connection"""
+    redis = AsyncMock()
+    redis.pipeline = Mock(return_value=Mock(execute=AsyncMock(return_value=[])))
+    redis.xlen.return_value = 0
+    return JobQueue(redis)
+
+
+def stored_job(status="queued", attempts=0, kind="image"):
+    """A job hash as returned by HGETALL"""
+    return {
+        b"id": b"job1",
+        b"kind": kind.encode(),
+        b"status": status.encode(),
+        b"stage": status.encode(),
+        b"progress": b"0.0",
+        b"attempts": str(attempts).encode(),
+        b"created_at": b"1700000000.0",
+        b"payload": json.dumps({"temp_path": "/tmp/upload.jpg"}).encode()
+    }
+
+
+class TestJobQueue:
+    """Test cases for JobQueue"""
+
+    @pytest.mark.asyncio
+    async def test_submit_writes_job_and_stream_entry(self, job_queue):
+        """Test that a submission stores the job and queues it in one transaction"""
+        job = await job_queue.submit("image", {"temp_path": "/tmp/upload.jpg"})
+
+        assert job["status"] == "queued"
+        pipe = job_queue.redis.pipeline.return_value
+        job_key = pipe.hset.call_args[0][0]
+        assert job_key == f"job:{job['id']}"
+        assert json.loads(pipe.hset.call_args.kwargs["mapping"]["payload"]) == {"temp_path": "/tmp/upload.jpg"}
+        pipe.xadd.assert_called_once_with(JOB_STREAM, {"job_id": job["id"], "temp_path": "/tmp/upload.jpg"})
+        assert job_queue.submitted == 1
+
+    @pytest.mark.asyncio
+    async def test_submit_rejected_at_depth_limit(self, job_queue):
+        """Test that submissions are rejected once the queue is full"""
+        job_queue.redis.xlen.return_value = 5
+
+        with patch('app.jobs.settings.job_queue_max_depth', 5):
+            with pytest.raises(QueueFullError):
+                await job_queue.submit("image", {})
+
+        job_queue.redis.pipeline.assert_not_called()
+        assert job_queue.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_submit_without_redis(self, job_queue):
+        """Test that the queue reports itself unavailable without Redis"""
+        job_queue.redis = None
+
+        with pytest.raises(JobQueueError):
+            await job_queue.submit("text", {"text": "hello"})
+
+    @pytest.mark.asyncio
+    async def test_get_decodes_job(self, job_queue):
+        """Test that stored fields are decoded into their types"""
+        job_queue.redis.hgetall.return_value = stored_job(attempts=2)
+
+        job = await job_queue.get("job1")
+
+        assert job["status"] == "queued"
+        assert job["attempts"] == 2
+        assert job["progress"] == 0.0
+        assert job["payload"] == {"temp_path": "/tmp/upload.jpg"}
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_job(self, job_queue):
+        """Test that unknown or expired jobs return None"""
+        job_queue.redis.hgetall.return_value = {}
+
+        assert await job_queue.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_process_completes_job(self, job_queue):
+        """Test that a handled job stores its result and leaves the stream"""
+        job_queue.redis.hgetall.return_value = stored_job()
+
+        async def handler(payload, progress):
+            await progress("captioning", 0.4)
+            return {"success": True, "data": {"document_id": "doc1"}}
+
+        job_queue.handlers = {"image": handler}
+        await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1"})
+
+        redis = job_queue.redis
+        progress_update = redis.hset.call_args_list[-1].kwargs["mapping"]
+        assert progress_update == {"stage": "captioning", "progress": 0.4}
+
+        pipe = redis.pipeline.return_value
+        outcome = pipe.hset.call_args.kwargs["mapping"]
+        assert outcome["status"] == "completed"
+        assert json.loads(outcome["result"])["data"] == {"document_id": "doc1"}
+        pipe.xack.assert_called_once_with(JOB_STREAM, JOB_GROUP, b"1-0")
+        pipe.xdel.assert_called_once_with(JOB_STREAM, b"1-0")
+        assert job_queue.completed == 1
+
+    @pytest.mark.asyncio
+    async def test_process_records_failure(self, job_queue):
+        """Test that a handler error marks the job failed with its message"""
+        job_queue.redis.hgetall.return_value = stored_job()
+        job_queue.handlers = {"image": AsyncMock(side_effect=RuntimeError("corrupt image"))}
+
+        await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1"})
+
+        outcome = job_queue.redis.pipeline.return_value.hset.call_args.kwargs["mapping"]
+        assert outcome["status"] == "failed"
+        assert outcome["error"] == "corrupt image"
+        assert job_queue.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_reclaimed_job_gives_up_after_max_attempts(self, job_queue):
+        """Test that a job that keeps killing its worker is not retried forever"""
+        job_queue.redis.hgetall.return_value = stored_job(status="running", attempts=3)
+        handler = AsyncMock()
+        job_queue.handlers = {"image": handler}
+
+        with patch('app.jobs.settings.job_max_attempts', 3), \
+             patch('app.jobs.os.unlink') as unlink:
+            await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1"})
+
+        handler.assert_not_awaited()
+        outcome = job_queue.redis.pipeline.return_value.hset.call_args.kwargs["mapping"]
+        assert outcome["status"] == "failed"
+        unlink.assert_called_once_with("/tmp/upload.jpg")
+
+    @pytest.mark.asyncio
+    async def test_unknown_kind_removes_spooled_upload(self, job_queue):
+        """Test that a job no handler accepts does not leave its upload behind"""
+        job_queue.redis.hgetall.return_value = stored_job(kind="audio")
+        job_queue.handlers = {"image": AsyncMock()}
+
+        with patch('app.jobs.os.unlink') as unlink:
+            await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1"})
+
+        unlink.assert_called_once_with("/tmp/upload.jpg")
+        outcome = job_queue.redis.pipeline.return_value.hset.call_args.kwargs["mapping"]
+        assert outcome["error"] == "Unknown job kind: audio"
+
+    @pytest.mark.asyncio
+    async def test_expired_job_removes_spooled_upload(self, job_queue):
+        """Test that an entry whose job hash is gone still has its upload removed"""
+        job_queue.redis.hgetall.return_value = {}
+
+        with patch('app.jobs.os.unlink', side_effect=FileNotFoundError) as unlink:
+            await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1", b"temp_path": b"/tmp/upload.jpg"})
+
+        unlink.assert_called_once_with("/tmp/upload.jpg")
+        job_queue.redis.pipeline.return_value.xack.assert_called_once_with(JOB_STREAM, JOB_GROUP, b"1-0")
+
+    @pytest.mark.asyncio
+    async def test_finished_job_entry_is_dropped(self, job_queue):
+        """Test that a stream entry for an already finished job is only acknowledged"""
+        job_queue.redis.hgetall.return_value = stored_job(status="completed")
+        handler = AsyncMock()
+        job_queue.handlers = {"image": handler}
+
+        await job_queue._process("worker-0", b"1-0", {b"job_id": b"job1"})
+
+        handler.assert_not_awaited()
+        job_queue.redis.pipeline.return_value.xack.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_start_uses_its_own_redis(self):
+        """Test that the queue connects to the job Redis, not the cache, and closes it on stop"""
+        redis = AsyncMock()
+        job_queue = JobQueue()
+
+        with patch('app.jobs.aioredis.from_url', return_value=redis) as from_url, \
+             patch('app.jobs.settings.job_redis_host', 'redis-jobs'), \
+             patch('app.jobs.settings.job_redis_port', 6379), \
+             patch('app.jobs.settings.job_redis_db', 0), \
+             patch('app.jobs.settings.job_workers', 0):
+            await job_queue.start({})
+
+            from_url.assert_called_once_with("redis://redis-jobs:6379/0")
+            redis.xgroup_create.assert_awaited_once_with(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+
+            await job_queue.stop()
+
+        redis.close.assert_awaited_once()
+        assert job_queue.available is False
+
+    @pytest.mark.asyncio
+    async def test_missing_group_is_recreated(self, job_queue):
+        """Test that a worker recreates the stream and group if they were deleted"""
+        job_queue.redis.xautoclaim.side_effect = [
+            Exception("NOGROUP No such key 'jobs:ingest' or consumer group"),
+            asyncio.CancelledError()
+        ]
+
+        with pytest.raises(asyncio.CancelledError):
+            await job_queue._work("worker-0")
+
+        job_queue.redis.xgroup_create.assert_awaited_once_with(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
@@ -10,6 +10,7 @@ import os
 import tempfile
 from PIL import Image
 
+from app.config import settings
 from app.models import ModelManager
 
 
@@ -91,11 +92,18 @@ class TestModelManager:
             # Verify models were moved to correct device
             mock_clip_instance.to.assert_called_once()
             mock_blip_instance.to.assert_called_once()
+            
+            # Verify the manager reports itself ready
+            assert model_manager.is_ready is True
 
     @pytest.mark.asyncio
     async def test_load_models_failure(self, model_manager):
         """Test model loading failure with proper error handling"""
         with patch('app.models.CLIPModel') as mock_clip_model, \
+             patch('app.models.BlipForConditionalGeneration'), \
+             patch('app.models.BlipProcessor'), \
+             patch('app.models.whisper.load_model'), \
+             patch('app.models.SentenceTransformer'), \
              patch('os.makedirs'):
             # Mock model loading failure
             mock_clip_model.from_pretrained.side_effect = Exception("Model loading failed")
@@ -103,6 +111,200 @@ class TestModelManager:
             # Test that exception is raised
             with pytest.raises(Exception, match="Model loading failed"):
                 await model_manager.load_models()
+            
+            assert model_manager.is_ready is False
+
+    @pytest.mark.asyncio
+    async def test_load_models_concurrently_with_report(self, model_manager):
+        """Test that models load in parallel and each load is timed"""
+        import threading
+        import time
+
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_load(model_name, use_snapshot=True):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return Mock(), None, "pretrained"
+
+        with patch.object(model_manager, '_load_model', side_effect=slow_load), \
+             patch('app.models.settings') as mock_settings:
+            mock_settings.preload_models = ['clip', 'blip', 'whisper', 'sentence_transformer']
+            mock_settings.model_process_workers = 0
+            mock_settings.model_load_concurrency = 2
+            mock_settings.precision = 'fp32'
+            mock_settings.model_memory_budget_mb = 0
+            mock_settings.model_idle_timeout = 0
+
+            await model_manager.load_models()
+
+            status = model_manager.get_model_status()
+            report = model_manager.get_startup_report()
+
+        assert peak == 2
+        assert all(entry["status"] == "loaded" for entry in status.values())
+        assert status["clip"]["source"] == "pretrained"
+        assert status["clip"]["load_time_s"] >= 0.05
+        assert report["wall_time_s"] < report["sum_of_load_times_s"]
+
+    @pytest.mark.asyncio
+    async def test_is_ready_reset_on_cleanup(self, model_manager):
+        """Test that cleanup marks the manager as not ready"""
+        assert model_manager.is_ready is False
+        model_manager._ready = True
+
+        await model_manager.cleanup()
+
+        assert model_manager.is_ready is False
+
+    def test_get_batcher_is_shared(self, model_manager):
+        """Test that a named batcher is created once and reused"""
+        batch_fn = Mock()
+
+        first = model_manager.get_batcher('clip_image', batch_fn, max_batch_size=8, max_wait_ms=5)
+        second = model_manager.get_batcher('clip_image', Mock(), max_batch_size=8, max_wait_ms=5)
+
+        assert first is second
+        assert first.batch_fn is batch_fn
+        assert 'clip_image' in model_manager.get_batching_stats()
+
+    def test_get_model_loads_on_demand_once(self, model_manager):
+        """Test that concurrent first calls trigger a single lazy load"""
+        import threading
+        import time
+
+        loads = []
+
+        def slow_load(model_name):
+            loads.append(model_name)
+            time.sleep(0.05)
+            return Mock(), None, "pretrained"
+
+        with patch.object(model_manager, '_load_model', side_effect=slow_load):
+            threads = [
+                threading.Thread(target=model_manager.get_model, args=('sentence_transformer',))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert loads == ['sentence_transformer']
+        assert 'sentence_transformer' in model_manager.models
+
+    def test_memory_budget_evicts_least_recently_used(self, model_manager):
+        """Test that loading past the budget evicts the least recently used model"""
+        footprints = {'clip': 400, 'blip': 400, 'whisper': 400}
+
+        def fake_load(model_name):
+            return Mock(), None, "pretrained"
+
+        with patch.object(model_manager, '_load_model', side_effect=fake_load), \
+             patch('app.models.model_footprint', side_effect=lambda m: 0), \
+             patch('app.models.settings') as mock_settings:
+            mock_settings.model_memory_budget_mb = 1000 / 1024 ** 2
+            mock_settings.precision = 'fp32'
+
+            for name in ('clip', 'blip'):
+                model_manager.get_model(name)
+                model_manager.model_info[name]["bytes"] = footprints[name]
+            model_manager.get_model('clip')  # clip is now most recently used
+
+            with patch('app.models.model_footprint', side_effect=lambda m: footprints['whisper']):
+                model_manager.get_model('whisper')
+
+        assert list(model_manager.models) == ['clip', 'whisper']
+        assert model_manager.evictions == 1
+
+    def test_loading_model_is_not_evicted(self, model_manager):
+        """Test that budget enforcement never evicts a model that is still loading"""
+        import threading
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def fake_load(model_name):
+            if model_name == 'blip':
+                started.set()
+                release.wait(5)
+            return Mock(), None, "pretrained"
+
+        with patch.object(model_manager, '_load_model', side_effect=fake_load), \
+             patch('app.models.model_footprint', return_value=600), \
+             patch('app.models.settings') as mock_settings:
+            mock_settings.model_memory_budget_mb = 1000 / 1024 ** 2
+            mock_settings.precision = 'fp32'
+
+            loader = threading.Thread(target=model_manager.get_model, args=('blip',))
+            loader.start()
+            started.wait(5)
+            model_manager.get_model('clip')
+            assert list(model_manager.models) == ['clip']
+
+            release.set()
+            loader.join()
+
+        assert list(model_manager.models) == ['blip']
+        assert model_manager.evictions == 1
+
+    def test_onnx_export_source_is_not_resident(self, model_manager):
+        """Test that the PyTorch model exported to ONNX never enters the resident set"""
+        torch_model = Mock()
+        exported = []
+
+        def failing_export(model_name, source, load_torch_model):
+            model, _ = load_torch_model()
+            exported.append((model, list(model_manager.models)))
+            raise RuntimeError("export failed")
+
+        with patch.object(settings, 'embedding_backend', 'onnx'), \
+             patch.object(settings, 'use_model_snapshots', False), \
+             patch('app.models.SentenceTransformer', return_value=torch_model), \
+             patch('app.onnx_backend.load_onnx_model', side_effect=failing_export):
+            with pytest.raises(RuntimeError, match="export failed"):
+                model_manager.load_model('sentence_transformer')
+
+        assert exported == [(torch_model, [])]
+        assert 'sentence_transformer' not in model_manager.models
+
+    def test_evict_idle_models(self, model_manager):
+        """Test that models unused past the idle timeout are evicted"""
+        model_manager.models['clip'] = Mock()
+        model_manager.processors['clip'] = Mock()
+        model_manager.model_info['clip'] = {"bytes": 10, "device": "cpu", "last_used": 0.0}
+
+        with patch('app.models.settings') as mock_settings:
+            mock_settings.model_idle_timeout = 60
+            evicted = model_manager.evict_idle_models()
+
+        assert evicted == ['clip']
+        assert 'clip' not in model_manager.models
+        assert 'clip' not in model_manager.processors
+
+    def test_embedding_model_key_tracks_revision_and_precision(self, model_manager):
+        """Test that embedding cache keys change with the revision, precision and backend"""
+        with patch.object(settings, 'model_revisions', {}), \
+             patch.object(settings, 'precision', 'fp32'), \
+             patch.object(settings, 'embedding_backend', 'torch'):
+            fp32_key = model_manager.embedding_model_key('clip')
+            assert fp32_key == f"{settings.clip_model}:fp32"
+
+            with patch.object(settings, 'precision', 'int8-dynamic'):
+                assert model_manager.embedding_model_key('clip') == f"{settings.clip_model}:int8-dynamic"
+
+            with patch.object(settings, 'embedding_backend', 'onnx'):
+                assert model_manager.embedding_model_key('clip') == f"{settings.clip_model}:onnx"
+
+            with patch.object(settings, 'model_revisions', {'clip': 'abc123'}):
+                assert model_manager.embedding_model_key('clip') == f"{settings.clip_model}@abc123:fp32"
 
     def test_get_model_success(self, model_manager):
         """Test getting a loaded model"""
@@ -237,6 +439,13 @@ class TestModelManager:
             mock_settings.blip_model = 'Salesforce/blip-image-captioning-base'
             mock_settings.whisper_model = 'openai/whisper-base'
             mock_settings.sentence_transformer_model = 'sentence-transformers/all-MiniLM-L6-v2'
+            mock_settings.model_process_workers = 0
+            mock_settings.preload_models = ['clip', 'blip', 'whisper', 'sentence_transformer']
+            mock_settings.model_memory_budget_mb = 0
+            mock_settings.model_idle_timeout = 0
+            mock_settings.model_load_concurrency = 2
+            mock_settings.precision = 'fp32'
+            mock_settings.use_model_snapshots = False
             
             model_manager = ModelManager()
             
@@ -282,6 +491,8 @@ class TestModelManager:
         with patch('app.models.CLIPModel') as mock_clip_model, \
              patch('app.models.CLIPProcessor') as mock_clip_processor, \
              patch('app.models.BlipForConditionalGeneration') as mock_blip_model, \
+             patch('app.models.whisper.load_model'), \
+             patch('app.models.SentenceTransformer'), \
              patch('os.makedirs'):
             
             # Mock successful CLIP loading
@@ -0,0 +1,91 @@
+"""
+Unit tests for the ONNX Runtime backend in multimodal-worker service
+"""
+import json
+import os
+import tempfile
+import numpy as np
+import pytest
+from unittest.mock import Mock, patch
+
+from app import onnx_backend
+from app.onnx_backend import OnnxSentenceEncoder, load_onnx_model
+
+
+class TestOnnxSentenceEncoder:
+    """Test cases for the ONNX sentence encoder"""
+
+    @pytest.fixture
+    def encoder(self):
+        """Create an encoder with a fake session that embeds by text length"""
+        encoder = OnnxSentenceEncoder.__new__(OnnxSentenceEncoder)
+        encoder.embedding_dim = 2
+        encoder.max_seq_length = 128
+        encoder.batch_sizes = []
+
+        def tokenize(texts, **kwargs):
+            width = max(len(text) for text in texts)
+            encoder.batch_sizes.append(len(texts))
+            return {
+                "input_ids": np.array([[len(text)] * width for text in texts]),
+                "attention_mask": np.ones((len(texts), width))
+            }
+
+        def run(outputs, feeds):
+            lengths = feeds["input_ids"][:, 0].astype(np.float32)
+            return [np.stack([lengths, np.ones_like(lengths)], axis=1)]
+
+        encoder.tokenizer = Mock(side_effect=tokenize)
+        encoder.session = Mock()
+        encoder.session.run.side_effect = run
+        return encoder
+
+    def test_encode_preserves_input_order(self, encoder):
+        """Test that length-sorted batches are returned in input order"""
+        embeddings = encoder.encode(["a", "ccc", "bb"], batch_size=2)
+
+        assert embeddings.shape == (3, 2)
+        assert list(embeddings[:, 0]) == [1.0, 3.0, 2.0]
+        assert encoder.batch_sizes == [2, 1]
+
+    def test_encode_single_string(self, encoder):
+        """Test that a single string returns a single vector"""
+        embedding = encoder.encode("abcd")
+
+        assert embedding.shape == (2,)
+        assert embedding[0] == 4.0
+
+    def test_encode_normalized(self, encoder):
+        """Test unit-length normalization"""
+        embeddings = encoder.encode(["abc"], normalize_embeddings=True)
+
+        assert np.linalg.norm(embeddings[0]) == pytest.approx(1.0)
+
+
+class TestLoadOnnxModel:
+    """Test cases for export caching"""
+
+    def test_exports_once_and_reuses_cache(self):
+        """Test that the PyTorch model is only loaded when no export is cached"""
+        with tempfile.TemporaryDirectory() as cache_dir, \
+             patch('app.onnx_backend.settings') as mock_settings, \
+             patch('app.onnx_backend.export_sentence_transformer',
+                   return_value={"embedding_dim": 384, "max_seq_length": 256}) as mock_export, \
+             patch('app.onnx_backend.OnnxSentenceEncoder') as mock_encoder:
+            mock_settings.model_cache_dir = cache_dir
+            load_torch_model = Mock(return_value=(Mock(), None))
+
+            load_onnx_model('sentence_transformer', 'sentence-transformers/all-MiniLM-L6-v2', load_torch_model)
+            load_onnx_model('sentence_transformer', 'sentence-transformers/all-MiniLM-L6-v2', load_torch_model)
+
+            load_torch_model.assert_called_once()
+            mock_export.assert_called_once()
+            path = onnx_backend.export_dir('sentence_transformer', 'sentence-transformers/all-MiniLM-L6-v2')
+            with open(os.path.join(path, onnx_backend.META_FILE)) as f:
+                assert json.load(f)["embedding_dim"] == 384
+            assert mock_encoder.call_count == 2
+
+    def test_unsupported_model(self):
+        """Test that models without an ONNX backend are rejected"""
+        with pytest.raises(ValueError, match="No ONNX backend"):
+            load_onnx_model('blip', 'Salesforce/blip-image-captioning-base', Mock())
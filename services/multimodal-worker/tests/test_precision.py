@@ -0,0 +1,92 @@
+"""
+Unit tests for precision modes in multimodal-worker service
+"""
+import numpy as np
+import pytest
+import torch
+from unittest.mock import patch
+
+from app.precision import apply_precision, check_precision_drift, cosine_drift, sample_images
+
+
+class TestPrecision:
+    """Test cases for precision conversion and drift reporting"""
+
+    @pytest.fixture
+    def model(self):
+        """Create a small transformer-like stack of linear layers"""
+        return torch.nn.Sequential(
+            torch.nn.Linear(16, 32),
+            torch.nn.ReLU(),
+            torch.nn.Linear(32, 8)
+        )
+
+    def test_fp32_is_unchanged(self, model):
+        """Test that fp32 leaves the model as loaded"""
+        assert apply_precision('clip', model, 'fp32', torch.device('cpu')) is model
+
+    def test_int8_dynamic_quantizes_linear_layers(self, model):
+        """Test that int8-dynamic swaps in quantized linear layers with small drift"""
+        inputs = torch.randn(4, 16)
+        with torch.no_grad():
+            reference = model(inputs).numpy()
+
+        quantized = apply_precision('sentence_transformer', model, 'int8-dynamic', torch.device('cpu'))
+        with torch.no_grad():
+            candidate = quantized(inputs).numpy()
+
+        assert isinstance(quantized[0], torch.ao.nn.quantized.dynamic.Linear)
+        assert cosine_drift(reference, candidate)["mean_cosine"] > 0.95
+
+    def test_int8_dynamic_skipped_on_gpu(self, model):
+        """Test that dynamic quantization is not applied off CPU"""
+        result = apply_precision('clip', model, 'int8-dynamic', torch.device('cuda'))
+        assert isinstance(result[0], torch.nn.Linear)
+
+    def test_bf16(self, model):
+        """Test that bf16 casts the weights"""
+        result = apply_precision('blip', model, 'bf16', torch.device('cpu'))
+        assert result[0].weight.dtype == torch.bfloat16
+
+    def test_whisper_stays_fp32(self, model):
+        """Test that Whisper is never converted"""
+        result = apply_precision('whisper', model, 'bf16', torch.device('cpu'))
+        assert result[0].weight.dtype == torch.float32
+
+    def test_unknown_precision(self, model):
+        """Test that an unknown precision is rejected"""
+        with pytest.raises(ValueError, match="Unknown precision"):
+            apply_precision('clip', model, 'fp8', torch.device('cpu'))
+
+    def test_cosine_drift(self):
+        """Test drift summary for identical and orthogonal rows"""
+        reference = np.array([[1.0, 0.0], [0.0, 1.0]])
+        candidate = np.array([[2.0, 0.0], [1.0, 0.0]])
+
+        report = cosine_drift(reference, candidate)
+
+        assert report["samples"] == 2
+        assert report["mean_cosine"] == pytest.approx(0.5)
+        assert report["min_cosine"] == pytest.approx(0.0)
+        assert report["mean_drift"] == pytest.approx(0.5)
+
+    def test_sample_images_are_deterministic(self):
+        """Test that the synthetic sample set is reproducible"""
+        first = sample_images(count=2, size=32)
+        second = sample_images(count=2, size=32)
+
+        assert first[0].size == (32, 32)
+        assert np.array_equal(np.asarray(first[1]), np.asarray(second[1]))
+
+    def test_drift_check_uses_torch_backend(self, model):
+        """Test that drift is measured on the PyTorch weights even when serving ONNX"""
+        with patch('app.models.settings.embedding_backend', 'onnx'), \
+             patch('app.models.snapshots.has_snapshot', return_value=False), \
+             patch('app.models.SentenceTransformer', return_value=model), \
+             patch('app.onnx_backend.load_onnx_model') as mock_load_onnx, \
+             patch('app.precision.embed_samples', return_value=np.ones((2, 8))) as mock_embed:
+            report = check_precision_drift('bf16', ['sentence_transformer'], texts=['a', 'b'], images=[])
+
+        assert mock_embed.call_args_list[0][0][1] is model
+        assert report['sentence_transformer']['mean_drift'] == pytest.approx(0.0)
+        mock_load_onnx.assert_not_called()
@@ -0,0 +1,163 @@
+"""
+Unit tests for the model subprocess pool in multimodal-worker service
+"""
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import Mock, patch
+
+from app.process_pool import ModelProcessPool, parse_cpu_sets, _embed_images, _transcribe
+
+
+class TestParseCpuSets:
+    """Test cases for CPU set parsing"""
+
+    def test_explicit_sets(self):
+        """Test ranges and comma-separated CPUs"""
+        assert parse_cpu_sets("0-3;4,5,6-7", 2) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+    def test_set_count_mismatch(self):
+        """Test that the number of sets must match the worker count"""
+        with pytest.raises(ValueError):
+            parse_cpu_sets("0-3", 2)
+
+    def test_even_split(self):
+        """Test that available CPUs are split evenly when no spec is given"""
+        with patch('app.process_pool.os.sched_getaffinity', return_value={0, 1, 2, 3, 4}, create=True):
+            assert parse_cpu_sets("", 2) == [[0, 1], [2, 3]]
+
+    def test_more_workers_than_cpus(self):
+        """Test that workers are left unpinned when there are too few CPUs"""
+        with patch('app.process_pool.os.sched_getaffinity', return_value={0}, create=True):
+            assert parse_cpu_sets("", 2) == [None, None]
+
+
+class TestModelProcessPool:
+    """Test cases for ModelProcessPool shared-memory hand-off"""
+
+    @pytest.fixture
+    def pool(self):
+        """Create a pool whose requests are served in-process"""
+        model_manager = Mock()
+        clip_model = Mock()
+        clip_model.device = torch.device('cpu')
+        clip_model.get_image_features.side_effect = (
+            lambda pixel_values: torch.ones(pixel_values.shape[0], 4)
+        )
+        clip_processor = Mock(side_effect=lambda images, return_tensors: {
+            'pixel_values': torch.zeros(len(images), 3, 8, 8)
+        })
+        whisper_model = Mock()
+        whisper_model.transcribe.side_effect = (
+            lambda audio: {"text": f"{len(audio)} samples", "language": "en"}
+        )
+        model_manager.get_model.side_effect = (
+            lambda name: clip_model if name == 'clip' else whisper_model
+        )
+        model_manager.get_processor.return_value = clip_processor
+
+        handlers = {'clip_image': _embed_images, 'whisper_transcribe': _transcribe}
+
+        def submit(op, **payload):
+            future = Future()
+            future.set_result(handlers[op](model_manager, **payload))
+            return future
+
+        pool = ModelProcessPool(2, cpu_sets=[None, None])
+        pool.embedding_dim = 4
+        pool._submit = submit
+        return pool, clip_processor
+
+    def test_embed_images(self, pool):
+        """Test that images of different sizes round-trip through shared memory"""
+        pool, clip_processor = pool
+        images = [
+            np.full((8, 8, 3), 1, dtype=np.uint8),
+            np.full((4, 6, 3), 2, dtype=np.uint8)
+        ]
+
+        embeddings = pool.embed_images(images)
+
+        assert embeddings.shape == (2, 4)
+        assert np.all(embeddings == 1.0)
+        clip_processor.assert_called_once()
+
+    def test_transcribe(self, pool):
+        """Test that audio is handed over through shared memory"""
+        pool, _ = pool
+
+        result = pool.transcribe(np.zeros(16000, dtype=np.float32))
+
+        assert result == {"text": "16000 samples", "language": "en"}
+
+    def test_call_requires_start(self):
+        """Test that requests fail before the pool is started"""
+        pool = ModelProcessPool(1, cpu_sets=[None])
+        with pytest.raises(RuntimeError):
+            pool._call('clip_image')
+
+    def test_invalid_worker_count(self):
+        """Test that at least one worker is required"""
+        with pytest.raises(ValueError):
+            ModelProcessPool(0)
+
+    def test_shared_memory_outlives_timed_out_request(self):
+        """Test that a timed-out request's segment is unlinked only once the subprocess replies"""
+        pool = ModelProcessPool(1, cpu_sets=[None])
+        future = Future()
+        submitted = {}
+
+        def submit(op, **payload):
+            submitted.update(payload)
+            return future
+
+        pool._submit = submit
+        with patch('app.process_pool.settings.model_process_request_timeout', 0.01):
+            with pytest.raises(TimeoutError):
+                pool.transcribe(np.zeros(16, dtype=np.float32))
+
+        shared_memory.SharedMemory(name=submitted['audio_shm']).close()
+        future.set_result({"text": ""})
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=submitted['audio_shm'])
+
+    def test_exited_worker_fails_requests_and_restarts(self):
+        """Test that a crashed subprocess fails its requests and is replaced"""
+        pool = ModelProcessPool(2, cpu_sets=[None, None])
+        pool._reader = Mock()
+        pool._processes = [Mock(exitcode=-9, pid=101), Mock()]
+        pool._request_queues = [Mock(), Mock()]
+        pool._ready = [True, True]
+        replacement = Mock()
+
+        future = pool._submit('clip_image')
+        with patch.object(pool, '_spawn', return_value=(Mock(), replacement)) as spawn:
+            pool._handle_exit(0)
+
+        with pytest.raises(RuntimeError, match="exited with code -9"):
+            future.result(timeout=0)
+        spawn.assert_called_once_with(0)
+        assert pool._processes[0] is replacement
+        assert pool._in_flight == [0, 0]
+        assert pool.restarts == 1
+        assert pool._pending == {}
+
+    def test_worker_failing_to_start_is_restarted_with_backoff(self):
+        """Test that a subprocess dying before it is ready is not restarted in a tight loop"""
+        pool = ModelProcessPool(1, cpu_sets=[None])
+        pool._processes = [Mock(exitcode=1, pid=101)]
+
+        with patch('app.process_pool.threading.Timer') as timer, \
+             patch.object(pool, '_spawn') as spawn:
+            pool._handle_exit(0)
+
+        assert timer.call_args[0][0] == 2.0
+        timer.return_value.start.assert_called_once()
+        spawn.assert_not_called()
+        assert pool._processes == [None]
+        pool._reader = Mock()
+        with pytest.raises(RuntimeError, match="No model subprocess is running"):
+            pool._submit('clip_image')
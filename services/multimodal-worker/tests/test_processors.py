@@ -1,6 +1,7 @@
 """
 Unit tests for processors in multimodal-worker service
 """
+import asyncio
 import pytest
 import pytest_asyncio
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
@@ -11,7 +12,11 @@ import tempfile
 import os
 import cv2
 
-from app.processors import ImageProcessor, VideoProcessor, TextProcessor
+from app.processors import (
+    ImageProcessor, VideoProcessor, TextProcessor, resolve_caption_profile,
+    image_content_hash, text_content_hash
+)
+from app.batching import MicroBatcher
 
 
 class TestImageProcessor:
@@ -21,6 +26,10 @@ class TestImageProcessor:
     def mock_managers(self):
         """Create mock managers for testing"""
         model_manager = Mock()
+        model_manager.get_batcher.side_effect = (
+            lambda name, batch_fn, **kwargs: MicroBatcher(name, batch_fn, **kwargs)
+        )
+        model_manager.process_pool = None
         db_manager = AsyncMock()
         storage_manager = Mock()
         return model_manager, db_manager, storage_manager
@@ -108,6 +117,84 @@ class TestImageProcessor:
         image_processor.model_manager.get_model.assert_called_with('clip')
         image_processor.model_manager.get_processor.assert_called_with('clip')
 
+    @pytest.mark.asyncio
+    async def test_generate_image_embedding_cache_hit(self, image_processor, test_image):
+        """Test that a cached image embedding skips CLIP entirely"""
+        cached = np.random.rand(512).astype(np.float32)
+        image_processor.model_manager.embedding_model_key.return_value = "clip-key"
+
+        with patch('app.processors.model_cache_manager') as mock_cache:
+            mock_cache.connected = True
+            mock_cache.get_embedding = AsyncMock(return_value=cached)
+            mock_cache.set_embedding = AsyncMock()
+
+            embedding = await image_processor.generate_image_embedding(test_image)
+
+            assert embedding is cached
+            content_hash, model_key = mock_cache.get_embedding.call_args[0]
+            assert content_hash == image_content_hash(test_image)
+            assert model_key == "clip-key"
+            image_processor.model_manager.get_batcher.assert_not_called()
+            mock_cache.set_embedding.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_generate_image_embedding_cache_miss_writes_through(self, image_processor, test_image):
+        """Test that a computed image embedding is written to the cache"""
+        mock_clip_model = Mock()
+        mock_clip_model.device = torch.device('cpu')
+        mock_clip_model.get_image_features.return_value = torch.randn(1, 512)
+        image_processor.model_manager.get_model.return_value = mock_clip_model
+        image_processor.model_manager.get_processor.return_value = Mock(
+            return_value={'pixel_values': torch.randn(1, 3, 224, 224)}
+        )
+        image_processor.model_manager.embedding_model_key.return_value = "clip-key"
+
+        with patch('app.processors.model_cache_manager') as mock_cache:
+            mock_cache.connected = True
+            mock_cache.get_embedding = AsyncMock(return_value=None)
+            mock_cache.set_embedding = AsyncMock()
+
+            embedding = await image_processor.generate_image_embedding(test_image)
+
+            args, kwargs = mock_cache.set_embedding.call_args
+            assert args[0] == image_content_hash(test_image)
+            assert args[1] == "clip-key"
+            assert args[2] is embedding
+            assert "ttl" in kwargs
+
+    def test_generate_image_embeddings_batch(self, image_processor, test_image):
+        """Test that a batch of images is embedded in a single forward pass"""
+        mock_clip_model = Mock()
+        mock_clip_model.device = torch.device('cpu')
+        mock_clip_model.get_image_features.return_value = torch.randn(3, 512)
+
+        mock_clip_processor = Mock()
+        mock_clip_processor.return_value = {
+            'pixel_values': torch.randn(3, 3, 224, 224)
+        }
+
+        image_processor.model_manager.get_model.return_value = mock_clip_model
+        image_processor.model_manager.get_processor.return_value = mock_clip_processor
+
+        embeddings = image_processor.generate_image_embeddings_batch([test_image] * 3)
+
+        assert len(embeddings) == 3
+        assert all(embedding.shape == (512,) for embedding in embeddings)
+        mock_clip_model.get_image_features.assert_called_once()
+
+    def test_generate_image_embeddings_batch_uses_process_pool(self, image_processor, test_image):
+        """Test that batches are handed to the model subprocess pool when enabled"""
+        mock_pool = Mock()
+        mock_pool.embed_images.return_value = np.zeros((2, 512), dtype=np.float32)
+        image_processor.model_manager.process_pool = mock_pool
+
+        embeddings = image_processor.generate_image_embeddings_batch([test_image] * 2)
+
+        assert len(embeddings) == 2
+        arrays = mock_pool.embed_images.call_args[0][0]
+        assert arrays[0].shape == (224, 224, 3)
+        image_processor.model_manager.get_model.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_generate_image_caption(self, image_processor, test_image):
         """Test image caption generation"""
@@ -136,6 +223,37 @@ class TestImageProcessor:
         image_processor.model_manager.get_model.assert_called_with('blip')
         image_processor.model_manager.get_processor.assert_called_with('blip')
 
+    def test_generate_image_captions_batch_uses_profile(self, image_processor, test_image):
+        """Test that batched captioning applies the selected decoding profile"""
+        mock_blip_model = Mock()
+        mock_blip_model.device = torch.device('cpu')
+        mock_blip_model.generate.return_value = torch.tensor([[1, 2], [3, 4]])
+
+        mock_blip_processor = Mock()
+        mock_blip_processor.return_value = {
+            'pixel_values': torch.randn(2, 3, 224, 224)
+        }
+        mock_blip_processor.decode.side_effect = ["first caption", "second caption"]
+
+        image_processor.model_manager.get_model.return_value = mock_blip_model
+        image_processor.model_manager.get_processor.return_value = mock_blip_processor
+
+        captions = image_processor.generate_image_captions_batch(
+            [test_image, test_image], caption_profile="fast"
+        )
+
+        assert captions == ["first caption", "second caption"]
+        _, kwargs = mock_blip_model.generate.call_args
+        assert kwargs["num_beams"] == 1
+
+    def test_resolve_caption_profile(self):
+        """Test caption profile resolution and validation"""
+        assert resolve_caption_profile("balanced") == "balanced"
+        assert resolve_caption_profile(None) == "quality"
+
+        with pytest.raises(ValueError, match="Unknown caption profile"):
+            resolve_caption_profile("nonexistent")
+
     def test_extract_image_features(self, image_processor, test_image):
         """Test image feature extraction"""
         # Test feature extraction
@@ -230,6 +348,10 @@ class TestVideoProcessor:
     def mock_managers(self):
         """Create mock managers for testing"""
         model_manager = Mock()
+        model_manager.get_batcher.side_effect = (
+            lambda name, batch_fn, **kwargs: MicroBatcher(name, batch_fn, **kwargs)
+        )
+        model_manager.process_pool = None
         db_manager = AsyncMock()
         storage_manager = Mock()
         return model_manager, db_manager, storage_manager
@@ -306,6 +428,66 @@ class TestVideoProcessor:
             # Verify storage upload was called
             video_processor.storage_manager.upload_file.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_process_video_keyframes_run_concurrently(self, video_processor, temp_video_file):
+        """Test that keyframes are processed together and returned in order"""
+        video_processor.storage_manager.generate_object_path.return_value = "test/path/video.mp4"
+        video_processor.db_manager.create_video.return_value = "test_video_id"
+        in_flight = 0
+        max_in_flight = 0
+
+        async def process_keyframe(video_id, keyframe_path, timestamp, caption_profile=None):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return {"timestamp": timestamp}
+
+        with patch.object(video_processor, 'transcribe_video_audio', return_value="transcription"), \
+             patch.object(video_processor, 'extract_keyframes',
+                          return_value=[(0.0, "k1.jpg"), (5.0, "k2.jpg"), (10.0, "k3.jpg")]), \
+             patch.object(video_processor, 'generate_text_embedding', return_value=np.random.rand(512)), \
+             patch.object(video_processor, 'process_keyframe', side_effect=process_keyframe), \
+             patch('app.processors.VideoFileClip') as mock_video_clip:
+            mock_video_clip.return_value = Mock(duration=10.0, fps=30.0, size=(1920, 1080))
+
+            result = await video_processor.process_video(temp_video_file, "test_document_id")
+
+            assert max_in_flight == 3
+            assert [k["timestamp"] for k in result["keyframes"]] == [0.0, 5.0, 10.0]
+
+    @pytest.mark.asyncio
+    async def test_process_video_keyframe_failure_cancels_siblings(self, video_processor, temp_video_file):
+        """Test that one failed keyframe cancels the others and removes the keyframe directory"""
+        video_processor.storage_manager.generate_object_path.return_value = "test/path/video.mp4"
+        video_processor.db_manager.create_video.return_value = "test_video_id"
+        cancelled = []
+
+        async def process_keyframe(video_id, keyframe_path, timestamp, caption_profile=None):
+            if timestamp == 0.0:
+                raise RuntimeError("caption failed")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(timestamp)
+                raise
+
+        with patch.object(video_processor, 'transcribe_video_audio', return_value="transcription"), \
+             patch.object(video_processor, 'extract_keyframes',
+                          return_value=[(0.0, "k1.jpg"), (5.0, "k2.jpg"), (10.0, "k3.jpg")]) as mock_keyframes, \
+             patch.object(video_processor, 'generate_text_embedding', return_value=np.random.rand(512)), \
+             patch.object(video_processor, 'process_keyframe', side_effect=process_keyframe), \
+             patch('app.processors.VideoFileClip') as mock_video_clip:
+            mock_video_clip.return_value = Mock(duration=10.0, fps=30.0, size=(1920, 1080))
+
+            with pytest.raises(RuntimeError, match="caption failed"):
+                await video_processor.process_video(temp_video_file, "test_document_id")
+
+            assert sorted(cancelled) == [5.0, 10.0]
+            keyframe_dir = mock_keyframes.call_args.args[2]
+            assert not os.path.exists(keyframe_dir)
+
     @pytest.mark.asyncio
     async def test_transcribe_video_audio(self, video_processor, temp_video_file):
         """Test video audio transcription"""
@@ -359,12 +541,14 @@ class TestVideoProcessor:
             mock_capture.return_value = mock_cap
 
             # Test keyframe extraction
-            keyframes = await video_processor.extract_keyframes(temp_video_file, 10.0)
+            with tempfile.TemporaryDirectory() as output_dir:
+                keyframes = await video_processor.extract_keyframes(temp_video_file, 10.0, output_dir)
 
             # Verify keyframes structure
             assert isinstance(keyframes, list)
             assert len(keyframes) > 0
             assert all(isinstance(kf, tuple) and len(kf) == 2 for kf in keyframes)
+            assert all(os.path.dirname(path) == output_dir for _, path in keyframes)
 
     @pytest.mark.asyncio
     async def test_process_keyframe(self, video_processor):
@@ -448,15 +632,18 @@ class TestTextProcessor:
     async def test_process_text_success(self, text_processor):
         """Test successful text processing"""
         # Mock dependencies
-        text_processor.db_manager.create_text_chunk.return_value = "test_chunk_id"
+        text_processor.db_manager.create_text_chunks.side_effect = (
+            lambda chunks: [f"chunk_{c['chunk_index']}" for c in chunks]
+        )
 
         # Mock embedding generation
-        with patch.object(text_processor, 'generate_text_embedding') as mock_embedding, \
+        with patch.object(text_processor, 'generate_text_embeddings') as mock_embeddings, \
              patch('app.processors.settings') as mock_settings:
             
             mock_settings.chunk_size = 100
             mock_settings.chunk_overlap = 20
-            mock_embedding.return_value = np.random.rand(512)
+            mock_settings.text_embedding_bucket_size = 512
+            mock_embeddings.side_effect = lambda texts: np.random.rand(len(texts), 512)
 
             # Test text processing
             test_text = "This is a test document with multiple sentences. " * 10  # Long text
@@ -475,8 +662,13 @@ class TestTextProcessor:
                 assert "text" in chunk
                 assert "embedding" in chunk
 
-            # Verify database records were created
-            assert text_processor.db_manager.create_text_chunk.call_count == len(result["chunks"])
+            # Verify chunks are returned in document order
+            assert [c["chunk_index"] for c in result["chunks"]] == list(range(result["total_chunks"]))
+
+            # Verify all chunks were embedded and persisted in one batch each
+            mock_embeddings.assert_called_once()
+            text_processor.db_manager.create_text_chunks.assert_called_once()
+            text_processor.db_manager.create_text_chunk.assert_not_called()
 
     def test_chunk_text(self, text_processor):
         """Test text chunking"""
@@ -520,15 +712,16 @@ class TestTextProcessor:
     async def test_process_text_with_short_text(self, text_processor):
         """Test text processing with short text"""
         # Mock dependencies
-        text_processor.db_manager.create_text_chunk.return_value = "test_chunk_id"
+        text_processor.db_manager.create_text_chunks.return_value = ["test_chunk_id"]
 
         # Mock embedding generation
-        with patch.object(text_processor, 'generate_text_embedding') as mock_embedding, \
+        with patch.object(text_processor, 'generate_text_embeddings') as mock_embeddings, \
              patch('app.processors.settings') as mock_settings:
             
             mock_settings.chunk_size = 100
             mock_settings.chunk_overlap = 20
-            mock_embedding.return_value = np.random.rand(512)
+            mock_settings.text_embedding_bucket_size = 512
+            mock_embeddings.return_value = np.random.rand(1, 512)
 
             # Test with short text
             short_text = "Short text"
@@ -543,13 +736,80 @@ class TestTextProcessor:
     async def test_process_text_failure(self, text_processor):
         """Test text processing failure"""
         # Mock embedding generation failure
-        with patch.object(text_processor, 'generate_text_embedding') as mock_embedding:
-            mock_embedding.side_effect = Exception("Embedding generation failed")
+        with patch.object(text_processor, 'generate_text_embeddings') as mock_embeddings:
+            mock_embeddings.side_effect = Exception("Embedding generation failed")
 
             # Test that exception is raised
             with pytest.raises(Exception, match="Embedding generation failed"):
                 await text_processor.process_text("Test text", "test_document_id")
 
+    @pytest.mark.asyncio
+    async def test_process_texts_multiple_documents(self, text_processor):
+        """Test that chunks from several documents are bucketed by length"""
+        text_processor.db_manager.create_text_chunks.side_effect = (
+            lambda chunks: [f"{c['document_id']}_{c['chunk_index']}" for c in chunks]
+        )
+
+        with patch.object(text_processor, 'generate_text_embeddings') as mock_embeddings, \
+             patch('app.processors.settings') as mock_settings:
+
+            mock_settings.chunk_size = 3
+            mock_settings.chunk_overlap = 0
+            mock_settings.text_embedding_bucket_size = 2
+            mock_embeddings.side_effect = lambda texts: np.random.rand(len(texts), 8)
+
+            results = await text_processor.process_texts([
+                ("a b c dddddddddd eeeeeeeeee", "doc_1"),
+                ("f g", "doc_2")
+            ])
+
+            assert [r["total_chunks"] for r in results] == [2, 1]
+            assert [c["chunk_id"] for c in results[0]["chunks"]] == ["doc_1_0", "doc_1_1"]
+            assert results[1]["chunks"][0]["text"] == "f g"
+
+            # Buckets are encoded longest first
+            first_bucket = mock_embeddings.call_args_list[0][0][0]
+            assert first_bucket[0] == "dddddddddd eeeeeeeeee"
+            assert mock_embeddings.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_generate_text_embeddings(self, text_processor):
+        """Test batched text embedding generation"""
+        mock_sentence_transformer = Mock()
+        mock_sentence_transformer.encode.return_value = np.random.rand(2, 384)
+        text_processor.model_manager.get_model.return_value = mock_sentence_transformer
+
+        embeddings = await text_processor.generate_text_embeddings(["first", "second"])
+
+        assert embeddings.shape == (2, 384)
+        args, kwargs = mock_sentence_transformer.encode.call_args
+        assert args[0] == ["first", "second"]
+        assert "batch_size" in kwargs
+
+    @pytest.mark.asyncio
+    async def test_generate_text_embeddings_encodes_only_cache_misses(self, text_processor):
+        """Test that cached chunks are served from the cache and only misses are encoded"""
+        cached = np.random.rand(384).astype(np.float32)
+        mock_sentence_transformer = Mock()
+        mock_sentence_transformer.encode.return_value = np.random.rand(1, 384)
+        text_processor.model_manager.get_model.return_value = mock_sentence_transformer
+        text_processor.model_manager.embedding_model_key.return_value = "st-key"
+
+        with patch('app.processors.model_cache_manager') as mock_cache:
+            mock_cache.connected = True
+            mock_cache.get_embeddings = AsyncMock(return_value=[cached, None])
+            mock_cache.set_embeddings = AsyncMock()
+
+            embeddings = await text_processor.generate_text_embeddings(["first", "second"])
+
+            assert embeddings.shape == (2, 384)
+            assert np.array_equal(embeddings[0], cached)
+            assert mock_sentence_transformer.encode.call_args[0][0] == ["second"]
+
+            written, model_key = mock_cache.set_embeddings.call_args[0]
+            assert list(written) == [text_content_hash("second")]
+            assert model_key == "st-key"
+
     def test_chunk_text_with_overlap(self, text_processor):
         """Test text chunking with overlap"""
         with patch('app.processors.settings') as mock_settings:
@@ -0,0 +1,79 @@
+"""
+Unit tests for model snapshots in multimodal-worker service
+"""
+import json
+import os
+import tempfile
+import pytest
+from unittest.mock import Mock, patch
+
+from app import snapshots
+from app.models import ModelManager
+
+
+class TestSnapshots:
+    """Test cases for snapshot creation and loading"""
+
+    @pytest.fixture
+    def snapshot_settings(self):
+        """Point snapshots at a temporary directory"""
+        with tempfile.TemporaryDirectory() as snapshot_dir, \
+             patch('app.snapshots.settings') as mock_settings:
+            mock_settings.model_snapshot_dir = snapshot_dir
+            mock_settings.device = 'cpu'
+            mock_settings.clip_model = 'openai/clip-vit-base-patch32'
+            mock_settings.blip_model = 'Salesforce/blip-image-captioning-base'
+            mock_settings.whisper_model = 'base'
+            mock_settings.sentence_transformer_model = 'sentence-transformers/all-MiniLM-L6-v2'
+            yield mock_settings
+
+    def test_write_snapshot_writes_manifest(self, snapshot_settings):
+        """Test that a snapshot records its source model"""
+        model = Mock()
+
+        path = snapshots.write_snapshot('sentence_transformer', model)
+
+        model.save.assert_called_once_with(path, safe_serialization=True)
+        with open(os.path.join(path, snapshots.MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        assert manifest["source"] == 'sentence-transformers/all-MiniLM-L6-v2'
+        assert snapshots.has_snapshot('sentence_transformer') is True
+
+    def test_stale_snapshot_is_ignored(self, snapshot_settings):
+        """Test that a snapshot of a different model is not used"""
+        snapshots.write_snapshot('sentence_transformer', Mock())
+        snapshot_settings.sentence_transformer_model = 'sentence-transformers/all-mpnet-base-v2'
+
+        assert snapshots.has_snapshot('sentence_transformer') is False
+
+    def test_missing_snapshot(self, snapshot_settings):
+        """Test that a model without a snapshot reports none"""
+        assert snapshots.has_snapshot('clip') is False
+
+    def test_model_manager_prefers_snapshot(self):
+        """Test that ModelManager loads from a snapshot when one exists"""
+        model_manager = ModelManager()
+        snapshot_model = Mock()
+
+        with patch('app.models.snapshots.has_snapshot', return_value=True), \
+             patch('app.models.snapshots.load_snapshot', return_value=(snapshot_model, None)) as mock_load, \
+             patch('app.models.SentenceTransformer') as mock_sentence_transformer:
+            model_manager.load_model('sentence_transformer')
+
+        mock_load.assert_called_once_with('sentence_transformer', model_manager.device)
+        mock_sentence_transformer.assert_not_called()
+        assert model_manager.get_model('sentence_transformer') is snapshot_model
+
+    def test_create_snapshots_uses_torch_backend(self, snapshot_settings):
+        """Test that snapshots are written from the PyTorch model even when serving ONNX"""
+        torch_model = Mock()
+
+        with patch('app.models.settings.embedding_backend', 'onnx'), \
+             patch('app.models.SentenceTransformer', return_value=torch_model), \
+             patch('app.onnx_backend.load_onnx_model') as mock_load_onnx, \
+             patch('app.snapshots.write_snapshot', return_value='/snapshots/st') as mock_write:
+            paths = snapshots.create_snapshots(['sentence_transformer'])
+
+        assert paths == {'sentence_transformer': '/snapshots/st'}
+        mock_write.assert_called_once_with('sentence_transformer', torch_model, None)
+        mock_load_onnx.assert_not_called()
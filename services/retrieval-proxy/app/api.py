@@ -8,6 +8,7 @@ from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from .config import settings
+from .http_clients import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -41,33 +42,38 @@ async def search_multimodal(request: SearchRequest, req: Request):
         cache_manager = req.app.state.cache_manager
         retrieval_engine = req.app.state.retrieval_engine
         
-        # Check cache first
-        cached_results = await cache_manager.get_search_results(
-            query=request.query,
-            file_type=request.modalities[0] if request.modalities else None,
-            limit=request.limit
-        )
-        
-        if cached_results:
-            logger.info(f"Returning cached search results for: {request.query}")
-            return SearchResponse(**cached_results["results"])
+        # Check cache first; results are keyed by the corpus generation, so
+        # documents ingested since they were cached are never hidden. Without
+        # a generation (Redis unavailable) the search is not cached.
+        generation = await cache_manager.get_corpus_generation() if cache_manager.connected else None
+        cache_params = {
+            "query": request.query,
+            "modalities": request.modalities,
+            "limit": request.limit,
+            "filters": request.filters,
+            "score_threshold": request.score_threshold,
+            "generation": generation
+        }
+        if generation is not None:
+            cached_results = await cache_manager.get_search_results(**cache_params)
+            if cached_results:
+                logger.info(f"Returning cached search results for: {request.query}")
+                return SearchResponse(**cached_results["results"])
         
-        # Perform search if not cached
-        result = await retrieval_engine.search(
-            query=request.query,
-            modalities=request.modalities,
-            limit=request.limit,
-            filters=request.filters,
-            score_threshold=request.score_threshold
-        )
+        async def run_search() -> Dict[str, Any]:
+            result = await retrieval_engine.search(
+                query=request.query,
+                modalities=request.modalities,
+                limit=request.limit,
+                filters=request.filters,
+                score_threshold=request.score_threshold
+            )
+            if generation is not None:
+                await cache_manager.set_search_results(results=result, **cache_params)
+            return result
         
-        # Cache the results
-        await cache_manager.set_search_results(
-            query=request.query,
-            results=result,
-            file_type=request.modalities[0] if request.modalities else None,
-            limit=request.limit
-        )
+        # Perform search if not cached, once for all identical concurrent requests
+        result = await cache_manager.coalesce_search(run_search, **cache_params)
         
         return SearchResponse(**result)
         
@@ -288,6 +294,7 @@ async def get_system_stats(req: Request):
         return {
             "database": db_stats,
             "vector_store": vector_stats,
+            "http_clients": http_clients.get_stats(),
             "timestamp": "2024-01-01T00:00:00Z"  # Would use actual timestamp
         }
         
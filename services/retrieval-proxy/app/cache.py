@@ -1,10 +1,15 @@
 """
 Redis cache manager for retrieval proxy service
 """
+import asyncio
+import fnmatch
 import json
 import hashlib
 import logging
-from typing import Any, Optional, Dict, List
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 
 import redis.asyncio as aioredis
@@ -12,6 +17,110 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Bumped by the multimodal worker whenever a document is committed
+CORPUS_GENERATION_KEY = "corpus:generation"
+CORPUS_GENERATION_CHANNEL = "corpus:generation"
+
+# Deletes a lock only if it is still held by the caller's token
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Cache key namespaces, each tracked in a sorted set of key -> expiry time
+NAMESPACES = ("search", "context")
+INVALIDATION_BATCH_SIZE = 500
+
+# Version prefix of cached payloads; entries without it are legacy plain JSON
+PAYLOAD_FORMAT = b"P1:"
+
+
+def encode_payload(data: Dict[str, Any]) -> bytes:
+    """Serialize a cached payload as compact, versioned UTF-8 JSON"""
+    return PAYLOAD_FORMAT + json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    """Deserialize a cached payload written by any version"""
+    if data.startswith(PAYLOAD_FORMAT):
+        return json.loads(data[len(PAYLOAD_FORMAT):])
+    return json.loads(data)
+
+
+class LocalCache:
+    """Size-bounded in-process LRU cache with a per-entry TTL
+    
+    Sits in front of Redis and uses the same keys. Only touched from the
+    event loop, so it needs no locking.
+    
+    Mirrors the LocalCache in services/multimodal-worker/app/cache.py. The two
+    services build from separate Docker contexts and share no package, so
+    the copies are kept identical; change both together.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get an entry, or None if it is missing or expired"""
+        if not self.enabled:
+            return None
+        
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, key: str, value: Any):
+        """Add or replace an entry, evicting the least recently used when full"""
+        if not self.enabled:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, pattern: str) -> int:
+        """Drop entries whose key matches a glob-style pattern"""
+        keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get entry counts and hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total * 100) if total > 0 else 0,
+            "invalidations": self.invalidations
+        }
+
 
 class CacheManager:
     """Redis cache manager for retrieval proxy operations"""
@@ -19,6 +128,23 @@ class CacheManager:
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
         self.connected = False
+        
+        # In-process tier in front of Redis for search results and context bundles
+        self.local_cache = LocalCache(settings.cache_l1_max_entries, settings.cache_l1_ttl)
+        self.invalidation_channel = f"{settings.service_name}:cache:invalidate"
+        self._invalidation_task: Optional[asyncio.Task] = None
+        
+        # Last seen corpus generation and when it was read from Redis
+        self.corpus_generation: Optional[int] = None
+        self._generation_checked = 0.0
+        
+        # Redis lookups that missed the in-process tier
+        self.l2_hits = 0
+        self.l2_misses = 0
+        
+        # Computations in flight by cache key, shared by identical concurrent requests
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
     
     async def initialize(self):
         """Initialize Redis connection"""
@@ -26,7 +152,7 @@ class CacheManager:
             self.redis = aioredis.from_url(
                 f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}",
                 encoding="utf-8",
-                decode_responses=True
+                decode_responses=False  # Payloads are encoded and decoded explicitly
             )
             
             # Test connection
@@ -34,6 +160,8 @@ class CacheManager:
             self.connected = True
             logger.info(f"Connected to Redis at {settings.redis_host}:{settings.redis_port}")
             
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+            
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
             self.connected = False
@@ -42,11 +170,184 @@ class CacheManager:
     
     async def close(self):
         """Close Redis connection"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+        
         if self.redis:
             await self.redis.close()
             self.connected = False
             logger.info("Redis connection closed")
     
+    async def _listen_for_invalidations(self):
+        """Apply in-process cache invalidations and corpus generation bumps"""
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.invalidation_channel, CORPUS_GENERATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                if message["channel"].decode("utf-8") == CORPUS_GENERATION_CHANNEL:
+                    self._set_corpus_generation(int(message["data"]))
+                    continue
+                pattern = message["data"].decode("utf-8")
+                dropped = self.local_cache.invalidate(pattern)
+                logger.debug(f"Invalidated {dropped} local cache entries matching {pattern}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener stopped: {e}")
+        finally:
+            await pubsub.aclose()
+    
+    async def _publish_invalidation(self, pattern: str):
+        """Drop matching in-process entries here and on every other replica"""
+        self.local_cache.invalidate(pattern)
+        try:
+            await self.redis.publish(self.invalidation_channel, pattern)
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {e}")
+    
+    def _set_corpus_generation(self, generation: int, authoritative: bool = False):
+        """Record a corpus generation
+        
+        Pushed bumps can arrive out of order, so they never move the
+        generation backwards. A value read from Redis is authoritative and
+        is taken as is, so a counter that was reset is picked up.
+        """
+        if authoritative:
+            self.corpus_generation = generation
+            self._generation_checked = time.monotonic()
+        else:
+            self.corpus_generation = max(generation, self.corpus_generation or 0)
+    
+    async def get_corpus_generation(self) -> Optional[int]:
+        """Get the corpus generation folded into search cache keys
+        
+        Bumps are pushed over pub/sub; Redis is re-read at most every
+        ``corpus_generation_max_age`` seconds in case a message was missed.
+        If Redis cannot be read, the last known generation is returned, or
+        None when there is none and searches must not be cached.
+        """
+        if (self.corpus_generation is not None and
+                time.monotonic() - self._generation_checked < settings.corpus_generation_max_age):
+            return self.corpus_generation
+        
+        try:
+            generation = await self.redis.get(CORPUS_GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Error reading corpus generation: {e}")
+            return self.corpus_generation
+        self._set_corpus_generation(int(generation or 0), authoritative=True)
+        return self.corpus_generation
+    
+    def _search_cache_key(self, query: str, modalities: Optional[List[str]], limit: Optional[int],
+                          filters: Optional[Dict[str, Any]], score_threshold: Optional[float],
+                          generation: int) -> str:
+        """Generate the cache key for a search, covering every parameter that shapes its results"""
+        return self._generate_cache_key(
+            "search", query,
+            modalities=sorted(modalities) if modalities else None,
+            limit=limit,
+            filters=filters,
+            score_threshold=score_threshold,
+            generation=generation
+        )
+    
+    async def coalesce_search(self, compute: Callable[[], Awaitable[Dict[str, Any]]], query: str,
+                              modalities: Optional[List[str]] = None, limit: Optional[int] = 10,
+                              filters: Optional[Dict[str, Any]] = None,
+                              score_threshold: Optional[float] = None,
+                              generation: Optional[int] = None) -> Dict[str, Any]:
+        """Run a search once for all identical concurrent requests
+        
+        ``compute`` performs the search and caches its results. Callers
+        arriving while it runs share its result instead of searching again.
+        Without a corpus generation nothing is cached, so replicas do not
+        wait on each other's results.
+        """
+        if generation is None and self.connected:
+            generation = await self.get_corpus_generation()
+        cache_key = self._search_cache_key(query, modalities, limit, filters, score_threshold, generation)
+        
+        async def read_cached() -> Optional[Dict[str, Any]]:
+            cached = await self.get_search_results(
+                query, modalities, limit, filters, score_threshold, generation
+            )
+            return cached["results"] if cached else None
+        
+        return await self.single_flight(cache_key, compute, read_cached if generation is not None else None)
+    
+    async def single_flight(self, key: str, compute: Callable[[], Awaitable[Any]],
+                            read_cached: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Share one in-flight computation of ``key`` between concurrent callers
+        
+        The computation runs as its own task, so a caller that disconnects
+        does not cancel it for the others.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute_with_lock(key, compute, read_cached))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish_flight(key, done))
+        else:
+            self.coalesced_requests += 1
+        return await asyncio.shield(task)
+    
+    def _finish_flight(self, key: str, task: asyncio.Task):
+        """Forget a finished computation"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller went away
+            task.exception()
+    
+    async def _compute_with_lock(self, key: str, compute: Callable[[], Awaitable[Any]],
+                                 read_cached: Optional[Callable[[], Awaitable[Any]]]) -> Any:
+        """Compute once across replicas when the Redis search lock is enabled
+        
+        Replicas that lose the lock poll the cache for the winner's result,
+        and compute themselves if the lock is released or expires without one.
+        """
+        if not (settings.search_lock_enabled and self.connected and read_cached):
+            return await compute()
+        
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(
+                lock_key, token, nx=True, px=int(settings.search_lock_ttl * 1000)
+            )
+        except Exception as e:
+            logger.error(f"Error acquiring search lock: {e}")
+            return await compute()
+        
+        if acquired:
+            try:
+                return await compute()
+            finally:
+                try:
+                    await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Error releasing search lock: {e}")
+        
+        deadline = time.monotonic() + settings.search_lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.search_lock_poll_interval)
+                cached = await read_cached()
+                if cached is not None:
+                    return cached
+                if not await self.redis.exists(lock_key):
+                    break
+        except Exception as e:
+            logger.error(f"Error waiting for search lock: {e}")
+        return await compute()
+    
     def _generate_cache_key(self, prefix: str, query: str, **kwargs) -> str:
         """Generate a consistent cache key from query and parameters"""
         # Create a hash of the query and parameters
@@ -58,21 +359,70 @@ class CacheManager:
         cache_hash = hashlib.md5(cache_string.encode()).hexdigest()
         return f"{prefix}:{cache_hash}"
     
-    async def get_search_results(self, query: str, file_type: Optional[str] = None, 
-                                limit: int = 10) -> Optional[Dict[str, Any]]:
-        """Get cached search results"""
+    async def _read_payload(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Read a cached payload from the in-process tier or Redis
+        
+        Legacy entries are rewritten in the compact format.
+        """
+        payload = self.local_cache.get(cache_key)
+        if payload is not None:
+            return payload
+        
+        cached_data = await self.redis.get(cache_key)
+        if not cached_data:
+            self.l2_misses += 1
+            return None
+        
+        self.l2_hits += 1
+        payload = decode_payload(cached_data)
+        self.local_cache.set(cache_key, payload)
+        if not cached_data.startswith(PAYLOAD_FORMAT):
+            try:
+                await self.redis.set(cache_key, encode_payload(payload), keepttl=True)
+            except Exception as e:
+                logger.error(f"Error migrating cache entry {cache_key}: {e}")
+        return payload
+    
+    def _namespace_index(self, namespace: str) -> str:
+        """Get the sorted set indexing a key namespace"""
+        return f"index:ns:{namespace}"
+    
+    async def _write_payload(self, cache_key: str, payload: Dict[str, Any], ttl: int):
+        """Write a payload to Redis and the in-process tier
+        
+        The key is recorded in its namespace index, scored by expiry time, so
+        invalidation and stats never have to enumerate the keyspace.
+        """
+        now = time.time()
+        namespace_index = self._namespace_index(cache_key.split(":", 1)[0])
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.setex(cache_key, ttl, encode_payload(payload))
+        pipe.zremrangebyscore(namespace_index, "-inf", now)
+        pipe.zadd(namespace_index, {cache_key: now + ttl})
+        await pipe.execute()
+        self.local_cache.set(cache_key, payload)
+    
+    async def get_search_results(self, query: str, modalities: Optional[List[str]] = None,
+                                limit: Optional[int] = 10, filters: Optional[Dict[str, Any]] = None,
+                                score_threshold: Optional[float] = None,
+                                generation: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Get cached search results for the current (or given) corpus generation"""
         if not self.connected:
             return None
             
         try:
-            cache_key = self._generate_cache_key(
-                "search", query, file_type=file_type, limit=limit
+            if generation is None:
+                generation = await self.get_corpus_generation()
+                if generation is None:
+                    return None
+            cache_key = self._search_cache_key(
+                query, modalities, limit, filters, score_threshold, generation
             )
-            cached_data = await self.redis.get(cache_key)
+            cached_data = await self._read_payload(cache_key)
             
             if cached_data:
                 logger.debug(f"Cache hit for search: {query}")
-                return json.loads(cached_data)
+                return cached_data
             
         except Exception as e:
             logger.error(f"Error retrieving from cache: {e}")
@@ -80,15 +430,25 @@ class CacheManager:
         return None
     
     async def set_search_results(self, query: str, results: Dict[str, Any], 
-                               file_type: Optional[str] = None, limit: int = 10,
-                               ttl: int = 3600) -> bool:
-        """Cache search results"""
+                               modalities: Optional[List[str]] = None, limit: Optional[int] = 10,
+                               filters: Optional[Dict[str, Any]] = None,
+                               score_threshold: Optional[float] = None,
+                               generation: Optional[int] = None, ttl: int = 3600) -> bool:
+        """Cache search results
+        
+        Pass the generation read before searching, so results computed
+        against an older corpus are never stored under a newer generation.
+        """
         if not self.connected:
             return False
             
         try:
-            cache_key = self._generate_cache_key(
-                "search", query, file_type=file_type, limit=limit
+            if generation is None:
+                generation = await self.get_corpus_generation()
+                if generation is None:
+                    return False
+            cache_key = self._search_cache_key(
+                query, modalities, limit, filters, score_threshold, generation
             )
             
             # Add metadata
@@ -96,11 +456,12 @@ class CacheManager:
                 "results": results,
                 "cached_at": datetime.utcnow().isoformat(),
                 "query": query,
-                "file_type": file_type,
-                "limit": limit
+                "modalities": modalities,
+                "limit": limit,
+                "generation": generation
             }
             
-            await self.redis.setex(cache_key, ttl, json.dumps(cache_data))
+            await self._write_payload(cache_key, cache_data, ttl)
             logger.debug(f"Cached search results for: {query}")
             return True
             
@@ -121,11 +482,11 @@ class CacheManager:
             ).hexdigest()
             
             cache_key = f"context:{session_id}:{results_hash}"
-            cached_data = await self.redis.get(cache_key)
+            cached_data = await self._read_payload(cache_key)
             
             if cached_data:
                 logger.debug(f"Cache hit for context bundle: {session_id}")
-                return json.loads(cached_data)
+                return cached_data
             
         except Exception as e:
             logger.error(f"Error retrieving context bundle from cache: {e}")
@@ -156,7 +517,7 @@ class CacheManager:
                 "results_count": len(results)
             }
             
-            await self.redis.setex(cache_key, ttl, json.dumps(cache_data))
+            await self._write_payload(cache_key, cache_data, ttl)
             logger.debug(f"Cached context bundle for session: {session_id}")
             return True
             
@@ -170,16 +531,38 @@ class CacheManager:
             return 0
             
         try:
-            keys = await self.redis.keys(f"search:{pattern}")
-            if keys:
-                deleted = await self.redis.delete(*keys)
-                logger.info(f"Invalidated {deleted} search cache entries")
-                return deleted
+            await self._publish_invalidation(f"search:{pattern}")
+            
+            deleted = await self._delete_namespace("search", pattern)
+            logger.info(f"Invalidated {deleted} search cache entries")
+            return deleted
         except Exception as e:
             logger.error(f"Error invalidating cache: {e}")
         
         return 0
     
+    async def _delete_namespace(self, namespace: str, pattern: str = "*") -> int:
+        """Delete a namespace's indexed keys matching pattern, walking its index in batches"""
+        index = self._namespace_index(namespace)
+        deleted = 0
+        batch = []
+        async for cache_key, _ in self.redis.zscan_iter(index, match=f"{namespace}:{pattern}"):
+            batch.append(cache_key)
+            if len(batch) >= INVALIDATION_BATCH_SIZE:
+                deleted += await self._delete_indexed(index, batch)
+                batch = []
+        if batch:
+            deleted += await self._delete_indexed(index, batch)
+        return deleted
+    
+    async def _delete_indexed(self, index: str, keys: List[bytes]) -> int:
+        """Delete keys and remove them from their index"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(*keys)
+        pipe.zrem(index, *keys)
+        deleted, _ = await pipe.execute()
+        return deleted
+    
     async def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         if not self.connected:
@@ -202,6 +585,31 @@ class CacheManager:
             total = hits + misses
             stats["hit_rate"] = (hits / total * 100) if total > 0 else 0
             
+            # Count live entries by type from the namespace indexes,
+            # pruning members whose keys have expired
+            now = time.time()
+            pipe = self.redis.pipeline(transaction=False)
+            for namespace in NAMESPACES:
+                pipe.zremrangebyscore(self._namespace_index(namespace), "-inf", now)
+                pipe.zcard(self._namespace_index(namespace))
+            counts = (await pipe.execute())[1::2]
+            stats["cache_counts"] = {
+                "search_results": counts[0],
+                "context_bundles": counts[1]
+            }
+            
+            stats["l1"] = self.local_cache.get_stats()
+            l2_total = self.l2_hits + self.l2_misses
+            stats["l2"] = {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_rate": (self.l2_hits / l2_total * 100) if l2_total > 0 else 0
+            }
+            stats["single_flight"] = {
+                "in_flight": len(self._in_flight),
+                "coalesced_requests": self.coalesced_requests
+            }
+            
             return stats
             
         except Exception as e:
@@ -209,12 +617,23 @@ class CacheManager:
             return {"connected": False, "error": str(e)}
     
     async def clear_all_cache(self) -> bool:
-        """Clear all cache entries"""
+        """Clear all cache entries
+        
+        Only the cache namespaces are deleted. ``corpus:generation`` is kept
+        and bumped instead, so the worker's counter never restarts below
+        what the replicas have seen and any unindexed search entries left
+        behind become unreachable.
+        """
         if not self.connected:
             return False
             
         try:
-            await self.redis.flushdb()
+            for namespace in NAMESPACES:
+                await self._delete_namespace(namespace)
+            generation = await self.redis.incr(CORPUS_GENERATION_KEY)
+            await self.redis.publish(CORPUS_GENERATION_CHANNEL, generation)
+            self._set_corpus_generation(generation)
+            await self._publish_invalidation("*")
             logger.info("Cleared all cache entries")
             return True
         except Exception as e:
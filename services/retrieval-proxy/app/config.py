@@ -41,14 +41,29 @@ class Settings(BaseSettings):
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", "6379"))
     redis_db: int = int(os.getenv("REDIS_DB", "1"))
+    cache_l1_max_entries: int = 1000  # In-process LRU in front of Redis, 0 = disabled
+    cache_l1_ttl: float = 30  # Seconds a search result stays in the in-process LRU
+    corpus_generation_max_age: float = 5  # Re-read the corpus generation from Redis after this many seconds
+    search_lock_enabled: bool = False  # Also coalesce identical searches across replicas with a Redis lock
+    search_lock_ttl: float = 10  # Seconds before an abandoned search lock expires
+    search_lock_poll_interval: float = 0.05  # Seconds between cache checks while another replica searches
     
     # Multimodal worker settings
     multimodal_worker_url: str = os.getenv("MULTIMODAL_WORKER_URL", "http://localhost:8001")
     
+    # Inter-service HTTP client settings (one connection pool per upstream)
+    http_max_connections: int = 100
+    http_pool_max_connections: dict = {}  # Per-upstream overrides, e.g. {"llm": 20}
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # Seconds an idle connection is kept open
+    http_timeout: float = 30.0  # Default per-request timeout; calls may pass their own
+    http_connect_timeout: float = 5.0
+    
     # Search settings
     default_search_limit: int = 10
     max_search_limit: int = 100
     similarity_threshold: float = 0.7
+    display_payload_backfill: bool = True  # Store display payloads on points enriched from Postgres
     
     # Context bundling settings
     max_context_length: int = 4000  # Maximum tokens in context bundle
@@ -193,6 +193,76 @@ class DatabaseManager:
         
         return None
     
+    async def get_contents_by_embedding_ids(self, embedding_ids: List[str]) -> Dict[str, Dict]:
+        """Get content details for many embedding IDs in one round trip
+        
+        Returns the same rows as ``get_content_by_embedding_id`` keyed by
+        embedding ID; IDs with no content are absent. An ID present in
+        several tables resolves in the same order: text, image, video, keyframe.
+        """
+        if not embedding_ids:
+            return {}
+        
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT 1 AS priority, tc.embedding_id, 'text' AS content_type, tc.id, tc.document_id,
+                       tc.chunk_text AS content, tc.chunk_index, tc.metadata,
+                       NULL::text AS image_path, NULL::integer AS width, NULL::integer AS height,
+                       NULL::jsonb AS features, NULL::text AS video_path,
+                       NULL::float AS duration_seconds, NULL::text AS keyframe_path,
+                       NULL::float AS timestamp_seconds, d.filename, d.file_type
+                FROM text_chunks tc
+                JOIN documents d ON tc.document_id = d.id
+                WHERE tc.embedding_id = ANY($1)
+                UNION ALL
+                SELECT 2, i.embedding_id, 'image', i.id, i.document_id,
+                       i.caption, NULL, NULL,
+                       i.image_path, i.width, i.height,
+                       i.features, NULL,
+                       NULL, NULL,
+                       NULL, d.filename, d.file_type
+                FROM images i
+                JOIN documents d ON i.document_id = d.id
+                WHERE i.embedding_id = ANY($1)
+                UNION ALL
+                SELECT 3, v.embedding_id, 'video', v.id, v.document_id,
+                       v.transcription, NULL, v.metadata,
+                       NULL, NULL, NULL,
+                       NULL, v.video_path,
+                       v.duration_seconds, NULL,
+                       NULL, d.filename, d.file_type
+                FROM videos v
+                JOIN documents d ON v.document_id = d.id
+                WHERE v.embedding_id = ANY($1)
+                UNION ALL
+                SELECT 4, vk.embedding_id, 'keyframe', vk.id, vk.video_id,
+                       vk.caption, NULL, NULL,
+                       NULL, NULL, NULL,
+                       NULL, v.video_path,
+                       NULL, vk.keyframe_path,
+                       vk.timestamp_seconds, d.filename, d.file_type
+                FROM video_keyframes vk
+                JOIN videos v ON vk.video_id = v.id
+                JOIN documents d ON v.document_id = d.id
+                WHERE vk.embedding_id = ANY($1)
+                ORDER BY priority
+            """, list(embedding_ids))
+        
+        contents = {}
+        for row in rows:
+            content = dict(row)
+            embedding_id = content.pop('embedding_id')
+            content.pop('priority')
+            if embedding_id in contents:
+                continue
+            # Drop the columns that belong to other content types
+            contents[embedding_id] = {
+                key: value for key, value in content.items()
+                if value is not None or key == 'content'
+            }
+        
+        return contents
+    
     async def get_related_content(self, document_id: str) -> Dict[str, List[Dict]]:
         """Get all related content for a document"""
         result = {
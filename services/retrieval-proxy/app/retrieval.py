@@ -4,14 +4,14 @@ Retrieval engine for unified multimodal search and context bundling
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import asyncio
-import httpx
 import numpy as np
 from datetime import datetime
 import json
 
 from .config import settings
 from .database import DatabaseManager
-from .vector_store import VectorStoreManager
+from .http_clients import http_clients
+from .vector_store import VectorStoreManager, build_display_payload, read_display_payload
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +22,7 @@ class RetrievalEngine:
         self.db_manager = db_manager
         self.vector_manager = vector_manager
         self.multimodal_worker_url = settings.multimodal_worker_url
+        self._backfill_tasks = set()
     
     async def search(self, query: str, modalities: List[str] = None,
                     limit: int = None, filters: Dict[str, Any] = None,
@@ -37,7 +38,7 @@ class RetrievalEngine:
             query_embedding = await self.generate_query_embedding(query)
             
             # Search vector store
-            vector_results = self.vector_manager.search_hybrid(
+            vector_results = await self.vector_manager.search_hybrid(
                 query_vector=query_embedding,
                 query_text=query,
                 limit=limit * 2,  # Get more results for filtering
@@ -87,16 +88,16 @@ class RetrievalEngine:
     async def generate_query_embedding(self, query: str) -> np.ndarray:
         """Generate embedding for search query using multimodal worker"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.multimodal_worker_url}/api/v1/embed/text",
-                    json={"text": query},
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
-                return np.array(result["embedding"])
-                
+            client = http_clients.get("multimodal_worker")
+            response = await client.post(
+                f"{self.multimodal_worker_url}/api/v1/embed/text",
+                json={"text": query},
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
+            return np.array(result["embedding"])
+            
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e}")
             # Fallback: return zero vector (this should be improved in production)
@@ -105,12 +106,13 @@ class RetrievalEngine:
     async def enrich_search_results(self, vector_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Enrich vector search results with database information"""
         enriched_results = []
+        contents = await self.get_contents(vector_results)
         
         for result in vector_results:
             try:
                 # Get content details from database
                 embedding_id = result['id']
-                content_info = await self.db_manager.get_content_by_embedding_id(embedding_id)
+                content_info = contents.get(str(embedding_id))
                 
                 if content_info:
                     enriched_result = {
@@ -122,7 +124,10 @@ class RetrievalEngine:
                         "document_id": content_info['document_id'],
                         "filename": content_info['filename'],
                         "file_type": content_info['file_type'],
-                        "metadata": result.get('payload', {}),
+                        "metadata": {
+                            key: value for key, value in (result.get('payload') or {}).items()
+                            if key not in ('display', 'display_version')
+                        },
                         "citations": self.generate_citations(content_info),
                         "artifacts": await self.get_artifact_links(content_info)
                     }
@@ -166,6 +171,67 @@ class RetrievalEngine:
         
         return enriched_results
     
+    async def get_contents(self, vector_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Get the content for all vector hits, keyed by embedding ID
+        
+        Hits carrying a current display payload are served from it; only the
+        rest are looked up in the database, and get the payload stored for
+        next time.
+        """
+        contents = {}
+        missing = []
+        for result in vector_results:
+            if 'id' not in result:
+                continue
+            display = read_display_payload(result.get('payload'))
+            if display is not None:
+                contents[str(result['id'])] = display
+            else:
+                missing.append(result)
+        
+        if missing:
+            db_contents = await self.get_database_contents([str(result['id']) for result in missing])
+            contents.update(db_contents)
+            if settings.display_payload_backfill and db_contents:
+                task = asyncio.create_task(self.backfill_display_payloads(missing, db_contents))
+                self._backfill_tasks.add(task)
+                task.add_done_callback(self._backfill_tasks.discard)
+        
+        return contents
+    
+    async def backfill_display_payloads(self, vector_results: List[Dict[str, Any]],
+                                        contents: Dict[str, Dict[str, Any]]):
+        """Store display payloads on points that were enriched from the database"""
+        for result in vector_results:
+            content_info = contents.get(str(result['id']))
+            if content_info is None or 'collection' not in result:
+                continue
+            await asyncio.to_thread(
+                self.vector_manager.update_vector_payload,
+                result['collection'], result['id'], build_display_payload(content_info)
+            )
+    
+    async def get_database_contents(self, embedding_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up database content for many embedding IDs at once
+        
+        Falls back to per-hit lookups if the bulk query fails, so one bad
+        hit only drops that hit.
+        """
+        try:
+            return await self.db_manager.get_contents_by_embedding_ids(embedding_ids)
+        except Exception as e:
+            logger.error(f"Bulk content lookup failed, falling back to per-hit lookups: {e}")
+        
+        contents = {}
+        for embedding_id in embedding_ids:
+            try:
+                content_info = await self.db_manager.get_content_by_embedding_id(embedding_id)
+                if content_info:
+                    contents[embedding_id] = content_info
+            except Exception as e:
+                logger.error(f"Failed to look up content for {embedding_id}: {e}")
+        return contents
+    
     def apply_filters(self, results: List[Dict[str, Any]], 
                      filters: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Apply additional filters to search results"""
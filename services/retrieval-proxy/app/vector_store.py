@@ -1,6 +1,7 @@
 """
 Vector store manager for Qdrant operations
 """
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
@@ -15,6 +16,36 @@ from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# Version of the display payload stored on each point; bump when its fields change
+DISPLAY_PAYLOAD_VERSION = 2
+
+# Content fields copied into the display payload, including the JSONB features
+# and metadata, so results served from it match those built from Postgres
+DISPLAY_PAYLOAD_FIELDS = (
+    'content_type', 'id', 'document_id', 'filename', 'file_type', 'content',
+    'chunk_index', 'image_path', 'width', 'height', 'video_path',
+    'duration_seconds', 'keyframe_path', 'timestamp_seconds', 'features', 'metadata'
+)
+
+def build_display_payload(content_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the point payload that lets search results be shown without Postgres
+    
+    ``content_info`` is a row as returned by ``get_content_by_embedding_id``.
+    Merge the result into the payload when indexing a point.
+    """
+    display = {}
+    for field in DISPLAY_PAYLOAD_FIELDS:
+        value = content_info.get(field)
+        if value is not None:
+            display[field] = value if isinstance(value, (str, int, float, dict, list)) else str(value)
+    return {"display_version": DISPLAY_PAYLOAD_VERSION, "display": display}
+
+def read_display_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Get the display payload of a point, or None if it is missing or outdated"""
+    if not payload or payload.get("display_version") != DISPLAY_PAYLOAD_VERSION:
+        return None
+    return payload.get("display")
+
 class VectorStoreManager:
     """Manages Qdrant vector database operations"""
     
@@ -233,31 +264,42 @@ class VectorStoreManager:
             logger.error(f"Failed to get collection info: {e}")
             return {}
     
-    def search_hybrid(self, query_vector: np.ndarray, query_text: str = None,
-                     limit: int = 10, score_threshold: float = None,
-                     modalities: List[str] = None) -> List[Dict[str, Any]]:
-        """Search across multiple modalities and combine results"""
+    async def search_hybrid(self, query_vector: np.ndarray, query_text: str = None,
+                           limit: int = 10, score_threshold: float = None,
+                           modalities: List[str] = None) -> List[Dict[str, Any]]:
+        """Search across multiple modalities concurrently and combine results
+        
+        Each collection is searched with the synchronous client in a worker
+        thread, so latency is that of the slowest collection and the event
+        loop is not blocked.
+        """
         try:
             all_results = []
             modalities = modalities or ['text', 'image', 'video']
+            searched = [
+                (modality, self.collections[modality])
+                for modality in modalities if modality in self.collections
+            ]
             
             # Search each modality
-            for modality in modalities:
-                if modality in self.collections:
-                    collection_name = self.collections[modality]
-                    results = self.search_vectors(
-                        collection_name=collection_name,
-                        query_vector=query_vector,
-                        limit=limit,
-                        score_threshold=score_threshold
-                    )
-                    
-                    # Add modality info to results
-                    for result in results:
-                        result['modality'] = modality
-                        result['collection'] = collection_name
-                    
-                    all_results.extend(results)
+            result_sets = await asyncio.gather(*(
+                asyncio.to_thread(
+                    self.search_vectors,
+                    collection_name=collection_name,
+                    query_vector=query_vector,
+                    limit=limit,
+                    score_threshold=score_threshold
+                )
+                for _, collection_name in searched
+            ))
+            
+            for (modality, collection_name), results in zip(searched, result_sets):
+                # Add modality info to results
+                for result in results:
+                    result['modality'] = modality
+                    result['collection'] = collection_name
+                
+                all_results.extend(results)
             
             # Sort by score (descending) and limit
             all_results.sort(key=lambda x: x['score'], reverse=True)
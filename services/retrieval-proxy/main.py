@@ -17,6 +17,7 @@ from app.vector_store import VectorStoreManager
 from app.retrieval import RetrievalEngine
 from app.api import router
 from app.cache import cache_manager
+from app.http_clients import http_clients
 
 # Configure logging
 logging.basicConfig(
@@ -55,6 +56,7 @@ async def lifespan(app: FastAPI):
         app.state.vector_manager = vector_manager
         app.state.retrieval_engine = retrieval_engine
         app.state.cache_manager = cache_manager
+        app.state.http_clients = http_clients
         
         logger.info("Retrieval Proxy Service initialized successfully")
         
@@ -71,6 +73,7 @@ async def lifespan(app: FastAPI):
             await vector_manager.close()
         if cache_manager:
             await cache_manager.close()
+        await http_clients.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -0,0 +1,314 @@
+"""
+Unit tests for the Redis cache manager in retrieval-proxy service
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+
+from app.cache import (
+    CacheManager, LocalCache, encode_payload, decode_payload, PAYLOAD_FORMAT,
+    CORPUS_GENERATION_KEY, CORPUS_GENERATION_CHANNEL
+)
+
+
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def cache_manager():
+    """Create a cache manager with a mocked Redis connection"""
+    manager = CacheManager()
+    manager.redis = AsyncMock()
+    manager.redis.pipeline = Mock(return_value=Mock(execute=AsyncMock(return_value=[])))
+    manager.connected = True
+    manager.corpus_generation = 0
+    manager._generation_checked = float("inf")
+    return manager
+
+
+class TestCachePayloads:
+    """Test cases for cached payload serialization"""
+
+    def test_payload_round_trip(self):
+        """Test that payloads are compact, versioned and round-trip"""
+        payload = {"results": {"query": "café", "results": [{"score": 0.9}]}}
+        data = encode_payload(payload)
+
+        assert data.startswith(PAYLOAD_FORMAT)
+        assert len(data) < len(json.dumps(payload).encode())
+        assert decode_payload(data) == payload
+
+    def test_legacy_payload_decodes(self):
+        """Test that plain JSON written by older versions still decodes"""
+        payload = {"results": {"total_results": 0}}
+
+        assert decode_payload(json.dumps(payload).encode()) == payload
+
+    @pytest.mark.asyncio
+    async def test_legacy_search_entry_is_migrated(self, cache_manager):
+        """Test that reading a legacy entry rewrites it in the compact format"""
+        payload = {"results": {"total_results": 0}, "query": "test"}
+        cache_manager.redis.get.return_value = json.dumps(payload).encode()
+
+        assert await cache_manager.get_search_results("test") == payload
+
+        cache_key, data = cache_manager.redis.set.call_args[0]
+        assert cache_key.startswith("search:")
+        assert data == encode_payload(payload)
+        assert cache_manager.redis.set.call_args.kwargs["keepttl"] is True
+
+    @pytest.mark.asyncio
+    async def test_set_search_results_writes_compact_payload(self, cache_manager):
+        """Test that new entries are written in the compact format"""
+        assert await cache_manager.set_search_results("test", {"total_results": 0}, ttl=60)
+
+        pipe = cache_manager.redis.pipeline.return_value
+        cache_key, ttl, data = pipe.setex.call_args[0]
+        assert ttl == 60
+        assert decode_payload(data)["results"] == {"total_results": 0}
+        cache_manager.redis.set.assert_not_called()
+
+
+class TestTwoTierCache:
+    """Test cases for the in-process tier in front of Redis"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_search_served_locally(self, cache_manager):
+        """Test that a search result read from Redis is served locally the next time"""
+        payload = {"results": {"total_results": 0}}
+        cache_manager.redis.get.return_value = encode_payload(payload)
+
+        assert await cache_manager.get_search_results("test") == payload
+        assert await cache_manager.get_search_results("test") == payload
+
+        cache_manager.redis.get.assert_called_once()
+        assert cache_manager.local_cache.hits == 1
+        assert cache_manager.l2_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_clears_local_tier_and_publishes(self, cache_manager):
+        """Test that invalidating search results reaches every replica"""
+        await cache_manager.set_search_results("test", {"total_results": 0})
+        cache_manager.redis.zscan_iter = Mock(return_value=_async_iter([]))
+
+        await cache_manager.invalidate_search_cache()
+
+        assert cache_manager.local_cache.get_stats()["entries"] == 0
+        cache_manager.redis.publish.assert_called_once_with(
+            cache_manager.invalidation_channel, "search:*"
+        )
+
+    def test_local_cache_evicts_least_recently_used(self):
+        """Test that the in-process tier is size-bounded"""
+        cache = LocalCache(max_entries=1, ttl=60)
+        cache.set("a", {"n": 1})
+        cache.set("b", {"n": 2})
+
+        assert cache.get("a") is None
+        assert cache.get("b") == {"n": 2}
+
+
+class TestKeyIndexes:
+    """Test cases for the namespace key indexes"""
+
+    @pytest.mark.asyncio
+    async def test_writes_are_indexed(self, cache_manager):
+        """Test that cached search results are added to the search index"""
+        await cache_manager.set_search_results("test", {"total_results": 0}, ttl=60)
+
+        pipe = cache_manager.redis.pipeline.return_value
+        index, members = pipe.zadd.call_args[0]
+        assert index == "index:ns:search"
+        assert list(members)[0].startswith("search:")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_walks_index_with_cursor(self, cache_manager):
+        """Test that invalidation deletes indexed keys in batches without KEYS"""
+        keys = [f"search:{i}".encode() for i in range(3)]
+        cache_manager.redis.zscan_iter = Mock(return_value=_async_iter([(k, 1.0) for k in keys]))
+        pipe = cache_manager.redis.pipeline.return_value
+        pipe.execute.return_value = [3, 3]
+
+        assert await cache_manager.invalidate_search_cache() == 3
+
+        cache_manager.redis.zscan_iter.assert_called_once_with("index:ns:search", match="search:*")
+        pipe.delete.assert_called_once_with(*keys)
+        pipe.zrem.assert_called_once_with("index:ns:search", *keys)
+        cache_manager.redis.keys.assert_not_called()
+
+
+class TestCorpusGeneration:
+    """Test cases for generation-keyed search results"""
+
+    def test_key_covers_every_search_parameter(self, cache_manager):
+        """Test that results differing in any search parameter get distinct keys"""
+        base = dict(query="q", modalities=["text", "image"], limit=10, filters=None,
+                    score_threshold=None, generation=1)
+        key = cache_manager._search_cache_key(**base)
+
+        assert cache_manager._search_cache_key(**{**base, "modalities": ["image", "text"]}) == key
+        for change in ({"generation": 2}, {"filters": {"file_type": "pdf"}},
+                       {"score_threshold": 0.5}, {"modalities": ["text"]}, {"limit": 5}):
+            assert cache_manager._search_cache_key(**{**base, **change}) != key
+
+    @pytest.mark.asyncio
+    async def test_bump_makes_cached_results_unreachable(self, cache_manager):
+        """Test that a new generation misses results cached under the previous one"""
+        await cache_manager.set_search_results("q", {"total_results": 0}, generation=1)
+        assert await cache_manager.get_search_results("q", generation=1) is not None
+
+        cache_manager.redis.get.return_value = None
+        assert await cache_manager.get_search_results("q", generation=2) is None
+
+    @pytest.mark.asyncio
+    async def test_generation_is_reread_when_stale(self, cache_manager):
+        """Test that the generation is refreshed from Redis after the max age"""
+        cache_manager._generation_checked = 0.0
+        cache_manager.redis.get.return_value = b"4"
+
+        with patch('app.cache.time.monotonic', return_value=100.0):
+            assert await cache_manager.get_corpus_generation() == 4
+            assert await cache_manager.get_corpus_generation() == 4
+
+        cache_manager.redis.get.assert_called_once_with(CORPUS_GENERATION_KEY)
+
+    def test_generation_never_moves_backwards(self, cache_manager):
+        """Test that a late pub/sub message cannot revive an older generation"""
+        cache_manager._set_corpus_generation(5)
+        cache_manager._set_corpus_generation(3)
+
+        assert cache_manager.corpus_generation == 5
+
+    @pytest.mark.asyncio
+    async def test_reset_counter_in_redis_is_accepted(self, cache_manager):
+        """Test that a lower generation read from Redis replaces the local one"""
+        cache_manager.corpus_generation = 9
+        cache_manager._generation_checked = 0.0
+        cache_manager.redis.get.return_value = b"1"
+
+        assert await cache_manager.get_corpus_generation() == 1
+
+    @pytest.mark.asyncio
+    async def test_generation_read_failure_falls_back(self, cache_manager):
+        """Test that a Redis error returns the last known generation, or None without one"""
+        cache_manager.corpus_generation = 6
+        cache_manager._generation_checked = 0.0
+        cache_manager.redis.get.side_effect = ConnectionError("timeout")
+
+        assert await cache_manager.get_corpus_generation() == 6
+
+        cache_manager.corpus_generation = None
+        assert await cache_manager.get_corpus_generation() is None
+
+    @pytest.mark.asyncio
+    async def test_search_runs_uncached_without_generation(self, cache_manager):
+        """Test that a search still runs, without touching the cache, when the generation cannot be read"""
+        cache_manager.corpus_generation = None
+        cache_manager.redis.get.side_effect = ConnectionError("timeout")
+        compute = AsyncMock(return_value={"total_results": 0})
+
+        with patch('app.cache.settings.search_lock_enabled', True):
+            assert await cache_manager.coalesce_search(compute, "q") == {"total_results": 0}
+            assert await cache_manager.set_search_results("q", {"total_results": 0}) is False
+
+        compute.assert_awaited_once()
+        cache_manager.redis.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_clear_keeps_and_bumps_generation(self, cache_manager):
+        """Test that clearing the cache deletes the namespaces but not the generation counter"""
+        cache_manager.redis.zscan_iter = Mock(side_effect=lambda *args, **kwargs: _async_iter([]))
+        cache_manager.redis.incr.return_value = 10
+
+        assert await cache_manager.clear_all_cache()
+
+        cache_manager.redis.flushdb.assert_not_called()
+        assert [c.args[0] for c in cache_manager.redis.zscan_iter.call_args_list] == [
+            "index:ns:search", "index:ns:context"
+        ]
+        cache_manager.redis.incr.assert_called_once_with(CORPUS_GENERATION_KEY)
+        cache_manager.redis.publish.assert_any_call(CORPUS_GENERATION_CHANNEL, 10)
+        assert cache_manager.corpus_generation == 10
+
+
+class TestSingleFlight:
+    """Test cases for coalescing identical concurrent searches"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_searches_run_once(self, cache_manager):
+        """Test that concurrent callers share one computation"""
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"total_results": 1}
+
+        waiters = [asyncio.create_task(cache_manager.coalesce_search(compute, "q")) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == [{"total_results": 1}] * 5
+        assert calls == 1
+        assert cache_manager.coalesced_requests == 4
+        assert cache_manager._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_different_searches_are_not_coalesced(self, cache_manager):
+        """Test that searches with different parameters compute separately"""
+        compute = AsyncMock(return_value={"total_results": 0})
+
+        await asyncio.gather(
+            cache_manager.coalesce_search(compute, "q", limit=5),
+            cache_manager.coalesce_search(compute, "q", limit=10)
+        )
+
+        assert compute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_waiter(self, cache_manager):
+        """Test that a failed computation is raised to all callers and not kept"""
+        async def compute():
+            await asyncio.sleep(0)
+            raise RuntimeError("qdrant down")
+
+        results = await asyncio.gather(
+            cache_manager.coalesce_search(compute, "q"),
+            cache_manager.coalesce_search(compute, "q"),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert cache_manager._in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_lock_loser_waits_for_cached_result(self, cache_manager):
+        """Test that a replica losing the Redis lock reuses the winner's cached result"""
+        cache_manager.redis.set.return_value = False
+        cache_manager.redis.get.side_effect = [None, encode_payload({"results": {"total_results": 2}})]
+        compute = AsyncMock()
+
+        with patch('app.cache.settings.search_lock_enabled', True), \
+             patch('app.cache.settings.search_lock_poll_interval', 0):
+            assert await cache_manager.coalesce_search(compute, "q") == {"total_results": 2}
+
+        compute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_lock_winner_releases_lock(self, cache_manager):
+        """Test that the replica holding the lock computes and releases it"""
+        cache_manager.redis.set.return_value = True
+        compute = AsyncMock(return_value={"total_results": 0})
+
+        with patch('app.cache.settings.search_lock_enabled', True):
+            await cache_manager.coalesce_search(compute, "q")
+
+        compute.assert_awaited_once()
+        lock_key = cache_manager.redis.set.call_args[0][0]
+        assert lock_key.startswith("lock:search:")
+        cache_manager.redis.eval.assert_awaited_once()
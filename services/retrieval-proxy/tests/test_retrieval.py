@@ -1,6 +1,7 @@
 """
 Unit tests for retrieval engine in retrieval-proxy service
 """
+import asyncio
 import pytest
 import pytest_asyncio
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
@@ -9,6 +10,7 @@ import httpx
 from datetime import datetime
 
 from app.retrieval import RetrievalEngine
+from app.vector_store import build_display_payload
 
 
 class TestRetrievalEngine:
@@ -19,6 +21,7 @@ class TestRetrievalEngine:
         """Create mock managers for testing"""
         db_manager = AsyncMock()
         vector_manager = Mock()
+        vector_manager.search_hybrid = AsyncMock()
         return db_manager, vector_manager
 
     @pytest.fixture
@@ -69,7 +72,7 @@ class TestRetrievalEngine:
         """Test successful search operation"""
         # Mock dependencies
         retrieval_engine.vector_manager.search_hybrid.return_value = mock_vector_results
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
         retrieval_engine.db_manager.create_search_session.return_value = "session123"
 
         # Mock query embedding generation
@@ -107,7 +110,7 @@ class TestRetrievalEngine:
         """Test search with default parameters"""
         # Mock dependencies
         retrieval_engine.vector_manager.search_hybrid.return_value = mock_vector_results
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
         retrieval_engine.db_manager.create_search_session.return_value = "session123"
 
         # Mock query embedding generation
@@ -126,7 +129,7 @@ class TestRetrievalEngine:
         """Test search with limit exceeding maximum"""
         # Mock dependencies
         retrieval_engine.vector_manager.search_hybrid.return_value = mock_vector_results
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
         retrieval_engine.db_manager.create_search_session.return_value = "session123"
 
         # Mock query embedding generation
@@ -149,8 +152,8 @@ class TestRetrievalEngine:
         mock_response.json.return_value = {"embedding": [0.1, 0.2, 0.3] * 128}  # 384 dimensions
         mock_response.raise_for_status.return_value = None
 
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.post.return_value = mock_response
+        with patch('app.retrieval.http_clients') as mock_http_clients:
+            mock_http_clients.get.return_value.post = AsyncMock(return_value=mock_response)
 
             # Test embedding generation
             embedding = await retrieval_engine.generate_query_embedding("test query")
@@ -164,8 +167,8 @@ class TestRetrievalEngine:
     async def test_generate_query_embedding_failure(self, retrieval_engine):
         """Test query embedding generation failure"""
         # Mock HTTP failure
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.post.side_effect = httpx.RequestError("Connection failed")
+        with patch('app.retrieval.http_clients') as mock_http_clients:
+            mock_http_clients.get.return_value.post = AsyncMock(side_effect=httpx.RequestError("Connection failed"))
 
             # Test embedding generation
             embedding = await retrieval_engine.generate_query_embedding("test query")
@@ -179,7 +182,7 @@ class TestRetrievalEngine:
     async def test_enrich_search_results_success(self, retrieval_engine, mock_vector_results, mock_content_info):
         """Test successful search result enrichment"""
         # Mock database response
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
 
         # Mock artifact links
         with patch.object(retrieval_engine, 'get_artifact_links') as mock_artifacts:
@@ -201,7 +204,7 @@ class TestRetrievalEngine:
     async def test_enrich_search_results_with_missing_content(self, retrieval_engine, mock_vector_results):
         """Test search result enrichment with missing content"""
         # Mock database response - no content found
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = None
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.return_value = {}
 
         # Test result enrichment
         enriched_results = await retrieval_engine.enrich_search_results(mock_vector_results)
@@ -213,6 +216,7 @@ class TestRetrievalEngine:
     async def test_enrich_search_results_with_database_error(self, retrieval_engine, mock_vector_results):
         """Test search result enrichment with database error"""
         # Mock database error
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = Exception("Database error")
         retrieval_engine.db_manager.get_content_by_embedding_id.side_effect = Exception("Database error")
 
         # Test result enrichment
@@ -221,6 +225,68 @@ class TestRetrievalEngine:
         # Verify results - should be empty due to error
         assert len(enriched_results) == 0
 
+    @pytest.mark.asyncio
+    async def test_enrich_search_results_uses_one_bulk_lookup(self, retrieval_engine, mock_vector_results, mock_content_info):
+        """Test that all hits are resolved with a single database call"""
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.return_value = {'embedding2': mock_content_info}
+
+        enriched_results = await retrieval_engine.enrich_search_results(mock_vector_results)
+
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.assert_awaited_once_with(['embedding1', 'embedding2'])
+        retrieval_engine.db_manager.get_content_by_embedding_id.assert_not_called()
+        assert [r['embedding_id'] for r in enriched_results] == ['embedding2']
+
+    @pytest.mark.asyncio
+    async def test_enrich_search_results_falls_back_per_hit(self, retrieval_engine, mock_vector_results, mock_content_info):
+        """Test that a failed bulk lookup only drops the hits that fail individually"""
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = Exception("Database error")
+        retrieval_engine.db_manager.get_content_by_embedding_id.side_effect = [Exception("Bad row"), mock_content_info]
+
+        enriched_results = await retrieval_engine.enrich_search_results(mock_vector_results)
+
+        assert [r['embedding_id'] for r in enriched_results] == ['embedding2']
+
+    @pytest.mark.asyncio
+    async def test_enrich_search_results_from_display_payload(self, retrieval_engine, mock_vector_results, mock_content_info):
+        """Test that hits with a current display payload skip the database"""
+        for result in mock_vector_results:
+            result['payload'].update(build_display_payload(mock_content_info))
+
+        enriched_results = await retrieval_engine.enrich_search_results(mock_vector_results)
+
+        assert len(enriched_results) == 2
+        assert enriched_results[0]['content'] == 'This is test content'
+        assert 'display' not in enriched_results[0]['metadata']
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_display_payload_matches_database_result(self, retrieval_engine, mock_vector_results, mock_content_info):
+        """Test that a hit served from its payload carries the same metadata as one from the database"""
+        mock_content_info['metadata'] = '{"page": 3}'
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.return_value = {'embedding2': mock_content_info}
+        from_database = await retrieval_engine.enrich_search_results(mock_vector_results[1:])
+        await asyncio.gather(*retrieval_engine._backfill_tasks)
+
+        mock_vector_results[1]['payload'].update(build_display_payload(mock_content_info))
+        from_payload = await retrieval_engine.enrich_search_results(mock_vector_results[1:])
+
+        assert from_payload[0]['text_metadata'] == from_database[0]['text_metadata'] == '{"page": 3}'
+
+    @pytest.mark.asyncio
+    async def test_missing_display_payload_is_backfilled(self, retrieval_engine, mock_vector_results, mock_content_info):
+        """Test that only hits without a payload hit the database, and get one stored"""
+        mock_vector_results[0]['payload'].update(build_display_payload(mock_content_info))
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.return_value = {'embedding2': mock_content_info}
+
+        enriched_results = await retrieval_engine.enrich_search_results(mock_vector_results)
+        await asyncio.gather(*retrieval_engine._backfill_tasks)
+
+        assert len(enriched_results) == 2
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.assert_awaited_once_with(['embedding2'])
+        retrieval_engine.vector_manager.update_vector_payload.assert_called_once_with(
+            'test-image', 'embedding2', build_display_payload(mock_content_info)
+        )
+
     def test_apply_filters_success(self, retrieval_engine):
         """Test successful filter application"""
         # Test data
@@ -573,7 +639,7 @@ class TestRetrievalEngine:
         """Test search with context bundle creation failure"""
         # Mock dependencies
         retrieval_engine.vector_manager.search_hybrid.return_value = mock_vector_results
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
         retrieval_engine.db_manager.create_search_session.return_value = "session123"
 
         # Mock query embedding generation
@@ -596,7 +662,7 @@ class TestRetrievalEngine:
         """Test search with database session creation failure"""
         # Mock dependencies
         retrieval_engine.vector_manager.search_hybrid.return_value = mock_vector_results
-        retrieval_engine.db_manager.get_content_by_embedding_id.return_value = mock_content_info
+        retrieval_engine.db_manager.get_contents_by_embedding_ids.side_effect = lambda ids: {i: mock_content_info for i in ids}
         retrieval_engine.db_manager.create_search_session.side_effect = Exception("Session creation failed")
 
         # Mock query embedding generation
@@ -5,10 +5,11 @@ import pytest
 import pytest_asyncio
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 import numpy as np
+import threading
 import uuid
 from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, Range, MatchValue
 
-from app.vector_store import VectorStoreManager
+from app.vector_store import VectorStoreManager, build_display_payload, read_display_payload, DISPLAY_PAYLOAD_VERSION
 
 
 class TestVectorStoreManager:
@@ -388,7 +389,8 @@ class TestVectorStoreManager:
         # Verify result
         assert result == {}
 
-    def test_search_hybrid_success(self, vector_store_manager, mock_qdrant_client, test_vectors):
+    @pytest.mark.asyncio
+    async def test_search_hybrid_success(self, vector_store_manager, mock_qdrant_client, test_vectors):
         """Test successful hybrid search"""
         vector_store_manager.client = mock_qdrant_client
 
@@ -410,7 +412,7 @@ class TestVectorStoreManager:
 
         # Test hybrid search
         query_vector = test_vectors[0]
-        results = vector_store_manager.search_hybrid(
+        results = await vector_store_manager.search_hybrid(
             query_vector=query_vector,
             query_text="test query",
             limit=10,
@@ -424,7 +426,8 @@ class TestVectorStoreManager:
         assert results[1]['modality'] == 'image'
         assert results[2]['modality'] == 'video'
 
-    def test_search_hybrid_with_specific_modalities(self, vector_store_manager, mock_qdrant_client, test_vectors):
+    @pytest.mark.asyncio
+    async def test_search_hybrid_with_specific_modalities(self, vector_store_manager, mock_qdrant_client, test_vectors):
         """Test hybrid search with specific modalities"""
         vector_store_manager.client = mock_qdrant_client
 
@@ -434,7 +437,7 @@ class TestVectorStoreManager:
 
         # Test hybrid search with only text modality
         query_vector = test_vectors[0]
-        results = vector_store_manager.search_hybrid(
+        results = await vector_store_manager.search_hybrid(
             query_vector=query_vector,
             limit=10,
             modalities=['text']
@@ -444,7 +447,8 @@ class TestVectorStoreManager:
         assert len(results) == 1
         assert results[0]['modality'] == 'text'
 
-    def test_search_hybrid_with_score_threshold(self, vector_store_manager, mock_qdrant_client, test_vectors):
+    @pytest.mark.asyncio
+    async def test_search_hybrid_with_score_threshold(self, vector_store_manager, mock_qdrant_client, test_vectors):
         """Test hybrid search with score threshold"""
         vector_store_manager.client = mock_qdrant_client
 
@@ -454,7 +458,7 @@ class TestVectorStoreManager:
 
         # Test hybrid search with score threshold
         query_vector = test_vectors[0]
-        results = vector_store_manager.search_hybrid(
+        results = await vector_store_manager.search_hybrid(
             query_vector=query_vector,
             limit=10,
             score_threshold=0.8
@@ -567,7 +571,8 @@ class TestVectorStoreManager:
         assert isinstance(results, list)
         assert len(results) == 0
 
-    def test_search_hybrid_with_empty_results(self, vector_store_manager, mock_qdrant_client, test_vectors):
+    @pytest.mark.asyncio
+    async def test_search_hybrid_with_empty_results(self, vector_store_manager, mock_qdrant_client, test_vectors):
         """Test hybrid search with empty results"""
         vector_store_manager.client = mock_qdrant_client
 
@@ -576,11 +581,55 @@ class TestVectorStoreManager:
 
         # Test hybrid search
         query_vector = test_vectors[0]
-        results = vector_store_manager.search_hybrid(
+        results = await vector_store_manager.search_hybrid(
             query_vector=query_vector,
             limit=10
         )
 
         # Verify results
         assert isinstance(results, list)
-        assert len(results) == 0
\ No newline at end of file
+        assert len(results) == 0
+
+
+    @pytest.mark.asyncio
+    async def test_search_hybrid_searches_collections_concurrently(self, vector_store_manager, mock_qdrant_client, test_vectors):
+        """Test that collections are searched in parallel rather than one after another"""
+        vector_store_manager.client = mock_qdrant_client
+        barrier = threading.Barrier(3, timeout=5)
+
+        def search_side_effect(collection_name, **kwargs):
+            # Only returns once all three collection searches are running at the same time
+            barrier.wait()
+            return [Mock(id=collection_name, score=0.9, payload={})]
+
+        mock_qdrant_client.search.side_effect = search_side_effect
+
+        results = await vector_store_manager.search_hybrid(query_vector=test_vectors[0], limit=10)
+
+        assert [r['modality'] for r in results] == ['text', 'image', 'video']
+
+
+class TestDisplayPayload:
+    """Test cases for the denormalized display payload"""
+
+    def test_display_payload_round_trip(self):
+        """Test that a content row becomes a compact, JSON-safe, versioned payload"""
+        document_id = uuid.uuid4()
+        payload = build_display_payload({
+            'content_type': 'image', 'document_id': document_id, 'filename': 'a.jpg',
+            'file_type': 'image', 'content': 'a cat', 'image_path': 'images/a.jpg',
+            'width': 640, 'height': None, 'features': {'tags': ['cat']}
+        })
+
+        assert payload['display_version'] == DISPLAY_PAYLOAD_VERSION
+        display = read_display_payload({'document_id': 'doc', **payload})
+        assert display['document_id'] == str(document_id)
+        assert display['width'] == 640
+        assert display['features'] == {'tags': ['cat']}
+        assert 'height' not in display
+
+    def test_outdated_display_payload_is_ignored(self):
+        """Test that payloads from another version or without one are not used"""
+        assert read_display_payload({'display_version': DISPLAY_PAYLOAD_VERSION - 1, 'display': {}}) is None
+        assert read_display_payload({'content_type': 'text'}) is None
+        assert read_display_payload(None) is None